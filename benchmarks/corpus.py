@@ -0,0 +1,196 @@
+"""
+Synthetic submission corpora for the benchmarks.
+
+Every language gets the same six kinds of submission for the same task
+(print the sum of the integers on stdin):
+
+- fast: the correct answer right away
+- slow: the correct answer after a CPU-bound spin loop
+- crash: dies at run time (division by zero, null dereference, ...)
+- compile_error: does not compile (or fails the syntax check)
+- huge_output: prints `huge_mb` MiB of junk, tripping the output limit
+- infinite_loop: never finishes, tripping the time limit
+
+Corpora are deterministic for a given seed, so two benchmark runs grade the
+exact same submissions.
+"""
+import json
+import os
+import random
+import shutil
+import zipfile
+
+from core.configuration import POPULAR_LANGUAGES
+
+KINDS = ("fast", "slow", "crash", "compile_error", "huge_output", "infinite_loop")
+DEFAULT_MIX = {"fast": 60, "slow": 10, "crash": 10, "compile_error": 10, "huge_output": 5, "infinite_loop": 5}
+# Iterations of the spin loop in "slow" submissions: a few hundred milliseconds in interpreted languages.
+DEFAULT_SPIN = 3_000_000
+DEFAULT_HUGE_MB = 32
+INPUT_NUMBERS = 1000
+
+# Language -> (main file name, comment prefix, {kind: source}). Sources are str.format templates
+# taking spin (loop iterations) and lines (1 KiB lines printed by huge_output).
+SOURCES = {
+    "Python": ("main.py", "#", {
+        "fast": "import sys\nprint(sum(map(int, sys.stdin.read().split())))\n",
+        "slow": "import sys\nn = 0\nfor i in range({spin}):\n    n += i\nprint(sum(map(int, sys.stdin.read().split())))\n",
+        "crash": "import sys\nprint(sum(map(int, sys.stdin.read().split())) // 0)\n",
+        "compile_error": "def main(:\n    pass\n",
+        "huge_output": "import sys\nline = 'x' * 1023 + '\\n'\nfor _ in range({lines}):\n    sys.stdout.write(line)\n",
+        "infinite_loop": "while True:\n    pass\n"
+    }),
+    "C": ("main.c", "//", {
+        "fast": "#include <stdio.h>\nint main(void) {{ long s = 0, x; while (scanf(\"%ld\", &x) == 1) s += x; printf(\"%ld\\n\", s); return 0; }}\n",
+        "slow": "#include <stdio.h>\nint main(void) {{ volatile long n = 0; for (long i = 0; i < {spin}L * 20; i++) n += i; long s = 0, x; while (scanf(\"%ld\", &x) == 1) s += x; printf(\"%ld\\n\", s); return 0; }}\n",
+        "crash": "#include <stdio.h>\nint main(void) {{ volatile int *p = 0; printf(\"%d\\n\", *p); return 0; }}\n",
+        "compile_error": "int main(void) {{ return }}\n",
+        "huge_output": "#include <stdio.h>\n#include <string.h>\nint main(void) {{ char line[1024]; memset(line, 'x', 1023); line[1023] = 0; for (long i = 0; i < {lines}; i++) puts(line); return 0; }}\n",
+        "infinite_loop": "int main(void) {{ for (;;) {{ }} }}\n"
+    }),
+    "C++": ("main.cpp", "//", {
+        "fast": "#include <iostream>\nint main() {{ long s = 0, x; while (std::cin >> x) s += x; std::cout << s << std::endl; }}\n",
+        "slow": "#include <iostream>\nint main() {{ volatile long n = 0; for (long i = 0; i < {spin}L * 20; i++) n += i; long s = 0, x; while (std::cin >> x) s += x; std::cout << s << std::endl; }}\n",
+        "crash": "#include <iostream>\nint main() {{ volatile int *p = nullptr; std::cout << *p << std::endl; }}\n",
+        "compile_error": "int main() {{ return }}\n",
+        "huge_output": "#include <iostream>\n#include <string>\nint main() {{ std::string line(1023, 'x'); for (long i = 0; i < {lines}; i++) std::cout << line << '\\n'; }}\n",
+        "infinite_loop": "int main() {{ volatile int running = 1; while (running) {{ }} }}\n"
+    }),
+    "Java": ("Main.java", "//", {
+        "fast": "import java.util.*;\npublic class Main {{ public static void main(String[] a) {{ Scanner in = new Scanner(System.in); long s = 0; while (in.hasNextLong()) s += in.nextLong(); System.out.println(s); }} }}\n",
+        "slow": "import java.util.*;\npublic class Main {{ static volatile long n; public static void main(String[] a) {{ for (long i = 0; i < {spin}L * 20; i++) n += i; Scanner in = new Scanner(System.in); long s = 0; while (in.hasNextLong()) s += in.nextLong(); System.out.println(s); }} }}\n",
+        "crash": "public class Main {{ public static void main(String[] a) {{ String s = null; System.out.println(s.length()); }} }}\n",
+        "compile_error": "public class Main {{ public static void main(String[] a) {{ return }} }}\n",
+        "huge_output": "public class Main {{ public static void main(String[] a) {{ String line = \"x\".repeat(1023); java.io.PrintStream out = new java.io.PrintStream(new java.io.BufferedOutputStream(System.out)); for (long i = 0; i < {lines}; i++) out.println(line); out.flush(); }} }}\n",
+        "infinite_loop": "public class Main {{ static volatile boolean running = true; public static void main(String[] a) {{ while (running) {{ }} }} }}\n"
+    }),
+    "Go": ("main.go", "//", {
+        "fast": "package main\nimport \"fmt\"\nfunc main() {{ var s, x int64; for {{ if _, err := fmt.Scan(&x); err != nil {{ break }}; s += x }}; fmt.Println(s) }}\n",
+        "slow": "package main\nimport \"fmt\"\nvar n int64\nfunc main() {{ for i := int64(0); i < {spin}*20; i++ {{ n += i }}; var s, x int64; for {{ if _, err := fmt.Scan(&x); err != nil {{ break }}; s += x }}; fmt.Println(s) }}\n",
+        "crash": "package main\nimport \"fmt\"\nfunc main() {{ var p *int; fmt.Println(*p) }}\n",
+        "compile_error": "package main\nfunc main() {{ return 1 }}\n",
+        "huge_output": "package main\nimport (\"bufio\"; \"os\"; \"strings\")\nfunc main() {{ w := bufio.NewWriter(os.Stdout); line := strings.Repeat(\"x\", 1023) + \"\\n\"; for i := 0; i < {lines}; i++ {{ w.WriteString(line) }}; w.Flush() }}\n",
+        "infinite_loop": "package main\nfunc main() {{ for {{ }} }}\n"
+    }),
+    "Ruby": ("main.rb", "#", {
+        "fast": "puts STDIN.read.split.map(&:to_i).sum\n",
+        "slow": "n = 0\n{spin}.times {{ |i| n += i }}\nputs STDIN.read.split.map(&:to_i).sum\n",
+        "crash": "puts STDIN.read.split.map(&:to_i).sum / 0\n",
+        "compile_error": "def main(\n",
+        "huge_output": "line = 'x' * 1023\n{lines}.times {{ puts line }}\n",
+        "infinite_loop": "loop {{ }}\n"
+    }),
+    "Node.js": ("main.js", "//", {
+        "fast": "const d = require('fs').readFileSync(0, 'utf8').split(/\\s+/).filter(Boolean);\nconsole.log(d.reduce((s, x) => s + Number(x), 0));\n",
+        "slow": "let n = 0;\nfor (let i = 0; i < {spin} * 10; i++) n += i;\nconst d = require('fs').readFileSync(0, 'utf8').split(/\\s+/).filter(Boolean);\nconsole.log(d.reduce((s, x) => s + Number(x), 0));\n",
+        "crash": "const d = null;\nconsole.log(d.length);\n",
+        "compile_error": "function main( {{\n",
+        "huge_output": "const line = 'x'.repeat(1023) + '\\n';\nfor (let i = 0; i < {lines}; i++) require('fs').writeSync(1, line);\n",
+        "infinite_loop": "for (;;) {{ }}\n"
+    }),
+    "Rust": ("main.rs", "//", {
+        "fast": "use std::io::Read;\nfn main() {{ let mut s = String::new(); std::io::stdin().read_to_string(&mut s).unwrap(); let t: i64 = s.split_whitespace().map(|x| x.parse::<i64>().unwrap()).sum(); println!(\"{{}}\", t); }}\n",
+        "slow": "use std::io::Read;\nfn main() {{ let mut n: u64 = 0; for i in 0..{spin}u64 * 20 {{ n = std::hint::black_box(n.wrapping_add(i)); }} let mut s = String::new(); std::io::stdin().read_to_string(&mut s).unwrap(); let t: i64 = s.split_whitespace().map(|x| x.parse::<i64>().unwrap()).sum(); println!(\"{{}}\", t); }}\n",
+        "crash": "fn main() {{ let v: Vec<i64> = Vec::new(); println!(\"{{}}\", v[std::hint::black_box(3)]); }}\n",
+        "compile_error": "fn main() {{ let x: i32 = \"text\"; }}\n",
+        "huge_output": "use std::io::Write;\nfn main() {{ let out = std::io::stdout(); let mut w = std::io::BufWriter::new(out.lock()); let line = \"x\".repeat(1023); for _ in 0..{lines} {{ if writeln!(w, \"{{}}\", line).is_err() {{ break; }} }} }}\n",
+        "infinite_loop": "fn main() {{ loop {{ std::hint::black_box(0); }} }}\n"
+    }),
+    "Kotlin": ("main.kt", "//", {
+        "fast": "fun main() {{ println(generateSequence(::readLine).flatMap {{ it.split(\" \").filter(String::isNotEmpty).asSequence() }}.sumOf {{ it.toLong() }}) }}\n",
+        "slow": "fun main() {{ var n = 0L; for (i in 0 until {spin}L * 20) n += i; println(generateSequence(::readLine).flatMap {{ it.split(\" \").filter(String::isNotEmpty).asSequence() }}.sumOf {{ it.toLong() }}) }}\n",
+        "crash": "fun main() {{ val s: String? = null; println(s!!.length) }}\n",
+        "compile_error": "fun main() {{ return 1 }}\n",
+        "huge_output": "fun main() {{ val line = \"x\".repeat(1023); val out = System.out.bufferedWriter(); repeat({lines}) {{ out.write(line); out.newLine() }}; out.flush() }}\n",
+        "infinite_loop": "fun main() {{ while (true) {{ }} }}\n"
+    })
+}
+
+
+def parse_mix(text):
+    """Parses "fast=60,slow=10,..." into a {kind: weight} dict."""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise ValueError(f"Unknown submission kind: {kind} (expected one of {', '.join(KINDS)})")
+        mix[kind] = int(weight)
+    return mix
+
+
+def assign_kinds(count, mix, seed):
+    """A shuffled list of `count` kinds in the proportions of `mix`, the same for the same seed."""
+    total = sum(mix.values())
+    kinds = []
+    for kind, weight in mix.items():
+        kinds.extend([kind] * round(count * weight / total))
+    kinds = (kinds + ["fast"] * count)[:count]
+    random.Random(seed).shuffle(kinds)
+    return kinds
+
+
+def language_config(language):
+    """The config the Configuration tab would create for `language`."""
+    return dict(POPULAR_LANGUAGES[language], config_name=f"bench-{language}", language=language)
+
+
+def generate_corpus(root, language, count=50, mix=None, seed=0, spin=DEFAULT_SPIN, huge_mb=DEFAULT_HUGE_MB,
+                    make_zips=True):
+    """
+    Writes a corpus for `language` under root:
+
+        root/submissions/<student>/<main file>   one folder per student
+        root/zips/<student>.zip                  the same sources zipped (with make_zips)
+        root/input.txt, root/expected.txt        the shared test case
+        root/project.json, root/config.json      ready for cli.py
+
+    Returns the project dict, which also lists each student's kind under "kinds".
+    """
+    main_name, comment, sources = SOURCES[language]
+    kinds = assign_kinds(count, mix or DEFAULT_MIX, seed)
+    rng = random.Random(seed)
+
+    shutil.rmtree(root, ignore_errors=True)
+    submissions = os.path.join(root, "submissions")
+    zips = os.path.join(root, "zips")
+    os.makedirs(submissions)
+    if make_zips:
+        os.makedirs(zips)
+
+    numbers = [rng.randint(-10 ** 6, 10 ** 6) for _ in range(INPUT_NUMBERS)]
+    with open(os.path.join(root, "input.txt"), "w") as f:
+        f.write(" ".join(map(str, numbers)) + "\n")
+    with open(os.path.join(root, "expected.txt"), "w") as f:
+        f.write(f"{sum(numbers)}\n")
+
+    width = len(str(count))
+    students = {}
+    for i, kind in enumerate(kinds, 1):
+        student_id = f"student{i:0{width}d}"
+        # The id comment keeps every source distinct, so nothing can be deduplicated by content.
+        source = f"{comment} {student_id} ({kind})\n" + sources[kind].format(spin=spin, lines=huge_mb * 1024)
+        folder = os.path.join(submissions, student_id)
+        os.makedirs(folder)
+        with open(os.path.join(folder, main_name), "w") as f:
+            f.write(source)
+        if make_zips:
+            with zipfile.ZipFile(os.path.join(zips, f"{student_id}.zip"), "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr(f"{student_id}/{main_name}", source)
+        students[student_id] = kind
+
+    config = language_config(language)
+    with open(os.path.join(root, "config.json"), "w") as f:
+        json.dump(config, f, indent=4)
+    project = {
+        "project_name": f"bench-{language}",
+        "config_file": os.path.abspath(os.path.join(root, "config.json")),
+        "zip_folder": os.path.abspath(submissions),
+        "input_type": "Standard Input",
+        "input_file": os.path.abspath(os.path.join(root, "input.txt")),
+        "expected_output_file": os.path.abspath(os.path.join(root, "expected.txt")),
+        "kinds": students
+    }
+    with open(os.path.join(root, "project.json"), "w") as f:
+        json.dump(project, f, indent=4)
+    return project
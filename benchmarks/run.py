@@ -0,0 +1,210 @@
+"""
+Grading benchmark: builds synthetic corpora (see benchmarks/corpus.py), grades
+them through the normal pipeline and reports throughput and per-phase latency.
+
+    python -m benchmarks.run --languages Python C --count 100 --save-baseline base.json
+    python -m benchmarks.run --languages Python C --count 100 --compare base.json
+
+Languages whose compiler or runtime is not installed are skipped. Compare
+mode exits with 1 when throughput dropped by more than --tolerance percent
+against the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import shlex
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from shutil import which
+
+from benchmarks.corpus import DEFAULT_HUGE_MB, DEFAULT_MIX, DEFAULT_SPIN, SOURCES, generate_corpus, parse_mix
+from core.executor import run_all_submissions
+from core.extraction import extract_all
+from core.profiling import Profiler
+
+BASELINE_VERSION = 1
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+REPORTED_PHASES = ("extract", "compile", "spawn", "run", "compare", "total")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark grading throughput on synthetic submissions.")
+    parser.add_argument("--languages", nargs="+", default=list(SOURCES),
+                        help="languages to benchmark (default: every one installed here)")
+    parser.add_argument("--count", type=int, default=50, help="submissions per language (default: 50)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="kind weights, e.g. fast=60,slow=10,crash=10,compile_error=10,huge_output=5,infinite_loop=5")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed (default: 0)")
+    parser.add_argument("--spin", type=int, default=DEFAULT_SPIN, help="loop iterations of slow submissions")
+    parser.add_argument("--huge-mb", type=int, default=DEFAULT_HUGE_MB, help="MiB printed by huge-output submissions")
+    parser.add_argument("--workers", type=int, help="parallel workers (default: CPU count)")
+    parser.add_argument("--time-limit", type=float, default=2.0, help="wall-clock seconds per run (default: 2)")
+    parser.add_argument("--output-limit-mb", type=float, default=8.0, help="output limit per run (default: 8)")
+    parser.add_argument("--repeat", type=int, default=1, help="grade each corpus this many times, keep the fastest")
+    parser.add_argument("--no-zip", action="store_true", help="skip the extraction phase")
+    parser.add_argument("--compile-cache", action="store_true", help="leave the compile cache on (off by default)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=JSON",
+                        help="extra project setting, e.g. --set warm_runner=true (repeatable)")
+    parser.add_argument("--corpus-dir", help="build corpora here instead of a temporary folder")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="throughput drop in percent that counts as a regression (default: 10)")
+    return parser.parse_args(argv)
+
+
+def available(language):
+    """True if the tools the language's config starts are installed."""
+    from core.configuration import POPULAR_LANGUAGES
+    config = POPULAR_LANGUAGES[language]
+    for command in (config["compile_command"], config["run_command"]):
+        tool = shlex.split(command)[0]
+        if "{" not in tool and not which(tool):
+            return False
+    return True
+
+
+def extra_settings(pairs):
+    settings = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        settings[key] = json.loads(value)
+    return settings
+
+
+def bench_language(language, root, args):
+    """Builds and grades one corpus; returns its metrics."""
+    project = generate_corpus(root, language, args.count, args.mix, args.seed, args.spin, args.huge_mb,
+                              make_zips=not args.no_zip)
+    with open(project["config_file"], "r") as f:
+        config = json.load(f)
+
+    best = None
+    for _ in range(max(1, args.repeat)):
+        profiler = Profiler()
+        project_data = dict(project, student_code_dir=project["zip_folder"], incremental=False,
+                            compile_cache=args.compile_cache,
+                            limits={"time_limit": args.time_limit, "output_limit_mb": args.output_limit_mb},
+                            **extra_settings(args.set))
+        started = time.perf_counter()
+        with redirect_stdout(open(os.devnull, "w")):
+            if not args.no_zip:
+                extract_all(os.path.join(root, "zips"), project["zip_folder"], args.workers, incremental=False,
+                            profiler=profiler)
+            results = run_all_submissions(config, project_data, workers=args.workers, profiler=profiler)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, results, profiler)
+
+    elapsed, results, profiler = best
+    summary = profiler.summary()
+    statuses = {}
+    for result in results:
+        kind = project["kinds"][result.student_id]
+        outcome = result.result if result.result != "-" else result.run_status
+        if result.compile_status != "Compiled":
+            outcome = result.compile_status
+        statuses.setdefault(kind, {}).setdefault(outcome, 0)
+        statuses[kind][outcome] += 1
+    return {
+        "submissions": len(results),
+        "seconds": elapsed,
+        "throughput": len(results) / elapsed if elapsed else 0.0,
+        "phases": {name: {key: stats[key] for key in ("count", "total", "p50", "p90", "p99", "max", "cpu_total")}
+                   for name, stats in summary["phases"].items() if name in REPORTED_PHASES},
+        "outcomes": statuses
+    }
+
+
+def format_report(results):
+    lines = []
+    for language, metrics in results.items():
+        lines.append(f"{language}: {metrics['submissions']} submissions in {metrics['seconds']:.2f}s "
+                     f"({metrics['throughput']:.2f}/s)")
+        lines.append(f"  {'phase':<10}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name in REPORTED_PHASES:
+            stats = metrics["phases"].get(name)
+            if stats:
+                lines.append(f"  {name:<10}{stats['count']:>7}{stats['total']:>10.2f}{stats['p50'] * 1000:>10.1f}"
+                             f"{stats['p90'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}{stats['max'] * 1000:>10.1f}")
+        for kind, outcomes in sorted(metrics["outcomes"].items()):
+            lines.append(f"  {kind:<14}" + ", ".join(f"{outcome}: {n}" for outcome, n in sorted(outcomes.items())))
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance):
+    """Prints throughput and p50 deltas against the baseline; returns True on a regression."""
+    regressed = False
+    print(f"\nAgainst baseline from {baseline.get('created', '?')} ({baseline['host'].get('machine', '?')}, "
+          f"{baseline['host'].get('cpu_count', '?')} CPUs):")
+    for language, metrics in results.items():
+        old = baseline["results"].get(language)
+        if not old:
+            print(f"  {language}: not in baseline")
+            continue
+        change = (metrics["throughput"] - old["throughput"]) / old["throughput"] * 100 if old["throughput"] else 0.0
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"  {language}: {old['throughput']:.2f}/s -> {metrics['throughput']:.2f}/s ({change:+.1f}%){flag}")
+        for name in REPORTED_PHASES:
+            before = old["phases"].get(name)
+            after = metrics["phases"].get(name)
+            if before and after and before["p50"]:
+                delta = (after["p50"] - before["p50"]) / before["p50"] * 100
+                print(f"    {name:<10} p50 {before['p50'] * 1000:8.1f}ms -> {after['p50'] * 1000:8.1f}ms ({delta:+.1f}%)")
+    return regressed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    languages = []
+    for language in args.languages:
+        if language not in SOURCES:
+            print(f"[!] Unknown language: {language}", file=sys.stderr)
+            return 2
+        if available(language):
+            languages.append(language)
+        else:
+            print(f"[-] Skipping {language}: its tools are not installed", file=sys.stderr)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="iae_bench_") as tmp:
+        base = args.corpus_dir or tmp
+        for language in languages:
+            print(f"[>] Benchmarking {language}...", file=sys.stderr)
+            results[language] = bench_language(language, os.path.join(base, language.replace("+", "p")), args)
+    print(format_report(results))
+
+    if args.save_baseline:
+        baseline = {
+            "version": BASELINE_VERSION,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "host": {"machine": platform.machine(), "system": platform.system(), "cpu_count": os.cpu_count(),
+                     "python": platform.python_version()},
+            "params": {key: value for key, value in vars(args).items()
+                       if key not in ("save_baseline", "compare", "corpus_dir")},
+            "results": results
+        }
+        with open(args.save_baseline, "w") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"[✓] Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != BASELINE_VERSION:
+            print(f"[!] Unsupported baseline version: {baseline.get('version')}", file=sys.stderr)
+            return 2
+        if compare(results, baseline, args.tolerance):
+            return EXIT_REGRESSION
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
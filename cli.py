@@ -0,0 +1,134 @@
+"""
+Headless entry point: grades a saved project without the GUI.
+
+    python cli.py project.json --workers 8 --timeout 10 --format csv --output results.csv
+
+The project may also be an SQLite project (.db), see core/store.py.
+
+Exits with 0 when grading ran (whatever the students scored) and with 2 when
+the project, its config or its submissions folder cannot be used, or when
+--save could not store the results.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing, nullcontext, redirect_stdout
+
+from core.configuration import load_configuration, resolve_config_path, validate_configuration
+from core.executor import run_all_submissions, save_results_to_project
+from core.profiling import Profiler
+from core.store import open_store
+
+EXIT_OK = 0
+EXIT_INFRASTRUCTURE_ERROR = 2
+CSV_COLUMNS = ["student_id", "compile_status", "run_status", "result", "compile_time", "run_time", "compare_time",
+               "exit_code", "signal", "output_bytes", "cases"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Grade every submission of an IAE project without the GUI.")
+    parser.add_argument("project", help="project file saved from the Project tab (.json or SQLite .db)")
+    parser.add_argument("--workers", type=int, help="number of students graded in parallel (default: CPU count)")
+    parser.add_argument("--timeout", type=float, help="wall-clock limit per run in seconds")
+    parser.add_argument("--config", help="config file to use instead of the project's config_file")
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="results format (default: json)")
+    parser.add_argument("--output", help="write results here instead of stdout")
+    parser.add_argument("--full", action="store_true", help="grade every student, ignoring unchanged fingerprints")
+    parser.add_argument("--save", action="store_true", help="also store the results in the project file")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="time every grading phase and export the profile (.json summary or .csv samples)")
+    return parser.parse_args(argv)
+
+
+def load_project(path):
+    with closing(open_store(path, create=False)) as store:
+        project_data = store.load()
+    project_data["student_code_dir"] = project_data.get("zip_folder")
+    project_data["project_file_path"] = path
+    return project_data
+
+
+def write_results(results, fmt, out):
+    if fmt == "json":
+        json.dump([result.to_dict() for result in results], out, indent=4)
+        out.write("\n")
+        return
+
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for result in results:
+        data = result.to_dict()
+        data["cases"] = ";".join(f"{case.name}={case.status}" for case in result.cases)
+        writer.writerow([data[column] for column in CSV_COLUMNS])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        project_data = load_project(args.project)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"[!] Cannot read project file {args.project}: {e}", file=sys.stderr)
+        return EXIT_INFRASTRUCTURE_ERROR
+
+    student_dir = project_data.get("student_code_dir")
+    if not student_dir or not os.path.isdir(student_dir):
+        print(f"[!] Student folder in the project file is missing or invalid: {student_dir}", file=sys.stderr)
+        return EXIT_INFRASTRUCTURE_ERROR
+
+    config_path = resolve_config_path(args.config or project_data.get("config_file"))
+    config = load_configuration(config_path) if config_path else None
+    if not config:
+        print(f"[!] Configuration file not found: {args.config or project_data.get('config_file')}", file=sys.stderr)
+        return EXIT_INFRASTRUCTURE_ERROR
+    problems = validate_configuration(config)
+    if problems:
+        print(f"[!] Invalid configuration {config_path}: {'; '.join(problems)}", file=sys.stderr)
+        return EXIT_INFRASTRUCTURE_ERROR
+
+    if args.timeout:
+        project_data.setdefault("limits", {})["time_limit"] = args.timeout
+    if args.full:
+        project_data["incremental"] = False
+
+    # The executor logs progress with print(); keep stdout clean for the results.
+    saved = True
+    try:
+        with redirect_stdout(sys.stderr):
+            profiler = Profiler() if args.profile else None
+            with closing(open_store(args.project)) if args.save else nullcontext() as store:
+                results = run_all_submissions(config, project_data, workers=args.workers, profiler=profiler,
+                                              store=store)
+            if args.save:
+                saved = save_results_to_project(args.project, results, project_data.get("fingerprints"),
+                                                project_data.get("file_index"))
+    except Exception as e:
+        print(f"[!] Grading failed: {e}", file=sys.stderr)
+        return EXIT_INFRASTRUCTURE_ERROR
+
+    if profiler:
+        print(profiler.format_summary(), file=sys.stderr)
+        try:
+            profiler.export(args.profile)
+        except OSError as e:
+            print(f"[!] Cannot write profile: {e}", file=sys.stderr)
+            return EXIT_INFRASTRUCTURE_ERROR
+
+    try:
+        if args.output:
+            with open(args.output, "w", newline="") as out:
+                write_results(results, args.format, out)
+        else:
+            write_results(results, args.format, sys.stdout)
+    except OSError as e:
+        print(f"[!] Cannot write results: {e}", file=sys.stderr)
+        return EXIT_INFRASTRUCTURE_ERROR
+    # The results are still written out above, so a failed save loses nothing but the project update.
+    return EXIT_OK if saved else EXIT_INFRASTRUCTURE_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
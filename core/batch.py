@@ -0,0 +1,127 @@
+import base64
+import glob
+import json
+import os
+import re
+
+from core.warm import DEFAULT_RUNNER_DIR, RUNNERS_DIR, build_java_helper, sibling_tool, split_command
+
+JAVA_BATCH_COMPILER = os.path.join(RUNNERS_DIR, "BatchCompiler.java")
+PYTHON_BATCH_COMPILER = os.path.join(RUNNERS_DIR, "batch_py_compile.py")
+
+# Students per batch below which another compiler process is not worth starting.
+MIN_BATCH_SIZE = 8
+# javac options followed by a path (made absolute) or by a plain value (kept as is).
+PATH_OPTIONS = ("-d", "-s", "-h", "-cp", "-classpath", "--class-path", "-sourcepath", "--source-path",
+                "-p", "--module-path", "-processorpath", "--processor-path")
+CLASSPATH_OPTIONS = ("-cp", "-classpath", "--class-path")
+SOURCEPATH_OPTIONS = ("-sourcepath", "--source-path")
+VALUE_OPTIONS = ("-encoding", "--release", "-source", "--source", "-target", "--target", "-processor",
+                 "--add-modules", "--limit-modules", "-m", "--module")
+
+
+def _absolute_args(args, cwd):
+    """javac arguments with every path made absolute and globs expanded, or None if unsupported."""
+    absolute = []
+    expect = None
+    for arg in args:
+        if expect == "path":
+            absolute.append(os.pathsep.join(os.path.join(cwd, part) for part in arg.split(os.pathsep)))
+            expect = None
+        elif expect == "value":
+            absolute.append(arg)
+            expect = None
+        elif arg.startswith("@") or arg.startswith("-J"):
+            # Argument files and runtime flags only make sense for a javac of their own.
+            return None
+        elif arg.startswith("-"):
+            absolute.append(arg)
+            expect = "path" if arg in PATH_OPTIONS else "value" if arg in VALUE_OPTIONS else None
+        elif any(c in arg for c in "*?["):
+            matches = sorted(glob.glob(os.path.join(cwd, arg)))
+            if not matches:
+                return None
+            absolute.extend(matches)
+        else:
+            absolute.append(os.path.join(cwd, arg))
+    if expect or any("\t" in arg or "\n" in arg for arg in absolute):
+        return None
+    return absolute
+
+
+def parse_batch_command(command, cwd):
+    """
+    Recognises compile commands that can join a batch: `javac [options]
+    sources` and `python -m py_compile files`. Returns (kind, tool, args)
+    with every path resolved against `cwd`, or None.
+
+    A javac of its own would look for the other classes of the submission
+    in its working directory; in a batch that is the grader's, so `cwd` is
+    added as the class path (and as the source path when neither is given).
+    """
+    argv = split_command(command)
+    if not argv:
+        return None
+    tool = os.path.basename(argv[0])
+    if tool == "javac":
+        args = _absolute_args(argv[1:], cwd)
+        if not args:
+            return None
+        if not any(arg in CLASSPATH_OPTIONS for arg in args):
+            if not any(arg in SOURCEPATH_OPTIONS for arg in args):
+                args = ["-sourcepath", cwd] + args
+            args = ["-cp", cwd] + args
+        return "java", argv[0], args
+    if re.fullmatch(r"python[\d.]*", tool) and argv[1:3] == ["-m", "py_compile"] and len(argv) > 3:
+        if any(arg.startswith("-") for arg in argv[3:]):
+            return None
+        return "python", argv[0], [os.path.join(cwd, arg) for arg in argv[3:]]
+    return None
+
+
+def split_batches(items, workers):
+    """Splits `items` into at most `workers` batches of at least MIN_BATCH_SIZE items (except when fewer)."""
+    count = max(1, min(workers, len(items) // MIN_BATCH_SIZE))
+    return [items[i::count] for i in range(count)]
+
+
+def helper_command(kind, tool, jobs_path, results_path, runner_dir=DEFAULT_RUNNER_DIR):
+    """argv that compiles the batch in jobs_path with the compiler `tool`, or None if unavailable."""
+    if kind == "java":
+        classes = build_java_helper(JAVA_BATCH_COMPILER, tool, runner_dir)
+        if not classes:
+            return None
+        return [sibling_tool(tool, "java"), "-cp", classes, "BatchCompiler", jobs_path, results_path]
+    return [tool, PYTHON_BATCH_COMPILER, jobs_path, results_path]
+
+
+def write_jobs(kind, jobs, path):
+    """Writes (student_id, args) jobs in the format the helper of `kind` reads."""
+    with open(path, "w", encoding="utf-8") as f:
+        if kind == "java":
+            for student_id, args in jobs:
+                f.write("\t".join([student_id] + args) + "\n")
+        else:
+            json.dump(jobs, f)
+
+
+def read_results(kind, path):
+    """{student_id: (success, log)} for every job the helper finished."""
+    results = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return results
+    for line in lines:
+        try:
+            if kind == "java":
+                student_id, status, log = line.split("\t")
+                results[student_id] = (status == "0", base64.b64decode(log).decode("utf-8", errors="replace"))
+            else:
+                student_id, success, log = json.loads(line)
+                results[student_id] = (bool(success), log)
+        except ValueError:
+            # A line cut short by a killed batch; that student is compiled again on its own.
+            continue
+    return results
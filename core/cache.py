@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+from core.commands import command_text
+
+SOURCE_EXTENSIONS = (".py", ".c", ".h", ".cpp", ".hpp", ".cc", ".java", ".kt", ".go", ".rb", ".js", ".rs")
+# One cache folder per user, so the grader's files do not follow its working directory around.
+CACHE_HOME = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "iae")
+DEFAULT_CACHE_DIR = os.path.join(CACHE_HOME, "compile")
+DEFAULT_MAX_MB = 512
+
+_toolchain_versions = {}
+_toolchain_lock = threading.Lock()
+
+
+def hash_file(path, digest=None):
+    """Feeds the file at `path` into `digest` (a new sha256 if omitted) and returns it."""
+    digest = digest or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest
+
+
+def hash_sources(student_path):
+    """Hex digest over the relative paths and contents of every source file under `student_path`."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(student_path):
+        dirs.sort()
+        for fname in sorted(files):
+            if not fname.endswith(SOURCE_EXTENSIONS):
+                continue
+            path = os.path.join(root, fname)
+            digest.update(os.path.relpath(path, student_path).encode("utf-8") + b"\0")
+            hash_file(path, digest)
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def toolchain_version(command):
+    """
+    Version banner of the compiler that `command` starts, e.g. the output of
+    `javac -version`. Looked up once per tool and remembered for the process.
+    """
+    parts = command if isinstance(command, list) else command.split()
+    tool = parts[0] if parts else ""
+    with _toolchain_lock:
+        if tool in _toolchain_versions:
+            return _toolchain_versions[tool]
+
+    version = ""
+    for flag in ("--version", "-version"):
+        try:
+            result = subprocess.run([tool, flag], capture_output=True, text=True, timeout=30)
+        except Exception:
+            continue
+        if result.returncode == 0:
+            version = (result.stdout + result.stderr).strip()
+            break
+
+    with _toolchain_lock:
+        _toolchain_versions[tool] = version
+    return version
+
+
+def snapshot_files(path):
+    """Maps every file under `path` (relative) to its (size, mtime_ns)."""
+    files = {}
+    for root, _, names in os.walk(path):
+        for fname in names:
+            full = os.path.join(root, fname)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            files[os.path.relpath(full, path)] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+class CompileCache:
+    """
+    On-disk cache of compilation results.
+
+    Entries are keyed by a hash of the student's sources, the expanded compile
+    command and the compiler version. An entry keeps the compiler log and a
+    copy of every file the compilation created or changed, so a hit restores
+    the artifacts into the student folder and skips the compiler entirely.
+    The least recently used entries are evicted once the cache grows past
+    max_mb.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._size = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def key(self, student_path, compile_command):
+        digest = hashlib.sha256()
+        for part in (hash_sources(student_path), command_text(compile_command), toolchain_version(compile_command)):
+            digest.update(part.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def lookup(self, key, cwd):
+        """Restores a cached compilation into `cwd`. Returns (success, log) or None on a miss."""
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, "meta.json")
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        artifacts = os.path.join(entry, "files")
+        for rel in meta.get("artifacts", []):
+            src = os.path.join(artifacts, rel)
+            dst = os.path.join(cwd, rel)
+            try:
+                src_st = os.stat(src)
+                dst_st = os.stat(dst)
+                if src_st.st_size == dst_st.st_size and src_st.st_mtime_ns == dst_st.st_mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+            except OSError:
+                return None
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(src, dst)
+
+        # The meta file's mtime doubles as the entry's last-used time for LRU eviction.
+        now = time.time()
+        os.utime(meta_path, (now, now))
+        return meta["success"], meta["log"]
+
+    def store(self, key, cwd, before, success, log):
+        """Saves the files that changed in `cwd` since the `before` snapshot along with the result."""
+        after = snapshot_files(cwd)
+        changed = sorted(rel for rel, stat in after.items() if before.get(rel) != stat)
+
+        entry = self._entry_dir(key)
+        staging = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        size = 0
+        try:
+            for rel in changed:
+                dst = os.path.join(staging, "files", rel)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(os.path.join(cwd, rel), dst)
+                size += os.path.getsize(dst)
+            os.makedirs(staging, exist_ok=True)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"success": success, "log": log, "artifacts": changed}, f)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except OSError as e:
+            print(f"[!] Failed to cache compilation: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for bucket in os.listdir(self.root):
+            bucket_path = os.path.join(self.root, bucket)
+            if not os.path.isdir(bucket_path):
+                continue
+            for name in os.listdir(bucket_path):
+                if not name.endswith(".tmp"):
+                    yield os.path.join(bucket_path, name)
+
+    @staticmethod
+    def _entry_size(entry):
+        return sum(size for size, _ in snapshot_files(entry).values())
+
+    def _disk_usage(self):
+        return sum(self._entry_size(entry) for entry in self._entries())
+
+    def _evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                last_used = os.path.getmtime(os.path.join(entry, "meta.json"))
+            except OSError:
+                last_used = 0
+            entries.append((last_used, entry))
+        entries.sort()
+
+        # Shrink to 90% of the limit so a full cache does not evict on every store.
+        target = self.max_bytes * 0.9
+        for _, entry in entries:
+            if self._size <= target:
+                break
+            self._size -= self._entry_size(entry)
+            shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,198 @@
+"""
+Compile and run commands as argv templates, and the launcher that starts them.
+
+A config command such as "javac -d {main_dir} {main_file}" is parsed once
+into argv tokens. Expanding it for a student substitutes the placeholders
+inside each token, so a file name with spaces, quotes or shell syntax in it
+stays a single argument and is never interpreted. Commands that really use
+the shell (pipes, redirections, &&, $VARS, ...) keep going through /bin/sh,
+with each placeholder quoted for where it stands: "{main_file}" and
+'{main_file}' in a template stay one word just like a bare {main_file}.
+"""
+import functools
+import glob
+import os
+import shlex
+import signal
+import subprocess
+import time
+
+PLACEHOLDERS = ("{main_file}", "{main_dir}")
+SHELL_OPERATOR_CHARS = "();<>|&"
+GLOB_CHARS = "*?["
+# posix_spawn cannot change directory or set rlimits, so it is only used for plain launches.
+USE_POSIX_SPAWN = hasattr(os, "posix_spawnp") and hasattr(os, "POSIX_SPAWN_DUP2")
+
+
+def needs_shell(command):
+    """True if `command` uses shell syntax that an argv cannot express."""
+    if "$" in command or "`" in command:
+        return True
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=SHELL_OPERATOR_CHARS)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return True
+    return any(token and all(c in SHELL_OPERATOR_CHARS for c in token) for token in tokens)
+
+
+def command_text(command):
+    """A command for logs and cache keys: shell strings as they are, argv lists shell-quoted."""
+    return command if isinstance(command, str) else shlex.join(command)
+
+
+def _shell_substitute(template, values):
+    """
+    `template` with every placeholder in `values` replaced, quoted for the
+    shell according to the quotes the placeholder stands in: shlex.quote()
+    outside quotes, backslash escapes inside double quotes, and closing
+    and reopening the quotes inside single quotes.
+    """
+    parts = []
+    quote = None
+    i = 0
+    while i < len(template):
+        placeholder = next((p for p in values if template.startswith(p, i)), None)
+        if placeholder:
+            value = values[placeholder]
+            if quote == "'":
+                parts.append("'" + shlex.quote(value) + "'")
+            elif quote == '"':
+                parts.append("".join("\\" + c if c in '\\"$`' else c for c in value))
+            else:
+                parts.append(shlex.quote(value))
+            i += len(placeholder)
+            continue
+        c = template[i]
+        if c == "\\" and quote != "'":
+            parts.append(template[i:i + 2])
+            i += 2
+            continue
+        if c in "'\"" and quote in (None, c):
+            quote = None if quote else c
+        parts.append(c)
+        i += 1
+    return "".join(parts)
+
+
+class CommandTemplate:
+    """
+    A compile or run command from a config, parsed once. expand() returns
+    an argv list, or a shell string for commands that need the shell.
+    """
+
+    def __init__(self, template):
+        self.template = template.strip()
+        self.shell = needs_shell(self.template)
+        self.tokens = [] if self.shell else shlex.split(self.template)
+
+    def expand(self, main_file, cwd=None, extra_args=""):
+        """
+        Fills {main_file} and {main_dir} for one submission. Tokens of the
+        template that hold glob characters are matched in `cwd` (and kept
+        as they are when nothing matches, like the shell does). extra_args
+        is the per-run argument string, split like a shell would.
+        """
+        main_dir = os.path.dirname(main_file)
+        if self.shell:
+            command = _shell_substitute(self.template, {"{main_file}": main_file, "{main_dir}": main_dir})
+            return f"{command} {extra_args}" if extra_args else command
+
+        argv = []
+        for token in self.tokens:
+            if token.startswith("~"):
+                token = os.path.expanduser(token)
+            if any(c in token for c in GLOB_CHARS) and not any(p in token for p in PLACEHOLDERS):
+                matches = sorted(glob.glob(token, root_dir=cwd))
+                if matches:
+                    argv.extend(matches)
+                    continue
+            argv.append(token.replace("{main_file}", main_file).replace("{main_dir}", main_dir))
+        if extra_args:
+            argv.extend(shlex.split(extra_args))
+        return argv
+
+
+@functools.lru_cache(maxsize=64)
+def parse_command(template):
+    """The CommandTemplate for a config command, parsed once per distinct string."""
+    return CommandTemplate(template)
+
+
+class SpawnedProcess:
+    """The part of the Popen interface the executor uses, for a process started with os.posix_spawnp."""
+
+    def __init__(self, argv, stdin=None, stdout=None, stderr=None, env=None):
+        self.args = argv
+        self.returncode = None
+        devnull = None
+        actions = []
+        for target, stream in ((0, stdin), (1, stdout), (2, stderr)):
+            if stream is None:
+                continue
+            if stream == subprocess.DEVNULL:
+                if devnull is None:
+                    devnull = os.open(os.devnull, os.O_RDWR)
+                fd = devnull
+            else:
+                fd = stream if isinstance(stream, int) else stream.fileno()
+            actions.append((os.POSIX_SPAWN_DUP2, fd, target))
+        try:
+            self.pid = os.posix_spawnp(argv[0], argv, os.environ if env is None else env, file_actions=actions,
+                                       setsid=True)
+        finally:
+            if devnull is not None:
+                os.close(devnull)
+
+    def poll(self):
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if self.returncode is not None:
+            return self.returncode
+        if timeout is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.returncode = os.waitstatus_to_exitcode(status)
+            return self.returncode
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while self.poll() is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+def launch(command, stdin=None, stdout=None, stderr=None, cwd=None, preexec_fn=None, env=None):
+    """
+    Starts `command` in a new session (so its process group can be killed
+    as a whole) and returns a Popen-like object. An argv list is executed
+    directly; a string goes through /bin/sh. Plain launches (no cwd, no
+    preexec_fn) use posix_spawn where available, saving the fork of the
+    grader's address space.
+
+    `env` holds variables added to the grader's environment; the merged
+    environment is built here, in the parent, and handed to the exec.
+    """
+    env = dict(os.environ, **env) if env else None
+    if isinstance(command, str):
+        return subprocess.Popen(command, shell=True, stdin=stdin, stdout=stdout, stderr=stderr, cwd=cwd,
+                                start_new_session=True, preexec_fn=preexec_fn, env=env)
+    if USE_POSIX_SPAWN and cwd is None and preexec_fn is None:
+        return SpawnedProcess(command, stdin, stdout, stderr, env)
+    return subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=stderr, cwd=cwd,
+                            start_new_session=True, preexec_fn=preexec_fn, env=env)
@@ -0,0 +1,429 @@
+import hashlib
+import math
+import re
+import tempfile
+from functools import lru_cache
+from itertools import zip_longest
+
+CHUNK_SIZE = 64 * 1024
+MAX_ITEM_SIZE = 1024 * 1024
+COMPARATORS = {}
+_MASK_64 = (1 << 64) - 1
+WHITESPACE = b" \t\n\r\x0b\x0c"
+# Whitespace runs holding a line break, except a lone \n which is already normal.
+_LINE_BREAK = re.compile(rb"[ \t\x0b\x0c]+\n[ \t\n\x0b\x0c]*|\n[ \t\n\x0b\x0c]+")
+_ANY_LINE_BREAK = re.compile(rb"[ \t\x0b\x0c]*\n[ \t\n\x0b\x0c]*")
+_BLANK_RUN = re.compile(rb"[ \t\x0b\x0c]{2,}|[\t\x0b\x0c]")
+# Maps every blank except \n to a space, so a few substring checks tell whether
+# a chunk needs the (much slower) regex at all.
+_FOLD_BLANKS = bytes.maketrans(b"\t\x0b\x0c", b"   ")
+
+
+class _PendingWhitespace:
+    """
+    Whitespace that is only emitted if more content follows it. Kept in memory
+    up to CHUNK_SIZE and spilled to a temporary file beyond that, so a run of
+    gigabytes of spaces still costs constant memory.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.spill = None
+        self.newline = False
+
+    def append(self, data):
+        if not data:
+            return
+        if b"\n" in data:
+            self.newline = True
+        if self.spill is None and len(self.data) + len(data) <= CHUNK_SIZE:
+            self.data += data
+            return
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile()
+            self.spill.write(self.data)
+            self.data = bytearray()
+        self.spill.write(data)
+
+    def __bool__(self):
+        return bool(self.data) or self.spill is not None
+
+    def drain(self):
+        if self.spill is not None:
+            self.spill.seek(0)
+            for chunk in iter(lambda: self.spill.read(CHUNK_SIZE), b""):
+                yield chunk
+        elif self.data:
+            yield bytes(self.data)
+        self.clear()
+
+    def clear(self):
+        self.data = bytearray()
+        self.newline = False
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+
+def read_chunks(path):
+    """
+    Yields the file in binary chunks with universal newlines applied, the
+    same translation text mode does: \r\n and lone \r become \n.
+    """
+    carry = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            chunk = carry + chunk
+            carry = b""
+            if chunk.endswith(b"\r"):
+                # The matching \n may be the first byte of the next chunk.
+                chunk, carry = chunk[:-1], b"\r"
+            yield chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    if carry:
+        yield b"\n"
+
+
+def _stripped_chunks(path, line_break=None, blank=None):
+    """
+    Yields the file with leading and trailing whitespace removed. Whitespace
+    is held back until the next non-whitespace byte shows up, so the tail of
+    the file is never emitted.
+
+    When line_break is given, every whitespace run containing a line break is
+    replaced by it (b"\n" strips each line and drops blank ones). When blank
+    is given, every other whitespace run is replaced by it.
+    """
+    pending = _PendingWhitespace()
+    started = False
+    try:
+        for chunk in read_chunks(path):
+            if not started:
+                chunk = chunk.lstrip(WHITESPACE)
+                if not chunk:
+                    continue
+                started = True
+            core = chunk.rstrip(WHITESPACE)
+            if not core:
+                pending.append(chunk)
+                continue
+            trailing = chunk[len(core):]
+            if line_break is not None or blank is not None:
+                body = core.lstrip(WHITESPACE)
+                lead = core[:len(core) - len(body)]
+                if pending or lead:
+                    # A whitespace run spans the chunk boundary; replace it as a whole.
+                    has_newline = pending.newline or b"\n" in lead
+                    replacement = line_break if has_newline else blank
+                    if replacement is not None:
+                        pending.clear()
+                        pending.append(replacement)
+                        core = body
+                core = _normalize_runs(core, line_break, blank)
+            yield from pending.drain()
+            yield core
+            pending.append(trailing)
+    finally:
+        pending.clear()
+
+
+def _normalize_runs(data, line_break, blank):
+    folded = data.translate(_FOLD_BLANKS)
+    if line_break == b" " and blank == b" ":
+        return b" ".join(data.split())
+    if line_break == b"\n":
+        if b" \n" in folded or b"\n " in folded or b"\n\n" in folded:
+            data = _LINE_BREAK.sub(b"\n", data)
+    elif line_break is not None and b"\n" in folded:
+        data = _ANY_LINE_BREAK.sub(line_break, data)
+    if blank is not None and (b"  " in folded or folded != data):
+        data = _BLANK_RUN.sub(blank, data)
+    return data
+
+
+def exact_stream(path):
+    """The file as read().strip() sees it."""
+    return _stripped_chunks(path)
+
+
+def lines_stream(path):
+    """
+    The file as normalize_output() sees it: every line stripped, blank lines
+    dropped, and the remaining lines joined with \n.
+    """
+    return _stripped_chunks(path, line_break=b"\n")
+
+
+def whitespace_stream(path):
+    """Like lines_stream(), with every run of blanks inside a line collapsed to one space."""
+    return _stripped_chunks(path, line_break=b"\n", blank=b" ")
+
+
+def tokens_stream(path):
+    """The whitespace-separated tokens of the file joined by single spaces."""
+    return _stripped_chunks(path, line_break=b" ", blank=b" ")
+
+
+def split_batches(chunks, separator):
+    """
+    Splits a chunk stream on `separator` and yields the items in lists, one
+    list per chunk, without ever holding more than MAX_ITEM_SIZE bytes of a
+    single item. Longer items are replaced by a marker holding their
+    SHA-256, computed incrementally, so two equal long items still compare
+    equal.
+    """
+    carry = bytearray()
+    digest = None
+    seen = False
+
+    for chunk in chunks:
+        seen = True
+        parts = chunk.split(separator)
+        if len(parts) == 1:
+            head, batch = parts[0], []
+        else:
+            head, batch = parts[0], parts[1:-1]
+        if digest is not None:
+            digest.update(head)
+        elif len(carry) + len(head) > MAX_ITEM_SIZE:
+            digest = hashlib.sha256(carry)
+            digest.update(head)
+            carry = bytearray()
+        else:
+            carry += head
+        if len(parts) == 1:
+            continue
+
+        first = b"\0sha256:" + digest.digest() if digest is not None else bytes(carry)
+        batch = [first] + [item if len(item) <= MAX_ITEM_SIZE else b"\0sha256:" + hashlib.sha256(item).digest()
+                           for item in batch]
+        tail = parts[-1]
+        if len(tail) > MAX_ITEM_SIZE:
+            carry, digest = bytearray(), hashlib.sha256(tail)
+        else:
+            carry, digest = bytearray(tail), None
+        yield batch
+    if seen:
+        yield [b"\0sha256:" + digest.digest() if digest is not None else bytes(carry)]
+
+
+def split_items(chunks, separator):
+    """split_batches() flattened into single items."""
+    for batch in split_batches(chunks, separator):
+        yield from batch
+
+
+def compare_streams(actual, expected):
+    """
+    Compares two iterables of byte chunks without joining them. Returns
+    (True, None) when equal, otherwise (False, (byte_offset, line_number))
+    of the first difference within the streams.
+    """
+    actual = iter(actual)
+    expected = iter(expected)
+    a, b = b"", b""
+    a_pos = b_pos = 0
+    offset = 0
+    line = 1
+    try:
+        while True:
+            if a_pos == len(a):
+                a, a_pos = next(actual, None), 0
+            if b_pos == len(b):
+                b, b_pos = next(expected, None), 0
+            if a is None or b is None:
+                if a is None and b is None:
+                    return True, None
+                return False, (offset, line)
+
+            n = min(len(a) - a_pos, len(b) - b_pos)
+            a_part = a[a_pos:a_pos + n]
+            b_part = b[b_pos:b_pos + n]
+            if a_part != b_part:
+                i = 0
+                while a_part[i] == b_part[i]:
+                    i += 1
+                return False, (offset + i, line + a_part.count(b"\n", 0, i))
+            offset += n
+            line += a_part.count(b"\n")
+            a_pos += n
+            b_pos += n
+    finally:
+        _close(actual, expected)
+
+
+def _close(*streams):
+    for stream in streams:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+
+def register_comparator(name):
+    """
+    Decorator adding a comparator to COMPARATORS. A comparator is called as
+    fn(output_file, expected_output_file, **options) and returns
+    (matched, detail) where detail describes the first difference.
+    """
+    def decorator(fn):
+        COMPARATORS[name] = fn
+        return fn
+    return decorator
+
+
+def _compare_normalized(normalize, output_file, expected_output_file):
+    matched, mismatch = compare_streams(normalize(output_file), normalize(expected_output_file))
+    if matched:
+        return True, None
+    byte_offset, line = mismatch
+    return False, f"line {line}, byte {byte_offset}"
+
+
+@register_comparator("exact")
+def compare_exact(output_file, expected_output_file):
+    """Byte equality once leading and trailing whitespace is stripped."""
+    return _compare_normalized(exact_stream, output_file, expected_output_file)
+
+
+@register_comparator("lines")
+def compare_lines(output_file, expected_output_file):
+    """Equality of the stripped, non-blank lines."""
+    return _compare_normalized(lines_stream, output_file, expected_output_file)
+
+
+@register_comparator("whitespace")
+def compare_whitespace(output_file, expected_output_file):
+    """Line-by-line equality with any run of spaces or tabs counting as one space."""
+    return _compare_normalized(whitespace_stream, output_file, expected_output_file)
+
+
+@register_comparator("tokens")
+def compare_tokens(output_file, expected_output_file):
+    """Equality of the whitespace-separated tokens, ignoring line structure."""
+    return _compare_normalized(tokens_stream, output_file, expected_output_file)
+
+
+def _as_number(token):
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+@register_comparator("numeric")
+def compare_numeric(output_file, expected_output_file, abs_tol=1e-6, rel_tol=1e-9):
+    """
+    Token-by-token comparison where tokens that both parse as numbers only
+    have to agree within abs_tol or rel_tol; other tokens must be equal.
+    """
+    actual = split_batches(tokens_stream(output_file), b" ")
+    expected = split_batches(tokens_stream(expected_output_file), b" ")
+    a, b = [], []
+    a_pos = b_pos = 0
+    index = 0
+    try:
+        while True:
+            if a_pos == len(a):
+                a, a_pos = next(actual, None), 0
+            if b_pos == len(b):
+                b, b_pos = next(expected, None), 0
+            if a is None or b is None:
+                if a is None and b is None:
+                    return True, None
+                return False, f"token {index + 1}: " + ("output ended early" if a is None else "unexpected extra output")
+
+            n = min(len(a) - a_pos, len(b) - b_pos)
+            # Identical stretches are compared as whole lists; only differing ones are parsed.
+            if a[a_pos:a_pos + n] != b[b_pos:b_pos + n]:
+                for i in range(n):
+                    x_token, y_token = a[a_pos + i], b[b_pos + i]
+                    if x_token == y_token:
+                        continue
+                    x, y = _as_number(x_token), _as_number(y_token)
+                    if x is None or y is None or not math.isclose(x, y, rel_tol=float(rel_tol), abs_tol=float(abs_tol)):
+                        return False, f"token {index + i + 1}: expected {y_token[:40]!r}, got {x_token[:40]!r}"
+            index += n
+            a_pos += n
+            b_pos += n
+    finally:
+        _close(actual, expected)
+
+
+def _multiset_digest(chunks):
+    """
+    Order-independent digest of the lines in `chunks`: the sum of the line
+    hashes plus the line count. Python's string hash is keyed per process,
+    so the sums are only comparable within one grading process.
+    """
+    total = 0
+    count = 0
+    for batch in split_batches(chunks, b"\n"):
+        total = (total + sum(map(hash, batch))) & _MASK_64
+        count += len(batch)
+    return total, count
+
+
+@register_comparator("unordered_lines")
+def compare_unordered_lines(output_file, expected_output_file):
+    """The stripped, non-blank lines must match as a multiset, in any order."""
+    actual = _multiset_digest(lines_stream(output_file))
+    expected = _multiset_digest(lines_stream(expected_output_file))
+    if actual == expected:
+        return True, None
+    return False, f"lines differ ({actual[1]} lines, expected {expected[1]})"
+
+
+@lru_cache(maxsize=1024)
+def _compile_pattern(pattern):
+    return re.compile(pattern)
+
+
+@register_comparator("regex")
+def compare_regex(output_file, expected_output_file):
+    """
+    The expected output file holds one regular expression per line; each
+    stripped, non-blank output line must fully match the pattern at the same
+    position.
+    """
+    actual = split_items(lines_stream(output_file), b"\n")
+    expected = split_items(lines_stream(expected_output_file), b"\n")
+    try:
+        for index, (line, pattern) in enumerate(zip_longest(actual, expected), 1):
+            if line is None:
+                return False, f"line {index}: output ended early"
+            if pattern is None:
+                return False, f"line {index}: unexpected extra output"
+            if not _compile_pattern(pattern).fullmatch(line):
+                return False, f"line {index} does not match {pattern[:60]!r}"
+        return True, None
+    finally:
+        _close(actual, expected)
+
+
+def resolve_comparator(spec):
+    """
+    Turns a comparator setting into (mode, options). The setting is either a
+    mode name such as "numeric" or a dict like
+    {"mode": "numeric", "abs_tol": 0.001}. None means "exact".
+    """
+    if not spec:
+        return "exact", {}
+    if isinstance(spec, str):
+        mode, options = spec, {}
+    else:
+        options = dict(spec)
+        mode = options.pop("mode", "exact")
+    if mode not in COMPARATORS:
+        raise ValueError(f"Unknown comparison mode: {mode}")
+    return mode, options
+
+
+def compare_files(output_file, expected_output_file, mode="exact", **options):
+    """
+    Compares a program's output with the expected output using the
+    comparator registered as `mode`. Every comparator streams both files, so
+    memory use does not depend on the size of the output. Returns
+    (matched, detail) where detail describes the first difference.
+    """
+    if mode not in COMPARATORS:
+        raise ValueError(f"Unknown comparison mode: {mode}")
+    return COMPARATORS[mode](output_file, expected_output_file, **options)
@@ -1,5 +1,37 @@
+"""
+Language configs: the JSON files in /configs.
+
+A config holds the commands of one language plus optional settings that
+apply to every project using it (a project can override each of them):
+
+    {
+        "schema_version": 2,
+        "config_name": "java",
+        "language": "Java",
+        "compile_command": "javac -d {main_dir} {main_file}",
+        "run_command": "java -cp {main_dir} Main",
+        "input_type": "Standard Input",
+        "limits": {"time_limit": 5, "compile_time_limit": 60},
+        "env": {"JAVA_TOOL_OPTIONS": "-Xss8m"},
+        "max_parallel": 4,
+        "comparator": "lines",
+        "entry_point": {"main": "java"}
+    }
+
+Files written before "schema_version" existed (version 1) are migrated
+and rewritten the first time they are loaded. CONFIG_FIELDS lists every
+setting; validate_configuration() checks a config against it.
+"""
+import copy
 import json
 import os
+import shlex
+import threading
+
+from core.compare import resolve_comparator
+from core.discovery import entry_point_rules
+from core.sandbox import SandboxError, sandbox_settings
+from core.scratch import KEEP_POLICIES
 
 POPULAR_LANGUAGES = {
     "C": {
@@ -12,7 +44,9 @@ POPULAR_LANGUAGES = {
     },
     "Java": {
         "compile_command": "javac -d {main_dir} {main_file}",
-        "run_command": "java -cp {main_dir} Main"
+        "run_command": "java -cp {main_dir} Main",
+        # Every JVM takes a core and a few hundred MB; more of them at once only thrash.
+        "max_parallel": 4
     },
     "Python": {
         "compile_command": "python -m py_compile {main_file}",
@@ -36,11 +70,127 @@ POPULAR_LANGUAGES = {
     },
     "Kotlin": {
         "compile_command": "kotlinc {main_file} -include-runtime -d {main_dir}/main.jar",
-        "run_command": "java -jar {main_dir}/main.jar"
+        "run_command": "java -jar {main_dir}/main.jar",
+        "max_parallel": 4
     }
 }
 
 
+CONFIG_SCHEMA_VERSION = 2
+INPUT_TYPES = ("Standard Input", "Command-line Arguments", "None")
+LIMIT_KEYS = ("time_limit", "cpu_time_limit", "compile_time_limit", "memory_limit_mb", "output_limit_mb",
+              "process_limit")
+REQUIRED_FIELDS = ("language", "run_command")
+# The settings a config may carry and the JSON types each accepts.
+CONFIG_FIELDS = {
+    "schema_version": (int,),
+    "config_name": (str,),
+    "language": (str,),
+    "compile_command": (str,),
+    "run_command": (str,),
+    "input_type": (str,),
+    "limits": (dict,),
+    "env": (dict,),
+    "max_parallel": (int,),
+    "comparator": (str, dict),
+    "test_comparators": (dict,),
+    "entry_point": (str, dict, list),
+    "warm_runner": (bool,),
+    "batch_compile": (bool,),
+    "sandbox": (str, dict),
+    "compile_cache": (bool,),
+    "compile_cache_mb": (int, float),
+    "keep_outputs": (str,),
+    "output_dir": (str,),
+}
+
+
+def validate_configuration(config):
+    """
+    The problems that keep `config` from being used, as readable
+    messages; an empty list means it is valid. Unknown keys are allowed.
+    """
+    if not isinstance(config, dict):
+        return ["a configuration must be a JSON object"]
+
+    problems = [f"'{field}' is missing" for field in REQUIRED_FIELDS if not config.get(field)]
+    for field, types in CONFIG_FIELDS.items():
+        value = config.get(field)
+        if value is not None and (not isinstance(value, types) or (bool not in types and isinstance(value, bool))):
+            expected = " or ".join({str: "text", dict: "an object", list: "a list", bool: "true/false",
+                                    int: "a number", float: "a number"}[t] for t in dict.fromkeys(types))
+            problems.append(f"'{field}' must be {expected}")
+    if problems:
+        return problems
+
+    if config.get("schema_version", 1) > CONFIG_SCHEMA_VERSION:
+        return [f"written for config schema {config['schema_version']}; this version reads up to "
+                f"{CONFIG_SCHEMA_VERSION}"]
+    if config.get("input_type", "Standard Input") not in INPUT_TYPES:
+        problems.append(f"'input_type' must be one of {', '.join(INPUT_TYPES)}")
+    for key, value in (config.get("limits") or {}).items():
+        if key not in LIMIT_KEYS:
+            problems.append(f"unknown limit '{key}' (expected one of {', '.join(LIMIT_KEYS)})")
+        elif value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+            problems.append(f"limit '{key}' must be a non-negative number")
+    for key, value in (config.get("env") or {}).items():
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            problems.append(f"environment variable '{key}' must be text or a number")
+    if config.get("max_parallel") is not None and config["max_parallel"] < 1:
+        problems.append("'max_parallel' must be at least 1")
+    if config.get("keep_outputs", "failures") not in KEEP_POLICIES:
+        problems.append(f"'keep_outputs' must be one of {', '.join(KEEP_POLICIES)}")
+    checks = [lambda: entry_point_rules(config), lambda: sandbox_settings(config.get("sandbox"))]
+    checks += [lambda spec=spec: resolve_comparator(spec)
+               for spec in [config.get("comparator"), *(config.get("test_comparators") or {}).values()]]
+    for check in checks:
+        try:
+            check()
+        except (ValueError, TypeError, SandboxError) as e:
+            problems.append(str(e))
+    return problems
+
+
+def parse_environment(text):
+    """{"KEY": "VALUE"} from the "KEY=VALUE KEY2='two words'" form the config editor shows."""
+    env = {}
+    for item in shlex.split(text or ""):
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"environment entry '{item}' is not KEY=VALUE")
+        env[key] = value
+    return env
+
+
+def format_environment(env):
+    return " ".join(f"{key}={shlex.quote(str(value))}" for key, value in (env or {}).items())
+
+
+def _migrate_v1(config):
+    # Version 1 files only had the name, language and commands; input_type was read but never written.
+    config.setdefault("input_type", "Standard Input")
+
+
+# Schema version -> function upgrading a config of that version to the next one.
+MIGRATIONS = {1: _migrate_v1}
+
+
+def migrate_configuration(config):
+    """Upgrades `config` in place to CONFIG_SCHEMA_VERSION. Returns True if it changed."""
+    version = config.get("schema_version", 1)
+    if not isinstance(version, int) or version >= CONFIG_SCHEMA_VERSION:
+        return False
+    while version < CONFIG_SCHEMA_VERSION:
+        MIGRATIONS[version](config)
+        version += 1
+    # Keep the version first in the rewritten file.
+    settings = {key: value for key, value in config.items() if key != "schema_version"}
+    config.clear()
+    config["schema_version"] = version
+    config.update(settings)
+    return True
+
+
 def load_configuration(file_path):
     if not os.path.isabs(file_path) and "configs" not in file_path:
         file_path = os.path.join("configs", file_path)
@@ -57,6 +207,14 @@ def load_configuration(file_path):
         if "config_name" not in config:
             config["config_name"] = os.path.splitext(os.path.basename(file_path))[0]
 
+        if isinstance(config, dict) and migrate_configuration(config):
+            try:
+                with open(file_path, 'w') as file:
+                    json.dump(config, file, indent=4)
+                print(f"[✓] Configuration {file_path} migrated to schema {CONFIG_SCHEMA_VERSION}")
+            except OSError as e:
+                print(f"[!] Could not rewrite migrated configuration {file_path}: {e}")
+
         return config
     except json.JSONDecodeError:
         print(f"[!] Configuration file is not a valid JSON: {file_path}")
@@ -68,6 +226,7 @@ def save_configuration(config_data, file_path):
         # config_name eksikse dosya adından belirle
         if "config_name" not in config_data:
             config_data["config_name"] = os.path.splitext(os.path.basename(file_path))[0]
+        config_data.setdefault("schema_version", CONFIG_SCHEMA_VERSION)
 
         with open(file_path, 'w') as file:
             json.dump(config_data, file, indent=4)
@@ -77,8 +236,135 @@ def save_configuration(config_data, file_path):
         print(f"[!] Failed to save configuration: {e}")
 
 
+def resolve_config_path(config_file, config_dir="configs"):
+    """Path of a project's config_file; bare names are looked up in config_dir. None if missing."""
+    if not config_file:
+        return None
+    if os.path.isfile(config_file):
+        return config_file
+    candidate = os.path.join(config_dir, config_file)
+    if os.path.isfile(candidate):
+        return candidate
+    return None
+
+
 def list_config_files(config_dir="configs"):
     """Return list of available .json config files in the given directory."""
     if not os.path.exists(config_dir):
         os.makedirs(config_dir)
     return [f for f in os.listdir(config_dir) if f.endswith(".json")]
+
+
+class ConfigRegistry:
+    """
+    The configs in `config_dir`, loaded and validated once and then served
+    from memory. Each lookup costs a stat: names() re-lists the folder
+    only when its modification time changed, and get() re-reads a file
+    only when its modification time or size changed. Config files given
+    by a path outside the folder are cached the same way. One registry is
+    shared by every tab; it is safe to use from several threads.
+    """
+
+    def __init__(self, config_dir="configs"):
+        self.config_dir = config_dir
+        self._lock = threading.Lock()
+        # Held while a file is (re)loaded, so two threads never migrate and rewrite the same file together.
+        self._load_lock = threading.Lock()
+        self._names = []
+        self._dir_mtime = None
+        # Absolute path -> (mtime_ns, size, parsed config or None, problems).
+        self._entries = {}
+
+    def names(self):
+        """The .json files in the config folder, sorted."""
+        os.makedirs(self.config_dir, exist_ok=True)
+        mtime = os.stat(self.config_dir).st_mtime_ns
+        with self._lock:
+            if mtime != self._dir_mtime:
+                self._names = sorted(f for f in os.listdir(self.config_dir) if f.endswith(".json"))
+                self._dir_mtime = mtime
+            return list(self._names)
+
+    def path(self, name):
+        """The file of a config given as a name ("java"), a file name ("java.json") or a path."""
+        if not name.endswith(".json"):
+            name += ".json"
+        return resolve_config_path(name, self.config_dir) or os.path.join(self.config_dir, os.path.basename(name))
+
+    def get(self, name, validated=True):
+        """
+        A copy of the config, or None if it is missing, not valid JSON or
+        (unless validated=False, e.g. to edit it) fails validation.
+        """
+        entry = self._entry(name)
+        if not entry or entry[2] is None or (validated and entry[3]):
+            return None
+        return copy.deepcopy(entry[2])
+
+    def problems(self, name):
+        """Why get() returns None for this config; empty for a valid one."""
+        entry = self._entry(name)
+        return entry[3] if entry else [f"{name} not found"]
+
+    def save(self, config, name):
+        """Writes `config` to the config folder as `name`.json and returns the path."""
+        path = self.path(os.path.basename(name))
+        save_configuration(config, path)
+        self.invalidate(path)
+        return path
+
+    def delete(self, name):
+        path = self.path(name)
+        os.remove(path)
+        self.invalidate(path)
+
+    def invalidate(self, path=None):
+        """Forgets one file (or everything), e.g. after writing it from outside the registry."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+            self._dir_mtime = None
+
+    def _cached(self, path):
+        """The cached entry of `path` if the file has not changed since, else None (also when it is gone)."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry
+        return None
+
+    def _entry(self, name):
+        path = os.path.abspath(self.path(name))
+        entry = self._cached(path)
+        if entry or not os.path.exists(path):
+            return entry
+
+        with self._load_lock:
+            # Another thread may have loaded it while this one waited.
+            entry = self._cached(path)
+            if entry or not os.path.exists(path):
+                return entry
+            config = load_configuration(path)
+            if config is None:
+                problems = [f"{os.path.basename(path)} is not valid JSON"]
+            else:
+                problems = validate_configuration(config)
+                if problems:
+                    print(f"[!] Invalid configuration {path}: {'; '.join(problems)}")
+            # Stat after loading: migrating a schema 1 file rewrites it.
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            entry = (stat.st_mtime_ns, stat.st_size, config, problems)
+            with self._lock:
+                self._entries[path] = entry
+        return entry
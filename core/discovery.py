@@ -0,0 +1,239 @@
+"""
+Finding the file a submission is compiled and run from.
+
+A student's folder is walked once, recursively, into an index of its
+source files. The entry point is then picked from that index by the
+config's "entry_point" rules, tried in order until one matches:
+
+    "entry_point": "Main.java"                    a file name (or relative path)
+    "entry_point": "src/*.py"                     a glob
+    "entry_point": {"main": "java"}               the file that defines the language's main
+    "entry_point": [{"file": "main.py"}, {"main": "python"}]
+
+Several matches are ordered by file name ("main" first), then depth,
+then path. Without "entry_point" the rules of the config's language are
+used and, when none matches, the first source file in the old extension
+order; an explicit "entry_point" that matches nothing leaves the
+submission without a main file.
+
+Indexes are kept per student (run_all_submissions stores them in the
+project as "file_index") and reused while the student's folders and
+sources keep their modification times, so unchanged submissions are
+neither rescanned nor read again.
+"""
+import fnmatch
+import json
+import os
+import re
+import threading
+
+from core.cache import SOURCE_EXTENSIONS
+
+SKIPPED_DIRS = {"__MACOSX", "__pycache__", "node_modules"}
+FALLBACK_EXTENSIONS = (".py", ".c", ".cpp", ".java", ".kt", ".go", ".rb", ".js", ".rs")
+# Only this much of a file is searched for a main function.
+MAIN_SCAN_BYTES = 256 * 1024
+
+# Per "main" rule: the extensions it looks at and the pattern that marks the entry point.
+MAIN_DETECTORS = {
+    "java": ((".java",), re.compile(r"\b(?:public\s+static|static\s+public)\s+(?:final\s+)?void\s+main\s*\(")),
+    "python": ((".py",), re.compile(r"^if\s+__name__\s*==\s*['\"]__main__['\"]\s*:", re.MULTILINE)),
+    "c": ((".c",), re.compile(r"^\s*(?:int|void)\s+main\s*\(", re.MULTILINE)),
+    "cpp": ((".cpp", ".cc"), re.compile(r"^\s*(?:int|void)\s+main\s*\(", re.MULTILINE)),
+    "go": ((".go",), re.compile(r"^func\s+main\s*\(\s*\)", re.MULTILINE)),
+    "rust": ((".rs",), re.compile(r"^\s*(?:pub\s+)?fn\s+main\s*\(", re.MULTILINE)),
+    "kotlin": ((".kt",), re.compile(r"^\s*fun\s+main\s*\(", re.MULTILINE)),
+}
+
+LANGUAGE_RULES = {
+    "C": [{"main": "c"}],
+    "C++": [{"main": "cpp"}],
+    "Java": [{"main": "java"}],
+    "Python": [{"file": "main.py"}, {"main": "python"}],
+    "Go": [{"main": "go"}],
+    "Ruby": [{"file": "main.rb"}],
+    "Node.js": [{"file": "index.js"}, {"file": "main.js"}],
+    "Rust": [{"main": "rust"}],
+    "Kotlin": [{"main": "kotlin"}],
+}
+
+
+def entry_point_rules(config):
+    """
+    The rules of a config as a list of {"file"|"glob"|"main": value}
+    dicts, plus whether they were set explicitly. Raises ValueError for
+    a malformed "entry_point".
+    """
+    value = config.get("entry_point")
+    if not value:
+        return LANGUAGE_RULES.get(config.get("language"), []), False
+
+    rules = []
+    for rule in value if isinstance(value, list) else [value]:
+        if isinstance(rule, str):
+            rule = {"glob": rule} if any(c in rule for c in "*?[") else {"file": rule}
+        if not isinstance(rule, dict) or len(rule) != 1 or next(iter(rule)) not in ("file", "glob", "main"):
+            raise ValueError(f"Invalid entry_point rule: {rule!r}")
+        if "main" in rule and rule["main"] not in MAIN_DETECTORS:
+            raise ValueError(f"Unknown entry_point language: {rule['main']} "
+                             f"(expected one of {', '.join(MAIN_DETECTORS)})")
+        rules.append(rule)
+    return rules, True
+
+
+def _rule_patterns(rules):
+    return [rule.get("file") or rule.get("glob") for rule in rules if "main" not in rule]
+
+
+def _is_indexed(rel_path, patterns):
+    if rel_path.endswith(SOURCE_EXTENSIONS):
+        return True
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel_path if "/" in pattern else name, pattern) for pattern in patterns)
+
+
+def scan_submission(student_path, patterns=()):
+    """
+    Walks `student_path` once and returns its index:
+    {"dirs": {relative dir: mtime_ns}, "sources": [[relative path, size, mtime_ns], ...]}.
+    Sources are the files with a source extension plus those matching
+    one of the file/glob `patterns`. Hidden entries, symlinks and
+    folders such as __MACOSX are skipped; paths use "/" separators.
+    """
+    dirs = {}
+    sources = []
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        path = os.path.join(student_path, rel_dir) if rel_dir else student_path
+        try:
+            dirs[rel_dir] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.is_symlink():
+                        continue
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir():
+                        if entry.name not in SKIPPED_DIRS:
+                            pending.append(rel_path)
+                    elif entry.is_file() and _is_indexed(rel_path, patterns):
+                        stat = entry.stat()
+                        sources.append([rel_path, stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            continue
+    sources.sort()
+    return {"dirs": dirs, "sources": sources}
+
+
+def _preference(rel_path):
+    name = rel_path.rsplit("/", 1)[-1]
+    return os.path.splitext(name)[0].lower() != "main", rel_path.count("/"), rel_path
+
+
+def _defines_main(student_path, rel_path, pattern):
+    try:
+        with open(os.path.join(student_path, rel_path), "r", encoding="utf-8", errors="replace") as f:
+            return bool(pattern.search(f.read(MAIN_SCAN_BYTES)))
+    except OSError:
+        return False
+
+
+def choose_entry_point(student_path, sources, rules, fallback=True):
+    """
+    The relative path of the entry point among the indexed `sources`
+    (paths, or [path, size, mtime] rows), or None. See the module
+    docstring for how rules are applied.
+    """
+    paths = [source[0] if isinstance(source, list) else source for source in sources]
+    for rule in rules:
+        if "file" in rule:
+            wanted = rule["file"].replace(os.sep, "/").strip("/")
+            matches = [path for path in paths if path == wanted or path.rsplit("/", 1)[-1] == wanted]
+        elif "glob" in rule:
+            pattern = rule["glob"]
+            matches = [path for path in paths
+                       if fnmatch.fnmatch(path if "/" in pattern else path.rsplit("/", 1)[-1], pattern)]
+        else:
+            # Candidates are read in order of preference, so usually only the first is opened.
+            extensions, pattern = MAIN_DETECTORS[rule["main"]]
+            found = next((path for path in sorted(paths, key=_preference)
+                          if path.endswith(extensions) and _defines_main(student_path, path, pattern)), None)
+            matches = [found] if found else []
+        if matches:
+            return min(matches, key=_preference)
+
+    if fallback:
+        for extension in FALLBACK_EXTENSIONS:
+            matches = [path for path in paths if path.endswith(extension)]
+            if matches:
+                return min(matches, key=lambda path: (path.count("/"), path))
+    return None
+
+
+class EntryPointFinder:
+    """
+    Picks the main file of each submission for one grading pass and
+    keeps the index it used. `cached` is the "file_index" a previous pass
+    stored in the project; an entry is reused without a rescan when it was
+    made with the same rules and the student's folders and sources still
+    have the same modification times, and its entry point is kept after a
+    rescan that finds the same sources (compiling adds files, not
+    sources). Safe to share between threads.
+    """
+
+    def __init__(self, config, cached=None):
+        self.rules, self.explicit = entry_point_rules(config)
+        self.rules_key = json.dumps(self.rules, sort_keys=True)
+        self.patterns = _rule_patterns(self.rules)
+        self.cached = cached if isinstance(cached, dict) else {}
+        self.index = {}
+        self._lock = threading.Lock()
+
+    def find(self, student_id, student_path):
+        """Absolute path of the student's main file, or None."""
+        previous = self.cached.get(student_id)
+        if not isinstance(previous, dict) or previous.get("rules") != self.rules_key:
+            previous = None
+
+        if previous and _unchanged(student_path, previous):
+            entry = previous
+        else:
+            entry = scan_submission(student_path, self.patterns)
+            if previous and entry["sources"] == previous.get("sources"):
+                entry["entry"] = previous.get("entry")
+            else:
+                entry["entry"] = choose_entry_point(student_path, entry["sources"], self.rules, not self.explicit)
+            entry["rules"] = self.rules_key
+
+        with self._lock:
+            self.index[student_id] = entry
+        main_file = entry.get("entry")
+        return os.path.join(student_path, *main_file.split("/")) if main_file else None
+
+    def export(self, student_ids):
+        """The index to store in the project: this pass's entries plus cached ones of `student_ids` not looked up."""
+        with self._lock:
+            index = dict(self.index)
+        for student_id in student_ids:
+            if student_id not in index and student_id in self.cached:
+                index[student_id] = self.cached[student_id]
+        return index
+
+
+def _unchanged(student_path, entry):
+    """True if the folders and sources of an index entry still have their sizes and modification times."""
+    dirs = entry.get("dirs") or {}
+    if "" not in dirs:
+        return False
+    try:
+        for rel_dir, mtime in dirs.items():
+            path = os.path.join(student_path, *rel_dir.split("/")) if rel_dir else student_path
+            if os.stat(path).st_mtime_ns != mtime:
+                return False
+        for rel_path, size, mtime in entry.get("sources") or []:
+            stat = os.stat(os.path.join(student_path, *rel_path.split("/")))
+            if stat.st_size != size or stat.st_mtime_ns != mtime:
+                return False
+    except (OSError, ValueError, TypeError):
+        return False
+    return True
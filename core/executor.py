@@ -1,151 +1,977 @@
 import subprocess
-from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, closing, nullcontext
 from core.configuration import load_configuration
+from core.compare import compare_files, resolve_comparator
+from core.cache import CompileCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, hash_file, hash_sources, snapshot_files
+from core.commands import command_text, launch, parse_command
+from core.warm import WarmRunners
+from core.profiling import NULL_PROFILER
+from core.results import SubmissionResult, CaseResult, load_results
+from core.batch import helper_command, parse_batch_command, read_results, split_batches, write_jobs
+from core.sandbox import LocalBackend, open_backend
+from core.discovery import EntryPointFinder
+from core.scratch import ScratchArea, default_output_dir, scratch_base
+from core.store import open_store
+from core.history import make_run
 import os
 import json
-def compile_code(compile_command, cwd=None):
+import hashlib
+import math
+import re
+import signal
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits; only the wall-clock limit applies there.
+    resource = None
+
+TIME_LIMIT_EXCEEDED = "Time Limit Exceeded"
+MEMORY_LIMIT_EXCEEDED = "Memory Limit Exceeded"
+OUTPUT_LIMIT_EXCEEDED = "Output Limit Exceeded"
+LIMIT_STATUSES = (TIME_LIMIT_EXCEEDED, MEMORY_LIMIT_EXCEEDED, OUTPUT_LIMIT_EXCEEDED)
+
+MEMORY_ERROR_MARKERS = ("MemoryError", "OutOfMemoryError", "std::bad_alloc", "Cannot allocate memory",
+                        "Could not reserve enough space", "memory allocation of")
+# A program killed by a signal with at least this share of its memory limit resident ran out of memory.
+MEMORY_LIMIT_RSS_SHARE = 0.8
+STDERR_TAIL_BYTES = 64 * 1024
+CANCEL_POLL_SECONDS = 0.1
+CANCELLED = "Cancelled"
+# Launches without a sandbox backend still go through one, for the rlimits.
+LOCAL_BACKEND = LocalBackend()
+
+
+class GradingCancelled(Exception):
+    """Raised inside a grading pass once its cancel_event is set."""
+
+
+def compile_code(compile_command, cwd=None, timeout=None, cache=None, cancel_event=None, usage=None, sandbox=None,
+                 env=None):
+    """
+    Runs `compile_command` (an argv list, or a string for the shell) in
+    `cwd`. An empty command means there is nothing to compile. With a
+    CompileCache, an identical earlier compilation is restored from the
+    cache instead of rerunning the compiler; fresh results (but never
+    timeouts) are stored for next time. `usage` is an optional profiling
+    sample, see _run_process(). In a `sandbox` only `cwd` is writable.
+    `env` holds extra environment variables for the compiler.
+    """
+    if not compile_command:
+        print("[✓] Nothing to compile.")
+        return True, ""
+
+    key = None
+    if cache and cwd:
+        try:
+            key = cache.key(cwd, compile_command)
+            cached = cache.lookup(key, cwd)
+        except Exception as e:
+            print(f"[!] Compile cache unavailable: {e}")
+            key, cached = None, None
+        if cached:
+            print("[✓] Compilation restored from cache.")
+            return cached
+        before = snapshot_files(cwd) if key else None
+
     try:
-        result = subprocess.run(compile_command, shell=True, capture_output=True, text=True, cwd=cwd)
-        if result.returncode == 0:
+        returncode, stdout_text, stderr_text, timed_out = _run_process(compile_command, cwd=cwd, timeout=timeout,
+                                                                       cancel_event=cancel_event, usage=usage,
+                                                                       sandbox=sandbox, writable=[cwd], env=env)
+        if timed_out:
+            print(f"[✗] Compilation timed out after {timeout} seconds.")
+            return False, f"Compilation timed out after {timeout} seconds."
+        if key:
+            cache.store(key, cwd, before, returncode == 0, stdout_text if returncode == 0 else stderr_text)
+        if returncode == 0:
             print("[✓] Compilation successful.")
-            return True, result.stdout
+            return True, stdout_text
         else:
             print("[✗] Compilation failed.")
-            print(result.stderr)
-            return False, result.stderr
+            print(stderr_text)
+            return False, stderr_text
+    except GradingCancelled:
+        raise
     except Exception as e:
         print(f"[!] Compilation error: {e}")
         return False, str(e)
 
-def run_executable(run_command, input_type="Standard Input", input_file=None, cli_arguments="", output_file=None, cwd=None):
+def batch_compile(jobs, workers=1, timeout=None, cache=None, cancel_event=None, sandbox=None, env=None, times=None):
+    """
+    Compiles many submissions with a few compiler processes instead of one
+    per student. `jobs` are (student_id, student_path, compile_command)
+    triples. Cache hits are restored first; the remaining javac and
+    py_compile commands are grouped by compiler and split into at most
+    `workers` batches that run in parallel, with `timeout` seconds per
+    student in a batch.
+
+    In a `sandbox`, a batch may only write to the folders of its students.
+
+    Returns {student_id: (success, log)} for every student that was
+    compiled. Students missing from it (a command that cannot be batched,
+    a batch that crashed or timed out) should go through compile_code().
+    A `times` dict receives each batched student's share of its batch's
+    wall time, in seconds, as its compile time.
+    """
+    compiled = {}
+    pending = {}
+    groups = {}
+    for student_id, student_path, command in jobs:
+        key = None
+        if cache:
+            try:
+                key = cache.key(student_path, command)
+                cached = cache.lookup(key, student_path)
+            except Exception as e:
+                print(f"[!] Compile cache unavailable: {e}")
+                key, cached = None, None
+            if cached:
+                compiled[student_id] = cached
+                continue
+        parsed = parse_batch_command(command, student_path)
+        if not parsed or "\t" in student_id or "\n" in student_id:
+            continue
+        kind, tool, args = parsed
+        pending[student_id] = (student_path, key, snapshot_files(student_path) if key else None)
+        groups.setdefault((kind, tool), []).append((student_id, args))
+
+    def run_batch(kind, tool, batch):
+        with tempfile.TemporaryDirectory(prefix="iae_batch_") as tmp:
+            jobs_path = os.path.join(tmp, "jobs")
+            results_path = os.path.join(tmp, "results")
+            write_jobs(kind, batch, jobs_path)
+            argv = helper_command(kind, tool, jobs_path, results_path)
+            if not argv:
+                return {}
+            started = time.perf_counter()
+            try:
+                returncode, _, stderr_text, timed_out = _run_process(
+                    argv, timeout=timeout * len(batch) if timeout else None, cancel_event=cancel_event,
+                    sandbox=sandbox, writable=[tmp] + [pending[student_id][0] for student_id, _ in batch], env=env)
+            except GradingCancelled:
+                return {}
+            results = read_results(kind, results_path)
+            if times is not None:
+                share = (time.perf_counter() - started) / len(batch)
+                times.update((student_id, share) for student_id in results)
+            if timed_out or returncode != 0:
+                print(f"[!] Batch compile with {tool} stopped after {len(results)} of {len(batch)} submissions.")
+                if stderr_text:
+                    print(stderr_text)
+            return results
+
+    batches = [(kind, tool, batch) for (kind, tool), items in groups.items() for batch in split_batches(items, workers)]
+    if batches:
+        with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+            for results in pool.map(lambda b: run_batch(*b), batches):
+                compiled.update(results)
+
+    for student_id, (student_path, key, before) in pending.items():
+        if key and student_id in compiled:
+            success, log = compiled[student_id]
+            cache.store(key, student_path, before, success, log)
+    missed = len(pending) - sum(1 for student_id in pending if student_id in compiled)
+    if pending:
+        print(f"[✓] Batch compiled {len(pending) - missed} submissions in {len(batches)} compiler runs"
+              + (f", {missed} left to compile one by one." if missed else "."))
+    return compiled
+
+
+def resource_limits(config, project_data=None):
+    """
+    Merges the "limits" block of a config with the one in the project JSON.
+    Project values win, so a single assignment can tighten or relax the
+    defaults of its language. Recognised keys:
+    - time_limit: wall-clock seconds for a run
+    - cpu_time_limit: CPU seconds for a run
+    - compile_time_limit: wall-clock seconds for a compilation
+    - memory_limit_mb: address space cap in MiB
+    - output_limit_mb: largest file the program may write (its stdout included)
+    - process_limit: maximum number of processes for the grader's user
+    """
+    limits = dict(config.get("limits", {}) if config else {})
+    if project_data:
+        limits.update(project_data.get("limits", {}))
+    return {key: value for key, value in limits.items() if value not in (None, "", 0)}
+
+
+def program_environment(config, project_data=None):
+    """
+    The "env" variables of a config merged with the project's (project
+    values win). They are added to the grader's environment for every
+    compilation and run. None when there are none.
+    """
+    env = dict(config.get("env") or {}) if config else {}
+    if project_data:
+        env.update(project_data.get("env") or {})
+    return {str(key): str(value) for key, value in env.items()} or None
+
+
+def parallel_limit(config, project_data=None):
+    """The "max_parallel" cap on students graded at once (project over config), or None."""
+    value = (project_data or {}).get("max_parallel") or (config or {}).get("max_parallel")
+    return max(1, int(value)) if value else None
+
+
+def _rlimits(limits):
+    """(resource, (soft, hard)) pairs for the rlimits in `limits`."""
+    if resource is None:
+        return []
+
+    rlimits = []
+    if limits.get("cpu_time_limit"):
+        seconds = max(1, int(math.ceil(float(limits["cpu_time_limit"]))))
+        # The soft limit sends SIGXCPU, the hard one a second later SIGKILL.
+        rlimits.append((resource.RLIMIT_CPU, (seconds, seconds + 1)))
+    if limits.get("memory_limit_mb"):
+        size = int(float(limits["memory_limit_mb"]) * 1024 * 1024)
+        rlimits.append((resource.RLIMIT_AS, (size, size)))
+    if limits.get("output_limit_mb"):
+        size = int(float(limits["output_limit_mb"]) * 1024 * 1024)
+        rlimits.append((resource.RLIMIT_FSIZE, (size, size)))
+    if limits.get("process_limit"):
+        count = int(limits["process_limit"])
+        rlimits.append((resource.RLIMIT_NPROC, (count, count)))
+    return rlimits
+
+
+def _kill_process_tree(proc):
+    """Kills the whole process group started for `proc`, so forked children die too."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _read_tail(f):
+    f.seek(0, os.SEEK_END)
+    f.seek(max(0, f.tell() - STDERR_TAIL_BYTES))
+    return f.read().decode("utf-8", errors="replace")
+
+
+def _wait(proc, timeout, cancel_event):
+    """Waits for `proc` like Popen.wait, but gives up with GradingCancelled once cancel_event is set."""
+    if cancel_event is None:
+        proc.wait(timeout=timeout)
+        return
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        if cancel_event.is_set():
+            raise GradingCancelled()
+        step = CANCEL_POLL_SECONDS
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            step = min(step, remaining)
+        try:
+            proc.wait(timeout=step)
+            return
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def _wait_with_usage(proc, timeout, cancel_event):
+    """
+    Like _wait, but reaps `proc` itself with os.wait4 and returns its
+    rusage, which covers the children it waited for as well.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    delay = 0.0005
+    while True:
+        pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            return usage
+        if cancel_event is not None and cancel_event.is_set():
+            raise GradingCancelled()
+        if deadline is not None and time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        time.sleep(delay)
+        delay = min(delay * 2, CANCEL_POLL_SECONDS / 2)
+
+
+def _run_process(command, stdin=None, stdout=None, cwd=None, limits=None, timeout=None, cancel_event=None, usage=None,
+                 sandbox=None, writable=(), env=None):
+    """
+    Runs `command` (an argv list, or a string for the shell) in its own
+    process group with the given rlimits and wall-clock timeout. stderr (and stdout, when no file is given)
+    goes to a temporary file so a chatty program cannot fill the grader's
+    memory; only its tail is kept. Setting cancel_event kills the process
+    group and raises GradingCancelled.
+
+    With a `sandbox` backend (see core.sandbox) the process starts inside
+    it, able to write only to the folders in `writable`. `env` holds
+    variables added to the grader's environment (see program_environment()).
+
+    `usage` is a profiling sample dict (see core.profiling.Profiler); when
+    given, the process's CPU time, peak RSS and spawn time are added to it.
+    Returns (returncode, stdout_text, stderr_text, timed_out).
+    """
+    limits = limits or {}
+    measure = usage is not None and hasattr(os, "wait4")
+    backend = sandbox or LOCAL_BACKEND
+    launched, preexec_fn = backend.wrap(command, writable, _rlimits(limits))
+    with tempfile.TemporaryFile() as err, (tempfile.TemporaryFile() if stdout is None else nullcontext()) as out:
+        started = time.perf_counter()
+        try:
+            proc = launch(
+                launched,
+                stdin=stdin if stdin is not None else subprocess.DEVNULL,
+                stdout=stdout if stdout is not None else out,
+                stderr=err,
+                cwd=cwd,
+                preexec_fn=preexec_fn,
+                env=backend.environment(env)
+            )
+        except OSError as e:
+            # Without a shell, a missing program fails here instead of exiting with 127.
+            return 127, "", f"{command_text(command)}: {e.strerror or e}", False
+        if measure:
+            usage["spawn_time"] = usage.get("spawn_time", 0.0) + time.perf_counter() - started
+        timed_out = False
+        rusage = None
+        try:
+            if measure:
+                rusage = _wait_with_usage(proc, timeout, cancel_event)
+            else:
+                _wait(proc, timeout, cancel_event)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        finally:
+            # Grandchildren may keep running after the main process is gone.
+            _kill_process_tree(proc)
+            if measure and proc.returncode is None:
+                _, status, rusage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+            proc.wait()
+
+        if rusage is not None:
+            usage["cpu_time"] += rusage.ru_utime + rusage.ru_stime
+            usage["max_rss_kb"] = max(usage["max_rss_kb"], rusage.ru_maxrss)
+        stdout_text = _read_tail(out) if stdout is None else ""
+        stderr_text = _read_tail(err)
+    return proc.returncode, stdout_text, stderr_text, timed_out
+
+
+def _run_warm(warm, command, stdin_path, stdout_path, cwd, limits, cancel_event, env=None):
+    """
+    Runs `command` on a WarmRunners pool. Returns the same tuple as
+    _run_process(), or None if the command has to run in a cold process.
+    """
+    fd, err_path = tempfile.mkstemp(prefix="iae_stderr_")
+    os.close(fd)
+    try:
+        outcome = warm.run(command, cwd, os.path.abspath(stdin_path) if stdin_path else None, stdout_path, err_path,
+                           rlimits=_rlimits(limits), limits=limits, timeout=limits.get("time_limit"),
+                           cancel_event=cancel_event, env=env)
+        if outcome is None:
+            return None
+        returncode, timed_out, cancelled = outcome
+        if cancelled:
+            raise GradingCancelled()
+        with open(err_path, "rb") as err:
+            stderr_text = _read_tail(err)
+    finally:
+        os.remove(err_path)
+    return returncode, "", stderr_text, timed_out
+
+
+def _split_returncode(returncode, shell=False):
+    """
+    (exit_code, signal) of a finished process; one of them is None. Only a
+    command that ran through the shell (`shell`) reports a signal as an
+    exit status above 128; an argv program exiting with 137 just exited.
+    """
+    if returncode is None:
+        return None, None
+    if returncode < 0:
+        return None, -returncode
+    if shell and 128 < returncode < 128 + 65:
+        # The shell reports a child killed by signal N as exit status 128 + N.
+        return None, returncode - 128
+    return returncode, None
+
+
+def _limit_status(returncode, stderr_text, timed_out, limits, shell=False, max_rss_kb=0):
+    """
+    Maps a finished run onto one of the limit statuses, or None if no limit
+    was hit. A crash only counts as a memory limit on evidence: a runtime's
+    out-of-memory message in stderr, or a peak RSS (`max_rss_kb`) close to
+    the limit. Any other SIGSEGV, SIGABRT or SIGKILL is a runtime error.
+    """
+    if timed_out:
+        return TIME_LIMIT_EXCEEDED
+    _, sig = _split_returncode(returncode, shell)
+    if sig:
+        returncode = -sig
+    if returncode is None or returncode >= 0:
+        if limits.get("memory_limit_mb") and any(marker in stderr_text for marker in MEMORY_ERROR_MARKERS):
+            return MEMORY_LIMIT_EXCEEDED
+        return None
+    sig = -returncode
+    if sig == getattr(signal, "SIGXCPU", None) or (sig == signal.SIGKILL and limits.get("cpu_time_limit")):
+        return TIME_LIMIT_EXCEEDED
+    if sig == getattr(signal, "SIGXFSZ", None):
+        return OUTPUT_LIMIT_EXCEEDED
+    if limits.get("memory_limit_mb"):
+        if any(marker in stderr_text for marker in MEMORY_ERROR_MARKERS):
+            return MEMORY_LIMIT_EXCEEDED
+        limit_kb = float(limits["memory_limit_mb"]) * 1024
+        crashed = sig in (signal.SIGKILL, signal.SIGSEGV, signal.SIGABRT)
+        if crashed and max_rss_kb >= MEMORY_LIMIT_RSS_SHARE * limit_kb:
+            return MEMORY_LIMIT_EXCEEDED
+    return None
+
+
+def _run_cold(run_command, stdin_path, output_file, cwd, limits, cancel_event, usage=None, sandbox=None, env=None):
+    """Runs the program in a fresh process; returns (returncode, stderr_text, timed_out, max_rss_kb)."""
+    # The run's own peak RSS tells a memory limit from a crash, so it is measured even without profiling.
+    run_usage = {"cpu_time": 0.0, "max_rss_kb": 0}
+    inp_ctx = open(stdin_path, 'rb') if stdin_path else nullcontext()
+    out_ctx = open(output_file, 'wb') if output_file else nullcontext()
+
+    with inp_ctx as inp, out_ctx as out:
+        returncode, _, stderr_text, timed_out = _run_process(
+            run_command,
+            stdin=inp,
+            stdout=out,
+            cwd=cwd,
+            limits=limits,
+            timeout=limits.get("time_limit"),
+            cancel_event=cancel_event,
+            usage=run_usage,
+            sandbox=sandbox,
+            env=env
+        )
+    if usage is not None:
+        usage["cpu_time"] += run_usage["cpu_time"]
+        usage["max_rss_kb"] = max(usage["max_rss_kb"], run_usage["max_rss_kb"])
+        if "spawn_time" in run_usage:
+            usage["spawn_time"] = usage.get("spawn_time", 0.0) + run_usage["spawn_time"]
+    return returncode, stderr_text, timed_out, run_usage["max_rss_kb"]
+
+
+def run_executable(run_command, input_type="Standard Input", input_file=None, cli_arguments="", output_file=None, cwd=None, limits=None,
+                   cancel_event=None, warm=None, details=None, usage=None, sandbox=None, env=None):
     """
     Executes the program based on input method:
     - If Standard Input: passes input_file as stdin
     - If Command-line Arguments: appends cli_arguments to the run command
     - If None: runs the command with no input
+
+    `limits` is the dict returned by resource_limits(). When a limit is hit
+    the returned log is the matching status (TIME_LIMIT_EXCEEDED, ...).
+    With a WarmRunners pool the program runs on a warm interpreter when it
+    can, and in a fresh process otherwise. A `details` dict is filled with
+    the run's exit_code, signal and output_bytes; `usage` is an optional
+    profiling sample, see _run_process(). In a `sandbox` the program
+    cannot write to any folder; its output goes through output_file.
+    `env` holds extra environment variables for the program.
     """
+    limits = limits or {}
     try:
-        if input_type == "None":
-            result = subprocess.run(
-                run_command,
-                shell=True,
-                stdout=open(output_file, 'w') if output_file else None,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=cwd
-            )
+        stdin_path = input_file if input_type == "Standard Input" else None
+        outcome = None
+        max_rss_kb = 0
+        if warm is not None and output_file and cwd:
+            outcome = _run_warm(warm, run_command, stdin_path, output_file, cwd, limits, cancel_event, env)
+        if outcome is not None:
+            returncode, _, stderr_text, timed_out = outcome
         else:
-            inp_ctx = open(input_file, 'r') if input_type == "Standard Input" and input_file else nullcontext()
-            out_ctx = open(output_file, 'w') if output_file else nullcontext()
-
-            with inp_ctx as inp, out_ctx as out:
-                result = subprocess.run(
-                    run_command,
-                    shell=True,
-                    stdin=inp if input_type == "Standard Input" and input_file else None,
-                    stdout=out if output_file else None,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    cwd=cwd
-                )
-
-        if result.returncode == 0:
+            returncode, stderr_text, timed_out, max_rss_kb = _run_cold(run_command, stdin_path, output_file, cwd,
+                                                                       limits, cancel_event, usage, sandbox, env)
+
+        output_bytes = os.path.getsize(output_file) if output_file and os.path.exists(output_file) else 0
+        # Warm runners report signals as negative codes too, so only a shell command needs decoding.
+        shell = outcome is None and isinstance(run_command, str)
+        if details is not None:
+            details["exit_code"], details["signal"] = _split_returncode(returncode, shell)
+            details["output_bytes"] = output_bytes
+
+        status = _limit_status(returncode, stderr_text, timed_out, limits, shell, max_rss_kb)
+        if not status and output_file and limits.get("output_limit_mb"):
+            # Runtimes such as Python ignore SIGXFSZ and fail with EFBIG instead.
+            if output_bytes >= float(limits["output_limit_mb"]) * 1024 * 1024:
+                status = OUTPUT_LIMIT_EXCEEDED
+        if status:
+            print(f"[✗] {status}.")
+            return False, status
+        if returncode == 0:
             print("[✓] Execution successful.")
             return True, None
         else:
             print("[✗] Execution failed.")
-            print(result.stderr)
-            return False, result.stderr
+            print(stderr_text)
+            return False, stderr_text
 
+    except GradingCancelled:
+        raise
     except Exception as e:
         print(f"[!] Execution error: {e}")
         return False, str(e)
 
-def run_all_submissions(config, project_data):
-    student_dir = project_data["student_code_dir"]
+def default_worker_count():
+    """Number of submissions graded at the same time when nothing is configured."""
+    return max(1, min(32, os.cpu_count() or 1))
+
+
+def create_compile_cache(config, project_data):
+    """
+    Builds the CompileCache for a grading pass, or returns None when the
+    project or config sets "compile_cache" to false.
+    """
+    enabled = project_data.get("compile_cache", config.get("compile_cache", True))
+    if not enabled:
+        return None
+    try:
+        return CompileCache(
+            root=project_data.get("compile_cache_dir", DEFAULT_CACHE_DIR),
+            max_mb=project_data.get("compile_cache_mb", DEFAULT_MAX_MB)
+        )
+    except OSError as e:
+        print(f"[!] Compile cache disabled: {e}")
+        return None
+
+
+def create_warm_runners(config, project_data, workers):
+    """
+    Builds the WarmRunners pool for a grading pass when the project or
+    config sets "warm_runner" to true, sized so every worker can hold a
+    runner. Returns None otherwise; close() it when the pass is over.
+    """
+    if not project_data.get("warm_runner", config.get("warm_runner", False)):
+        return None
+    return WarmRunners(workers)
+
+
+def create_sandbox(config, project_data):
+    """
+    The execution backend for a grading pass from the "sandbox" setting of
+    the project or config (see core.sandbox.sandbox_settings). Raises
+    core.sandbox.SandboxError when the requested sandbox is not available
+    here, rather than grading unsandboxed.
+    """
+    return open_backend(project_data.get("sandbox", config.get("sandbox")))
+
+
+def create_scratch_area(config, project_data):
+    """
+    The ScratchArea a grading pass writes program output to. The project
+    (or config) may set "keep_outputs" ("failures", "all" or "none"),
+    "output_dir" for the kept outputs and "scratch_dir" for the scratch
+    folder itself; close() it when the pass is over.
+    """
+    limits = resource_limits(config, project_data)
+    return ScratchArea(
+        output_dir=project_data.get("output_dir") or default_output_dir(project_data, config),
+        keep=project_data.get("keep_outputs", config.get("keep_outputs", "failures")),
+        base=project_data.get("scratch_dir") or scratch_base(limits),
+        output_limit_mb=limits.get("output_limit_mb")
+    )
+
+
+def load_test_cases(project_data):
+    """
+    Returns the project's test cases as (name, input_file, expected_output_file)
+    tuples. A project with a "test_dir" uses every NN.out file in it, paired
+    with NN.in when present; otherwise the single input_file/expected_output_file
+    pair is the only case. A test_dir without any .out file is a ValueError,
+    so the grading pass stops instead of grading every student against nothing.
+    """
+    test_dir = project_data.get("test_dir")
+    if not test_dir:
+        return [("1", project_data.get("input_file"), project_data.get("expected_output_file"))]
+
+    cases = []
+    names = os.listdir(test_dir)
+    for fname in sorted(names, key=_natural_key):
+        name, ext = os.path.splitext(fname)
+        if ext != ".out":
+            continue
+        input_file = os.path.join(test_dir, name + ".in")
+        cases.append((name, input_file if os.path.isfile(input_file) else None, os.path.join(test_dir, fname)))
+    if not cases:
+        raise ValueError(f"no test cases found in {test_dir}")
+    return cases
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def _case_arguments(input_file, cli_args):
+    """Per-case CLI arguments come from NN.args next to NN.in, falling back to the project's."""
+    if input_file:
+        args_file = os.path.splitext(input_file)[0] + ".args"
+        if os.path.isfile(args_file):
+            with open(args_file, "r") as f:
+                return f.read().strip()
+    return cli_args.strip()
+
+
+def compare_output(output_file, expected_output_file, comparator=None):
+    """
+    Returns "Passed", "Wrong Output" or "Output Error" for a finished run.
+    `comparator` is a mode name or a {"mode": ..., options} dict understood
+    by core.compare.resolve_comparator; None compares exactly. Both files are
+    streamed, so a huge output never has to fit in memory.
+    """
+    try:
+        mode, options = resolve_comparator(comparator)
+        matched, detail = compare_files(output_file, expected_output_file, mode, **options)
+        if matched:
+            return "Passed"
+        print(f"[✗] {os.path.basename(output_file)} differs ({mode}): {detail}")
+        return "Wrong Output"
+    except Exception as e:
+        print(f"[!] Output Comparison Error: {e}")
+        return "Output Error"
+
+
+def expand_command(template, main_file, cwd=None, extra_args=""):
+    """
+    A config's compile or run command for one submission, with {main_file}
+    and {main_dir} filled in: an argv list, or a string for commands that
+    need the shell. See core.commands.CommandTemplate.
+    """
+    return parse_command(template).expand(main_file, cwd, extra_args)
+
+
+def grade_submission(student_id, student_path, config, project_data, cache=None, test_cases=None, cancel_event=None,
+                     warm=None, compiled=None, profiler=NULL_PROFILER, sandbox=None, finder=None, scratch=None,
+                     batch_time=None):
+    """
+    Runs the compile/run/compare pipeline for a single student and returns
+    its SubmissionResult. Every student writes to its own output files, so
+    calls for different students can run concurrently.
+
+    The submission is compiled once and then run against every test case,
+    each of which gets a CaseResult. For a test suite the result column
+    holds the aggregate score such as "18/20 Passed".
+
+    `compiled` is the (success, log) pair from batch_compile() when the
+    submission was already compiled as part of a batch, and `batch_time`
+    its share of the batch's time, reported as its compile time. Each phase is
+    measured by `profiler` (a core.profiling.Profiler). Compilations and
+    runs start in `sandbox`, a core.sandbox backend, when one is given.
+    The main file is looked up with `finder` (a
+    core.discovery.EntryPointFinder, one for `config` if omitted).
+
+    Output goes to files in `scratch`, a core.scratch.ScratchArea (a
+    temporary one if omitted), never into the student's folder; the
+    outputs its policy keeps are referenced by CaseResult.output_file.
+    """
+    if scratch is None:
+        with closing(create_scratch_area(config, project_data)) as scratch:
+            return grade_submission(student_id, student_path, config, project_data, cache, test_cases, cancel_event,
+                                    warm, compiled, profiler, sandbox, finder, scratch, batch_time)
+
     input_type = project_data.get("input_type", "Standard Input")
     cli_args = project_data.get("cli_arguments", "") if input_type == "Command-line Arguments" else ""
-    input_file = project_data.get("input_file") if input_type == "Standard Input" else None
-    expected_output_file = project_data["expected_output_file"]
     run_template = config["run_command"]
     compile_template = config["compile_command"]
+    limits = resource_limits(config, project_data)
+    env = program_environment(config, project_data)
+    if test_cases is None:
+        test_cases = load_test_cases(project_data)
+    suite = bool(project_data.get("test_dir"))
+    comparator = project_data.get("comparator") or config.get("comparator")
+    case_comparators = project_data.get("test_comparators") or {}
+
+    main_file = (finder or EntryPointFinder(config)).find(student_id, student_path)
+    if not main_file:
+        print(f"[!] No source file found for {student_id}")
+        return SubmissionResult(student_id, "Missing File")
+
+    compile_cmd = expand_command(compile_template, main_file, student_path)
+
+    print(f"[>] Running for {student_id}: {command_text(expand_command(run_template, main_file, student_path))}")
 
-    results = []
+    started = time.perf_counter()
+    if compiled is None:
+        with profiler.phase(student_id, "compile") as sample:
+            compiled = compile_code(compile_cmd, cwd=student_path, timeout=limits.get("compile_time_limit"),
+                                    cache=cache, cancel_event=cancel_event, usage=sample, sandbox=sandbox,
+                                    env=env)
+    success, compile_log = compiled
+    compile_time = batch_time if batch_time is not None else time.perf_counter() - started
+    if not success:
+        print(f"[✗] {student_id}: Compile Failed")
+        return SubmissionResult(student_id, "Compile Failed", compile_time=compile_time)
 
-    for student_id in os.listdir(student_dir):
+    cases = []
+    run_status = "Executed"
+    for name, input_file, expected_output_file in test_cases:
+        case_args = _case_arguments(input_file, cli_args) if input_type == "Command-line Arguments" else ""
+        run_cmd = expand_command(run_template, main_file, student_path, case_args)
+
+        output_file = scratch.output_file(student_id, name)
+        stdin_file = input_file if input_type == "Standard Input" else None
+        details = {}
+        started = time.perf_counter()
+        with profiler.phase(student_id, "run") as sample:
+            success, run_log = run_executable(run_cmd, input_type, stdin_file, case_args, output_file,
+                                              cwd=student_path, limits=limits, cancel_event=cancel_event, warm=warm,
+                                              details=details, usage=sample, sandbox=sandbox, env=env)
+        run_time = time.perf_counter() - started
+        if sample and "spawn_time" in sample:
+            profiler.record(student_id, "spawn", sample["spawn_time"])
+        compare_time = 0.0
+        if success:
+            started = time.perf_counter()
+            with profiler.phase(student_id, "compare"):
+                status = compare_output(output_file, expected_output_file, case_comparators.get(name, comparator))
+            compare_time = time.perf_counter() - started
+        else:
+            status = run_log if run_log in LIMIT_STATUSES else "Runtime Error"
+            if run_status == "Executed":
+                run_status = status
+        cases.append(CaseResult(name, status, details.get("exit_code"), details.get("signal"), run_time,
+                                compare_time, details.get("output_bytes", 0)))
+
+    scratch.finish(student_id, cases)
+
+    # The exit code and signal of the first failing case describe the submission best.
+    failed = [case for case in cases if not case.passed]
+    reported = failed[0] if failed else cases[-1]
+    result = SubmissionResult(
+        student_id, "Compiled", run_status, "-", cases,
+        compile_time=compile_time,
+        run_time=sum(case.run_time for case in cases),
+        compare_time=sum(case.compare_time for case in cases),
+        exit_code=reported.exit_code,
+        signal=reported.signal,
+        output_bytes=sum(case.output_bytes for case in cases)
+    )
+
+    if not suite:
+        status = cases[0].status
+        if status in ("Passed", "Wrong Output", "Output Error"):
+            print(f"[{'✓' if status == 'Passed' else '✗'}] {student_id}: {status}")
+            result.result = status
+        else:
+            print(f"[✗] {student_id}: {status}")
+            result.run_status = status
+        return result
+
+    passed = result.passed_cases
+    result.result = "Passed" if passed == len(cases) else f"{passed}/{len(cases)} Passed"
+    print(f"[{'✓' if passed == len(cases) else '✗'}] {student_id}: {result.result}")
+    return result
+
+
+def grading_digest(config, project_data):
+    """
+    Digest of everything outside the student's folder that affects a grade:
+    the config, input method, CLI arguments, limits, input file and expected
+    output. Combined with the sources in submission_fingerprint().
+    """
+    digest = hashlib.sha256()
+    settings = {
+        "config": config,
+        "input_type": project_data.get("input_type", "Standard Input"),
+        "cli_arguments": project_data.get("cli_arguments", ""),
+        "limits": resource_limits(config, project_data),
+        "comparator": project_data.get("comparator"),
+        "test_comparators": project_data.get("test_comparators"),
+        "sandbox": project_data.get("sandbox"),
+        "env": program_environment(config, project_data)
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    for name, input_file, expected_output_file in load_test_cases(project_data):
+        digest.update(f"\0{name}".encode("utf-8"))
+        args_file = os.path.splitext(input_file)[0] + ".args" if input_file else None
+        for path in (input_file, args_file, expected_output_file):
+            digest.update(b"\0")
+            if path and os.path.isfile(path):
+                hash_file(path, digest)
+    return digest.hexdigest()
+
+
+def submission_fingerprint(student_path, base_digest):
+    """Fingerprint of one student's grade: their sources plus the shared grading_digest()."""
+    return hashlib.sha256(f"{base_digest}:{hash_sources(student_path)}".encode("utf-8")).hexdigest()
+
+
+def run_all_submissions(config, project_data, workers=None, on_result=None, cancel_event=None, profiler=None,
+                        store=None):
+    """
+    Grades every student folder in student_code_dir.
+
+    Students are graded on a thread pool of `workers` threads (falls back to
+    project_data["workers"], then to the CPU count), capped by the
+    "max_parallel" setting. Results are always returned sorted by student
+    ID, whatever order the workers finish in.
+
+    Each student's fingerprint is stored in project_data["fingerprints"].
+    Unless project_data["incremental"] is false, students whose fingerprint
+    matches the previous run reuse their result from project_data["results"]
+    instead of being graded again.
+
+    on_result(result, done, total) is called from the worker thread as soon
+    as each student finishes. Setting cancel_event (a threading.Event) kills
+    the programs that are running and marks every unfinished student as
+    Cancelled; cancelled students get no fingerprint.
+
+    With "batch_compile" set in the project or config, the students that
+    need grading are compiled up front by batch_compile().
+
+    Pass a core.profiling.Profiler as `profiler` to collect per-phase wall
+    time, CPU time and peak RSS for every student.
+
+    Program output goes to a per-pass core.scratch.ScratchArea, see
+    create_scratch_area().
+
+    Main files are found by core.discovery.EntryPointFinder; the file
+    index it builds is stored in project_data["file_index"] and reused by
+    the next pass.
+
+    Programs run in the backend chosen by the "sandbox" setting; if that
+    sandbox is unavailable, core.sandbox.SandboxError is raised before any
+    student is graded. Warm runners are not used inside a sandbox.
+
+    Pass the project's core.store store as `store` to record the test
+    cases and each freshly graded student as soon as it finishes (a
+    single-row upsert for SQLite projects, nothing for JSON ones).
+    """
+    student_dir = project_data["student_code_dir"]
+    profiler = profiler or NULL_PROFILER
+    if workers is None:
+        workers = project_data.get("workers") or default_worker_count()
+    workers = max(1, int(workers))
+    cap = parallel_limit(config, project_data)
+    if cap and workers > cap:
+        print(f"[!] Grading {cap} students at a time (max_parallel) instead of {workers}.")
+        workers = cap
+
+    students = []
+    for student_id in sorted(os.listdir(student_dir)):
         student_path = os.path.join(student_dir, student_id)
-        if not os.path.isdir(student_path):
-            continue
+        if os.path.isdir(student_path):
+            students.append((student_id, student_path))
 
-       
-        main_file = None
-        for ext in [".py", ".c", ".cpp", ".java", ".kt", ".go", ".rb", ".js", ".rs", ".kt"]:
-            for fname in os.listdir(student_path):
-                if fname.endswith(ext):
-                    main_file = os.path.join(student_path, fname)
-                    break
-            if main_file:
-                break
-
-        if not main_file:
-            print(f"[!] No source file found for {student_id}")
-            results.append((student_id, "Missing File", "-", "-"))
-            continue
+    with ExitStack() as stack:
+        sandbox = stack.enter_context(closing(create_sandbox(config, project_data)))
+        finder = EntryPointFinder(config, project_data.get("file_index"))
+        scratch = stack.enter_context(closing(create_scratch_area(config, project_data)))
+        cache = create_compile_cache(config, project_data)
+        warm = None
+        if sandbox.name == "local":
+            warm = create_warm_runners(config, project_data, workers)
+            if warm:
+                stack.callback(warm.close)
+        elif project_data.get("warm_runner", config.get("warm_runner", False)):
+            print(f"[!] Warm runners are off: programs run in the {sandbox.name} sandbox.")
 
-       
-        compile_cmd = compile_template.replace("{main_file}", f"\"{main_file}\"")
-        run_cmd = run_template.replace("{main_file}", f"\"{main_file}\"")
-        if input_type == "Command-line Arguments" and cli_args.strip():
-            run_cmd += " " + cli_args.strip()
+        previous_fingerprints = {}
+        previous_results = {}
+        if project_data.get("incremental", True):
+            previous_fingerprints = project_data.get("fingerprints") or {}
+            try:
+                previous_results = {result.student_id: result for result in load_results(project_data.get("results"))}
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"[!] Ignoring stored results: {e}")
+        base_digest = grading_digest(config, project_data)
+        test_cases = load_test_cases(project_data)
+        if store:
+            store.save_test_cases(test_cases)
 
-        print(f"[>] Running for {student_id}: {run_cmd}")
+        fingerprints = {}
+        compiled = {}
+        compile_times = {}
+        if project_data.get("batch_compile", config.get("batch_compile", False)):
+            jobs = []
+            for student_id, student_path in students:
+                with profiler.phase(student_id, "fingerprint"):
+                    fingerprint = fingerprints[student_id] = submission_fingerprint(student_path, base_digest)
+                if previous_fingerprints.get(student_id) == fingerprint and student_id in previous_results:
+                    continue
+                main_file = finder.find(student_id, student_path)
+                if main_file:
+                    jobs.append((student_id, student_path,
+                                 expand_command(config["compile_command"], main_file, student_path)))
+            compiled = batch_compile(jobs, workers, resource_limits(config, project_data).get("compile_time_limit"),
+                                     cache, cancel_event, sandbox, program_environment(config, project_data),
+                                     compile_times)
 
-       
-        success, compile_log = compile_code(compile_cmd, cwd=student_path)
-        if not success:
-            print(f"[✗] {student_id}: Compile Failed")
-            results.append((student_id, "Compile Failed", "-", "-"))
-            continue
+        progress_lock = threading.Lock()
+        progress = {"done": 0}
 
-        output_file = os.path.join(student_path, "output.txt")
-        success, run_log = run_executable(run_cmd, input_type, input_file, cli_args, output_file, cwd=student_path)
-        if not success:
-            print(f"[✗] {student_id}: Runtime Error")
-            results.append((student_id, "Compiled", "Runtime Error", "-"))
-            continue
+        def grade(student_id, student_path):
+            with profiler.phase(student_id, "total"):
+                result, fingerprint = _grade_or_reuse(student_id, student_path)
+            if store and fingerprint and result is not previous_results.get(student_id):
+                try:
+                    store.save_result(result, fingerprint)
+                except Exception as e:
+                    print(f"[✗] {student_id}: Failed to save result: {e}")
+            if on_result:
+                with progress_lock:
+                    progress["done"] += 1
+                    done = progress["done"]
+                on_result(result, done, len(students))
+            return result, fingerprint
 
-      
-        try:
-            with open(output_file, 'r') as out_f, open(expected_output_file, 'r') as exp_f:
-                student_output = out_f.read().strip()
-                expected_output = exp_f.read().strip()
-                if student_output == expected_output:
-                    print(f"[✓] {student_id}: Passed")
-                    results.append((student_id, "Compiled", "Executed", "Passed"))
-                else:
-                    print(f"[✗] {student_id}: Wrong Output")
-                    results.append((student_id, "Compiled", "Executed", "Wrong Output"))
-        except Exception as e:
-            print(f"[!] Output Comparison Error: {e}")
-            results.append((student_id, "Compiled", "Executed", "Output Error"))
+        def _grade_or_reuse(student_id, student_path):
+            if cancel_event is not None and cancel_event.is_set():
+                return SubmissionResult(student_id, CANCELLED), None
+            fingerprint = fingerprints.get(student_id)
+            if not fingerprint:
+                with profiler.phase(student_id, "fingerprint"):
+                    fingerprint = submission_fingerprint(student_path, base_digest)
+            if previous_fingerprints.get(student_id) == fingerprint and student_id in previous_results:
+                print(f"[=] {student_id}: Unchanged, reusing previous result")
+                return previous_results[student_id], fingerprint
+            try:
+                return grade_submission(student_id, student_path, config, project_data, cache, test_cases,
+                                        cancel_event, warm, compiled.get(student_id), profiler, sandbox,
+                                        finder, scratch, compile_times.get(student_id)), fingerprint
+            except GradingCancelled:
+                print(f"[!] {student_id}: Cancelled")
+                return SubmissionResult(student_id, CANCELLED), None
+
+        if workers == 1:
+            graded = [grade(student_id, student_path) for student_id, student_path in students]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(grade, student_id, student_path) for student_id, student_path in students]
+                graded = [future.result() for future in futures]
+
+    results = [result for result, _ in graded]
+    project_data["fingerprints"] = {result.student_id: fingerprint for result, fingerprint in graded if fingerprint}
+    project_data["file_index"] = finder.export(student_id for student_id, _ in students)
 
     print("\n[!] Note: Make sure to use '{main_file}' in your config file for full compatibility.")
     return results
 
 
-def save_results_to_project(project_path, results):
+def save_results_to_project(project_path, results, fingerprints=None, file_index=None):
+    """
+    Stores the results of a grading pass in the project file and adds the
+    pass to its history (core.history), unless it was cancelled. Returns
+    False, after logging why, when they could not be saved.
+    """
     try:
-        with open(project_path, 'r') as f:
-            project_data = json.load(f)
-
-        project_data["results"] = results
-
-        with open(project_path, 'w') as f:
-            json.dump(project_data, f, indent=4)
+        run = None
+        if any(result.compile_status == CANCELLED for result in results):
+            print("[!] The run was cancelled; it is not added to the history.")
+        else:
+            run = make_run(results)
+        with closing(open_store(project_path)) as store:
+            store.save_results(results, fingerprints, file_index, run)
 
         print("[✓] Results saved to project file.")
+        return True
     except Exception as e:
         print(f"[✗] Failed to save results: {e}")
+        return False
 
 def normalize_output(path):
     with open(path, "r", encoding="utf-8") as f:
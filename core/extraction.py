@@ -0,0 +1,251 @@
+import json
+import os
+import shutil
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from core.profiling import NULL_PROFILER
+
+COPY_CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = ".iae_manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_LIMITS = {
+    "max_total_mb": 512,
+    "max_entries": 10000,
+    "max_ratio": 200
+}
+# Compression ratios are only checked past this size; tiny text files legitimately compress very well.
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+
+class ExtractionError(Exception):
+    """Raised when an archive is unsafe to extract (zip bomb, path traversal, ...)."""
+
+
+def default_worker_count():
+    return max(1, min(16, os.cpu_count() or 1))
+
+
+def list_zip_files(zip_dir):
+    return sorted(f for f in os.listdir(zip_dir) if f.lower().endswith(".zip"))
+
+
+def _member_parts(name):
+    """Splits an archive member name into path parts, rejecting absolute paths and '..'."""
+    normalized = name.replace("\\", "/")
+    if normalized.startswith("/") or (len(normalized) > 1 and normalized[1] == ":"):
+        raise ExtractionError(f"Absolute path in archive: {name}")
+    parts = [part for part in normalized.split("/") if part not in ("", ".")]
+    if ".." in parts:
+        raise ExtractionError(f"Path traversal in archive: {name}")
+    return parts
+
+
+def _check_limits(infos, limits):
+    if len(infos) > limits["max_entries"]:
+        raise ExtractionError(f"Too many entries ({len(infos)} > {limits['max_entries']})")
+
+    max_total = limits["max_total_mb"] * 1024 * 1024
+    total = sum(info.file_size for info in infos)
+    if total > max_total:
+        raise ExtractionError(f"Uncompressed size {total} bytes exceeds {limits['max_total_mb']} MB")
+
+    compressed = sum(info.compress_size for info in infos)
+    if total > RATIO_CHECK_MIN_BYTES and total > limits["max_ratio"] * max(compressed, 1):
+        raise ExtractionError(f"Compression ratio above {limits['max_ratio']}:1, possible zip bomb")
+    for info in infos:
+        if info.file_size > RATIO_CHECK_MIN_BYTES and info.file_size > limits["max_ratio"] * max(info.compress_size, 1):
+            raise ExtractionError(f"{info.filename} has a compression ratio above {limits['max_ratio']}:1")
+
+
+def extract_zip(zip_path, extract_to, limits=None):
+    """
+    Extracts one submission archive into extract_to, streaming each member
+    straight to its final location. As before, an archive whose entries all
+    live under a single top-level folder is flattened into extract_to.
+
+    Raises ExtractionError if the archive breaks one of the limits (total
+    uncompressed size, entry count, compression ratio) or contains absolute
+    or '..' paths. Sizes are enforced on the bytes actually written, so a
+    lying header does not help. A folder created for a rejected archive is
+    removed again.
+    """
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+    created = not os.path.exists(extract_to)
+    os.makedirs(extract_to, exist_ok=True)
+    root = os.path.realpath(extract_to)
+
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            infos = zip_ref.infolist()
+            _check_limits(infos, limits)
+
+            members = [(info, _member_parts(info.filename)) for info in infos]
+            top_level_names = set(parts[0] for info, parts in members if len(parts) > 1 or info.is_dir())
+            strip = list(top_level_names)[0] if len(top_level_names) == 1 else None
+
+            max_total = limits["max_total_mb"] * 1024 * 1024
+            written = 0
+            for info, parts in members:
+                if strip and parts and parts[0] == strip:
+                    parts = parts[1:]
+                if not parts:
+                    continue
+                dest = os.path.join(root, *parts)
+                if not os.path.realpath(dest).startswith(root + os.sep):
+                    raise ExtractionError(f"{info.filename} escapes the extraction folder")
+
+                if info.is_dir():
+                    os.makedirs(dest, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                with zip_ref.open(info) as src, open(dest, 'wb') as dst:
+                    member_written = 0
+                    for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+                        member_written += len(chunk)
+                        written += len(chunk)
+                        if member_written > info.file_size or written > max_total:
+                            raise ExtractionError(f"{info.filename} is larger than its header claims")
+                        dst.write(chunk)
+    except (ExtractionError, zipfile.BadZipFile):
+        if created:
+            shutil.rmtree(extract_to, ignore_errors=True)
+        raise
+
+
+def _file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return f"{crc:08x}"
+
+
+def load_manifest(extract_root):
+    """Reads the extraction manifest of extract_root; a missing or broken one counts as empty."""
+    try:
+        with open(os.path.join(extract_root, MANIFEST_NAME), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest["archives"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+def save_manifest(extract_root, archives):
+    path = os.path.join(extract_root, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "archives": archives}, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def _owned_folder(extract_root, zip_name):
+    """
+    The folder an archive named `zip_name` extracts to, derived the same
+    way as during extraction, or None if the name (read from a manifest
+    that may be stale or edited) would point anywhere but a direct
+    subfolder of `extract_root`.
+    """
+    folder = os.path.splitext(zip_name)[0] if isinstance(zip_name, str) else ""
+    if os.path.basename(folder) != folder or folder in ("", ".", "..") or (os.altsep and os.altsep in folder):
+        return None
+    path = os.path.join(extract_root, folder)
+    root = os.path.realpath(extract_root)
+    if os.path.dirname(os.path.realpath(path)) != root:
+        return None
+    return path
+
+
+def _is_unchanged(entry, zip_path, st, extract_to):
+    """
+    True if the archive matches its manifest entry. Size and mtime decide in
+    the common case; when only the mtime moved, the CRC settles it.
+    """
+    if not entry or not os.path.isdir(extract_to) or entry.get("size") != st.st_size:
+        return False
+    if entry.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    if entry.get("crc32") == _file_crc32(zip_path):
+        entry["mtime_ns"] = st.st_mtime_ns
+        return True
+    return False
+
+
+def extract_all(zip_dir, extract_root, workers=None, limits=None, on_progress=None, incremental=True, profiler=None):
+    """
+    Extracts every ZIP in zip_dir into extract_root/<zip name> on a thread
+    pool. on_progress(zip_name, done, total) is called from the worker
+    threads after each archive. Returns (zip_name, error) pairs in name
+    order, with error None for archives that extracted cleanly.
+
+    With incremental, a manifest in extract_root records each archive's
+    size, mtime and CRC-32. Unchanged archives are skipped, changed ones are
+    extracted into a clean folder, and the folders of archives that were
+    removed from zip_dir are deleted.
+
+    A core.profiling.Profiler passed as `profiler` times each archive as
+    an "extract" phase.
+    """
+    profiler = profiler or NULL_PROFILER
+    zip_files = list_zip_files(zip_dir)
+    workers = max(1, int(workers or default_worker_count()))
+    manifest = load_manifest(extract_root) if incremental else {}
+    progress_lock = threading.Lock()
+    progress = {"done": 0}
+
+    def extract(zip_name):
+        with profiler.phase(zip_name, "extract"):
+            return _extract(zip_name)
+
+    def _extract(zip_name):
+        zip_path = os.path.join(zip_dir, zip_name)
+        extract_to = os.path.join(extract_root, os.path.splitext(zip_name)[0])
+        entry = manifest.get(zip_name)
+        new_entry, error = None, None
+        try:
+            st = os.stat(zip_path)
+            if incremental and _is_unchanged(entry, zip_path, st, extract_to):
+                new_entry = entry
+            else:
+                if entry:
+                    # Only folders the manifest owns are cleared; files of an older upload must not linger.
+                    shutil.rmtree(extract_to, ignore_errors=True)
+                crc = _file_crc32(zip_path)
+                extract_zip(zip_path, extract_to, limits)
+                new_entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "crc32": crc,
+                             "folder": os.path.basename(extract_to)}
+                print(f"[✓] Extracted {zip_name}")
+        except Exception as e:
+            error = str(e)
+            print(f"[✗] Failed to extract {zip_name}: {error}")
+        if on_progress:
+            with progress_lock:
+                progress["done"] += 1
+                done = progress["done"]
+            on_progress(zip_name, done, len(zip_files))
+        return zip_name, new_entry, error
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        extracted = list(pool.map(extract, zip_files))
+
+    if incremental:
+        archives = {name: entry for name, entry, _ in extracted if entry}
+        for zip_name in manifest:
+            if zip_name in zip_files:
+                continue
+            folder = _owned_folder(extract_root, zip_name)
+            if folder:
+                print(f"[-] {zip_name} was removed, deleting its folder")
+                shutil.rmtree(folder, ignore_errors=True)
+            else:
+                print(f"[!] Ignoring manifest entry {zip_name!r}: not an archive of this folder")
+        try:
+            save_manifest(extract_root, archives)
+        except OSError as e:
+            print(f"[!] Failed to save extraction manifest: {e}")
+
+    return [(name, error) for name, _, error in extracted]
@@ -0,0 +1,191 @@
+"""
+Grading history: one immutable snapshot per saved grading pass.
+
+A snapshot ("run") keeps, per student, the Test-tab statuses, the compile
+and run times in milliseconds, the exit code, signal and output size. It
+is stored column by column with the status strings dictionary-encoded
+and the whole thing zlib-compressed, so a thousand students take a few
+kilobytes. Next to the encoded data a run carries its id, creation time
+and totals, so runs can be listed without decoding them:
+
+    {"id": 3, "created": "2024-05-02T14:03:11", "students": 120, "passed": 97,
+     "seconds": 41.2, "data": b"..."}
+
+JSON projects keep the runs under "history" (data base64-encoded), SQLite
+projects in the `runs` table; see core.store. Only the newest
+HISTORY_LIMIT runs are kept.
+
+diff_runs() lists the students whose status or time changed between two
+runs. Decoded snapshots are cached, so comparing many pairs of runs only
+decodes each run once.
+
+    python -m core.history project.json            # list runs
+    python -m core.history project.json 3 7        # diff run 3 against run 7
+"""
+import base64
+import functools
+import json
+import sys
+import time
+import zlib
+
+SNAPSHOT_VERSION = 1
+HISTORY_LIMIT = 50
+STATUS_COLUMNS = ("compile_status", "run_status", "result")
+SNAPSHOT_COLUMNS = ("student_id",) + STATUS_COLUMNS + ("compile_ms", "run_ms", "exit_code", "signal", "output_bytes")
+
+ADDED = "Added"
+REMOVED = "Removed"
+STATUS_CHANGED = "Status"
+SLOWER = "Slower"
+FASTER = "Faster"
+
+
+def encode_snapshot(results):
+    """The compressed, columnar snapshot of a list of SubmissionResult records."""
+    strings = {}
+    columns = {column: [] for column in SNAPSHOT_COLUMNS}
+    for result in results:
+        columns["student_id"].append(result.student_id)
+        for column in STATUS_COLUMNS:
+            columns[column].append(strings.setdefault(getattr(result, column), len(strings)))
+        columns["compile_ms"].append(round(result.compile_time * 1000))
+        columns["run_ms"].append(round(result.run_time * 1000))
+        columns["exit_code"].append(result.exit_code)
+        columns["signal"].append(result.signal)
+        columns["output_bytes"].append(result.output_bytes)
+    payload = {"version": SNAPSHOT_VERSION, "strings": list(strings), "columns": columns}
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), 9)
+
+
+@functools.lru_cache(maxsize=128)
+def decode_snapshot(data):
+    """
+    {student_id: (compile_status, run_status, result, compile_ms, run_ms,
+    exit_code, signal, output_bytes)} of an encoded snapshot. Snapshots
+    never change, so the decoded form is cached by content; do not modify it.
+    """
+    payload = json.loads(zlib.decompress(data))
+    if payload.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {payload.get('version')}")
+    strings = payload["strings"]
+    columns = payload["columns"]
+    for column in STATUS_COLUMNS:
+        columns[column] = [strings[index] for index in columns[column]]
+    return dict(zip(columns["student_id"], zip(*(columns[column] for column in SNAPSHOT_COLUMNS[1:]))))
+
+
+def make_run(results, created=None):
+    """A new run (without an id; the store assigns it) for the results of a grading pass."""
+    return {
+        "created": created or time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "students": len(results),
+        "passed": sum(1 for result in results if result.result == "Passed"),
+        "seconds": round(sum(result.compile_time + result.run_time for result in results), 3),
+        "data": encode_snapshot(results),
+    }
+
+
+def run_to_json(run):
+    return dict(run, data=base64.b64encode(run["data"]).decode("ascii"))
+
+
+def run_from_json(entry):
+    return dict(entry, data=base64.b64decode(entry["data"]))
+
+
+def run_label(run):
+    return f"#{run['id']}  {run['created'].replace('T', ' ')}  {run['passed']}/{run['students']} passed"
+
+
+class RunChange:
+    """One student that differs between two runs; `before`/`after` are None for added/removed students."""
+    __slots__ = ("student_id", "kind", "before", "after", "time_before", "time_after")
+
+    def __init__(self, student_id, kind, before=None, after=None, time_before=None, time_after=None):
+        self.student_id = student_id
+        self.kind = kind
+        self.before = before
+        self.after = after
+        self.time_before = time_before
+        self.time_after = time_after
+
+    def row(self):
+        """The (id, change, before, after, time before, time after) columns of the compare view."""
+        return (self.student_id, self.kind, self.before or "-", self.after or "-",
+                _format_time(self.time_before), _format_time(self.time_after))
+
+    def __repr__(self):
+        return f"RunChange({self.student_id!r}, {self.kind!r}, {self.before!r} -> {self.after!r})"
+
+
+def _format_time(ms):
+    return "-" if ms is None else f"{ms / 1000:.2f}s"
+
+
+def _status(row):
+    compile_status, run_status, result = row[:3]
+    if compile_status != "Compiled":
+        return compile_status
+    if run_status not in ("Executed", "-"):
+        return run_status
+    return result
+
+
+def diff_runs(old, new, time_tolerance=0.25, min_time_delta_ms=50):
+    """
+    The RunChange of every student whose status differs between the runs
+    `old` and `new`, who is only in one of them, or whose compile + run
+    time changed by more than `time_tolerance` (relative) and
+    `min_time_delta_ms`. Ordered by student ID.
+    """
+    before = decode_snapshot(old["data"])
+    after = decode_snapshot(new["data"])
+    changes = []
+    for student_id in sorted(before.keys() | after.keys()):
+        old_row = before.get(student_id)
+        new_row = after.get(student_id)
+        old_time = old_row[3] + old_row[4] if old_row else None
+        new_time = new_row[3] + new_row[4] if new_row else None
+        if old_row is None:
+            changes.append(RunChange(student_id, ADDED, None, _status(new_row), None, new_time))
+        elif new_row is None:
+            changes.append(RunChange(student_id, REMOVED, _status(old_row), None, old_time, None))
+        elif old_row[:3] != new_row[:3]:
+            changes.append(RunChange(student_id, STATUS_CHANGED, _status(old_row), _status(new_row),
+                                     old_time, new_time))
+        elif abs(new_time - old_time) > max(min_time_delta_ms, time_tolerance * old_time):
+            changes.append(RunChange(student_id, SLOWER if new_time > old_time else FASTER, _status(old_row),
+                                     _status(new_row), old_time, new_time))
+    return changes
+
+
+def _main(argv):
+    from contextlib import closing
+    from core.store import open_store
+
+    if len(argv) not in (1, 3):
+        print("usage: python -m core.history PROJECT [OLD_RUN NEW_RUN]", file=sys.stderr)
+        return 2
+    with closing(open_store(argv[0], create=False)) as store:
+        runs = {run["id"]: run for run in store.history()}
+    if len(argv) == 1:
+        for run in runs.values():
+            print(f"{run_label(run)}  {run['seconds']:.1f}s")
+        return 0
+
+    try:
+        old, new = runs[int(argv[1])], runs[int(argv[2])]
+    except (KeyError, ValueError):
+        print(f"[!] Unknown run; the project has runs {', '.join(map(str, runs)) or 'none'}", file=sys.stderr)
+        return 2
+    changes = diff_runs(old, new)
+    for change in changes:
+        student_id, kind, status_before, status_after, time_before, time_after = change.row()
+        print(f"{student_id}\t{kind}\t{status_before} -> {status_after}\t{time_before} -> {time_after}")
+    print(f"[✓] {len(changes)} of {len(decode_snapshot(new['data']))} students changed", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+import csv
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PHASES = ("extract", "fingerprint", "compile", "spawn", "run", "compare", "total")
+SLOWEST_COUNT = 10
+SAMPLE_COLUMNS = ["subject", "phase", "wall_time", "cpu_time", "max_rss_kb"]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(math.ceil(fraction * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class Profiler:
+    """
+    Collects wall time, CPU time and peak RSS per phase of a grading pass.
+
+    Code under measurement wraps each phase in `with profiler.phase(subject,
+    name) as sample:` where subject is a student id (or an archive name for
+    extraction). `sample` is a dict the phase may add child-process usage
+    to ("cpu_time" in seconds, "max_rss_kb"); the CPU time the grading
+    thread itself spends is added automatically. Safe to share between
+    threads.
+
+    When profiling is off pass NULL_PROFILER instead: its phase() hands out
+    a shared no-op context with sample None, so the hot path only pays for
+    one method call.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+
+    @contextmanager
+    def phase(self, subject, name):
+        sample = {"cpu_time": 0.0, "max_rss_kb": 0}
+        started = time.perf_counter()
+        thread_started = time.thread_time()
+        try:
+            yield sample
+        finally:
+            self.record(subject, name, time.perf_counter() - started,
+                        sample["cpu_time"] + time.thread_time() - thread_started, sample["max_rss_kb"])
+
+    def record(self, subject, name, wall_time, cpu_time=0.0, max_rss_kb=0):
+        with self._lock:
+            self.samples.append((subject, name, wall_time, cpu_time, max_rss_kb))
+
+    def summary(self):
+        """Per-phase totals and percentiles plus the slowest subjects, as a JSON-ready dict."""
+        with self._lock:
+            samples = list(self.samples)
+
+        phases = {}
+        per_subject = {}
+        for subject, name, wall, cpu, rss in samples:
+            phases.setdefault(name, []).append((wall, cpu, rss))
+            if name != "total":
+                times = per_subject.setdefault(subject, {})
+                times[name] = times.get(name, 0.0) + wall
+            else:
+                per_subject.setdefault(subject, {})["total"] = wall
+
+        report = {"phases": {}, "slowest": []}
+        for name in sorted(phases, key=lambda n: PHASES.index(n) if n in PHASES else len(PHASES)):
+            values = phases[name]
+            walls = sorted(wall for wall, _, _ in values)
+            report["phases"][name] = {
+                "count": len(values),
+                "total": sum(walls),
+                "mean": sum(walls) / len(walls),
+                "p50": percentile(walls, 0.5),
+                "p90": percentile(walls, 0.9),
+                "p99": percentile(walls, 0.99),
+                "max": walls[-1],
+                "cpu_total": sum(cpu for _, cpu, _ in values),
+                "max_rss_kb": max(rss for _, _, rss in values)
+            }
+
+        def subject_total(item):
+            times = item[1]
+            return times.get("total", sum(times.values()))
+
+        for subject, times in sorted(per_subject.items(), key=subject_total, reverse=True)[:SLOWEST_COUNT]:
+            report["slowest"].append(dict(subject=subject, **times))
+        return report
+
+    def format_summary(self):
+        """The summary as a plain-text table for logs."""
+        report = self.summary()
+        lines = [f"{'phase':<12}{'count':>7}{'total s':>10}{'p50 s':>9}{'p90 s':>9}{'p99 s':>9}{'max s':>9}"
+                 f"{'cpu s':>9}{'rss MB':>9}"]
+        for name, stats in report["phases"].items():
+            lines.append(f"{name:<12}{stats['count']:>7}{stats['total']:>10.2f}{stats['p50']:>9.3f}"
+                         f"{stats['p90']:>9.3f}{stats['p99']:>9.3f}{stats['max']:>9.3f}{stats['cpu_total']:>9.2f}"
+                         f"{stats['max_rss_kb'] / 1024:>9.1f}")
+        if report["slowest"]:
+            lines.append("Slowest: " + ", ".join(
+                f"{item['subject']} ({item.get('total', 0.0):.2f}s)" for item in report["slowest"]))
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Writes the raw samples as CSV for a .csv path, otherwise the summary plus samples as JSON."""
+        with self._lock:
+            samples = list(self.samples)
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(SAMPLE_COLUMNS)
+                writer.writerows(samples)
+            return
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(),
+                       "samples": [dict(zip(SAMPLE_COLUMNS, sample)) for sample in samples]}, f, indent=4)
+
+
+class _NullProfiler:
+    enabled = False
+    _context = nullcontext(None)
+
+    def phase(self, subject, name):
+        return self._context
+
+    def record(self, subject, name, wall_time, cpu_time=0.0, max_rss_kb=0):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,269 @@
+"""
+Result records for graded submissions and their on-disk format.
+
+A SubmissionResult keeps the four columns the Test tab shows plus the phase
+timings, exit code, signal and output size of the run, and one CaseResult
+per test case. Project files store them column-ordered:
+
+    "results": {"version": 2, "columns": [...], "case_columns": [...], "rows": [[...], ...]}
+
+Older project files hold a plain list of [id, compile, run, result] rows
+(with an optional fifth [[case, status], ...] element); load_results()
+accepts both.
+
+ResultTable is the in-memory, column-ordered model the Test tab shows.
+"""
+import re
+
+RESULTS_VERSION = 2
+
+
+class CaseResult:
+    __slots__ = ("name", "status", "exit_code", "signal", "run_time", "compare_time", "output_bytes", "output_file")
+
+    def __init__(self, name, status, exit_code=None, signal=None, run_time=0.0, compare_time=0.0, output_bytes=0,
+                 output_file=None):
+        self.name = name
+        self.status = status
+        self.exit_code = exit_code
+        self.signal = signal
+        self.run_time = run_time
+        self.compare_time = compare_time
+        self.output_bytes = output_bytes
+        # Where the program's output was kept (see core.scratch), or None.
+        self.output_file = output_file
+
+    @property
+    def passed(self):
+        return self.status == "Passed"
+
+    def to_list(self):
+        return [_compact(getattr(self, field)) for field in self.__slots__]
+
+    def to_dict(self):
+        return {field: _compact(getattr(self, field)) for field in self.__slots__}
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+    def __repr__(self):
+        return f"CaseResult({self.name!r}, {self.status!r})"
+
+
+class SubmissionResult:
+    __slots__ = ("student_id", "compile_status", "run_status", "result", "cases",
+                 "compile_time", "run_time", "compare_time", "exit_code", "signal", "output_bytes")
+    # Written to disk in this order; "cases" is stored as nested CaseResult rows.
+    COLUMNS = __slots__
+
+    def __init__(self, student_id, compile_status, run_status="-", result="-", cases=None, compile_time=0.0,
+                 run_time=0.0, compare_time=0.0, exit_code=None, signal=None, output_bytes=0):
+        self.student_id = student_id
+        self.compile_status = compile_status
+        self.run_status = run_status
+        self.result = result
+        self.cases = cases or []
+        self.compile_time = compile_time
+        self.run_time = run_time
+        self.compare_time = compare_time
+        self.exit_code = exit_code
+        self.signal = signal
+        self.output_bytes = output_bytes
+
+    def row(self):
+        """The (id, compile, run, result) columns shown in the Test tab."""
+        return self.student_id, self.compile_status, self.run_status, self.result
+
+    @property
+    def total_time(self):
+        return self.compile_time + self.run_time + self.compare_time
+
+    @property
+    def passed_cases(self):
+        return sum(1 for case in self.cases if case.passed)
+
+    def to_list(self):
+        return [[case.to_list() for case in self.cases] if field == "cases" else _compact(getattr(self, field))
+                for field in self.COLUMNS]
+
+    def to_dict(self):
+        data = {field: _compact(getattr(self, field)) for field in self.COLUMNS if field != "cases"}
+        data["cases"] = [case.to_dict() for case in self.cases]
+        return data
+
+    @classmethod
+    def from_list(cls, values, columns=COLUMNS, case_columns=CaseResult.__slots__):
+        data = dict(zip(columns, values))
+        data["cases"] = [CaseResult(**{field: value for field, value in zip(case_columns, case)
+                                       if field in CaseResult.__slots__})
+                         for case in data.get("cases") or []]
+        return cls(**{field: value for field, value in data.items() if field in cls.COLUMNS})
+
+    @classmethod
+    def from_legacy(cls, row):
+        """Converts a version 1 row: [id, compile, run, result] plus optional [[case, status], ...]."""
+        cases = [CaseResult(name, status) for name, status in row[4]] if len(row) > 4 else []
+        return cls(row[0], row[1], row[2], row[3], cases)
+
+    def __repr__(self):
+        return f"SubmissionResult{self.row()!r}"
+
+
+def _compact(value):
+    # Timings are kept to the microsecond; more digits only bloat the project file.
+    return round(value, 6) if isinstance(value, float) else value
+
+
+def dump_results(results):
+    """JSON-ready form of a list of SubmissionResult records."""
+    return {
+        "version": RESULTS_VERSION,
+        "columns": list(SubmissionResult.COLUMNS),
+        "case_columns": list(CaseResult.__slots__),
+        "rows": [result.to_list() for result in results]
+    }
+
+
+def load_results(data):
+    """
+    SubmissionResult records from the "results" entry of a project file,
+    in either the current format or the version 1 list of rows.
+    """
+    if not data:
+        return []
+    if isinstance(data, list):
+        return [SubmissionResult.from_legacy(row) for row in data]
+    version = data.get("version")
+    if version != RESULTS_VERSION:
+        raise ValueError(f"Unsupported results version: {version}")
+    columns = data.get("columns", SubmissionResult.COLUMNS)
+    case_columns = data.get("case_columns", CaseResult.__slots__)
+    return [SubmissionResult.from_list(row, columns, case_columns) for row in data.get("rows", [])]
+
+
+# Status filters the Test tab offers besides the outcomes themselves.
+FILTER_ALL = "All"
+FILTER_FAILED = "Not Passed"
+PARTIAL = "Partially Passed"
+
+
+def outcome(result):
+    """The single status a result is filtered by: why it stopped, or how it compared."""
+    if result.compile_status != "Compiled":
+        return result.compile_status
+    if result.run_status not in ("Executed", "-"):
+        return result.run_status
+    if result.result.endswith(" Passed"):
+        return PARTIAL
+    return result.result
+
+
+def _natural_key(value):
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part.lower())
+            for part in re.split(r"(\d+)", str(value)) if part]
+
+
+class ResultTable:
+    """
+    The Test tab's results, kept column by column so sorting, filtering
+    and searching never build a row that is not shown.
+
+    update() and set_results() change the data; set_sort() and
+    set_filter() change the view, which is recomputed lazily the next time
+    it is read. len(table) is the number of rows in the view, row(i) the
+    Treeview values of its i-th row and record(i) the SubmissionResult
+    behind it. `version` increases with every change, so a widget can skip
+    redrawing when nothing happened.
+    """
+
+    SORT_KEYS = {"student_id": _natural_key}
+
+    def __init__(self, results=()):
+        self.columns = {name: [] for name in ("student_id", "compile_status", "run_status", "result", "outcome")}
+        self.records = []
+        self.positions = {}
+        self.sort_column = "student_id"
+        self.descending = False
+        self.status = FILTER_ALL
+        self.search = ""
+        self.version = 0
+        self._view = None
+        self.set_results(results)
+
+    def set_results(self, results):
+        for column in self.columns.values():
+            column.clear()
+        self.records = []
+        self.positions = {}
+        for result in results:
+            self._append(result)
+        self._changed()
+
+    def update(self, result):
+        """Adds or replaces the row of result.student_id; returns False if it was already identical."""
+        position = self.positions.get(result.student_id)
+        if position is None:
+            self._append(result)
+        else:
+            values = (*result.row(), outcome(result))
+            if self.records[position] is result or all(
+                    self.columns[name][position] == value for name, value in zip(self.columns, values)):
+                self.records[position] = result
+                return False
+            for name, value in zip(self.columns, values):
+                self.columns[name][position] = value
+            self.records[position] = result
+        self._changed()
+        return True
+
+    def set_sort(self, column, descending=False):
+        self.sort_column, self.descending = column, descending
+        self._changed()
+
+    def set_filter(self, status=FILTER_ALL, search=""):
+        """Shows rows whose outcome() is `status` (FILTER_FAILED: anything but Passed) and whose ID contains `search`."""
+        self.status, self.search = status or FILTER_ALL, (search or "").strip().lower()
+        self._changed()
+
+    def statuses(self):
+        """The outcomes present, for the status filter."""
+        return sorted(set(self.columns["outcome"]))
+
+    def view(self):
+        """Positions of the visible rows, in display order."""
+        if self._view is None:
+            positions = range(len(self.records))
+            if self.status == FILTER_FAILED:
+                outcomes = self.columns["outcome"]
+                positions = [p for p in positions if outcomes[p] != "Passed"]
+            elif self.status != FILTER_ALL:
+                outcomes = self.columns["outcome"]
+                positions = [p for p in positions if outcomes[p] == self.status]
+            if self.search:
+                ids = self.columns["student_id"]
+                positions = [p for p in positions if self.search in str(ids[p]).lower()]
+            column = self.columns[self.sort_column]
+            key = self.SORT_KEYS.get(self.sort_column, str)
+            self._view = sorted(positions, key=lambda p: key(column[p]), reverse=self.descending)
+        return self._view
+
+    def __len__(self):
+        return len(self.view())
+
+    def row(self, index):
+        position = self.view()[index]
+        return tuple(self.columns[name][position] for name in ("student_id", "compile_status", "run_status", "result"))
+
+    def record(self, index):
+        return self.records[self.view()[index]]
+
+    def _append(self, result):
+        self.positions[result.student_id] = len(self.records)
+        self.records.append(result)
+        for name, value in zip(self.columns, (*result.row(), outcome(result))):
+            self.columns[name].append(value)
+
+    def _changed(self):
+        self._view = None
+        self.version += 1
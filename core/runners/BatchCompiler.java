@@ -0,0 +1,47 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+import java.util.Arrays;
+import java.util.Base64;
+import javax.tools.JavaCompiler;
+import javax.tools.ToolProvider;
+
+/**
+ * Compiles many independent submissions in one JVM for core.batch. Usage:
+ *
+ *   java BatchCompiler jobs.txt results.txt
+ *
+ * Every line of jobs.txt is a tab-separated job: the student id followed by
+ * the javac arguments (absolute paths, each student with its own -d). For
+ * each job one line "id, 0 or 1, base64 diagnostics" is appended to
+ * results.txt as soon as it finishes, so a batch that is killed part-way
+ * still reports the students it got through.
+ */
+public class BatchCompiler {
+    public static void main(String[] argv) throws Exception {
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        if (compiler == null) {
+            System.err.println("No system Java compiler (is this a JRE?)");
+            System.exit(2);
+        }
+        Base64.Encoder base64 = Base64.getEncoder();
+        try (BufferedReader jobs = new BufferedReader(new InputStreamReader(new FileInputStream(argv[0]), StandardCharsets.UTF_8));
+             PrintStream results = new PrintStream(new FileOutputStream(argv[1]), true, "UTF-8")) {
+            String line;
+            while ((line = jobs.readLine()) != null) {
+                String[] job = line.split("\t", -1);
+                String[] args = Arrays.copyOfRange(job, 1, job.length);
+                ByteArrayOutputStream log = new ByteArrayOutputStream();
+                int status;
+                try (PrintStream out = new PrintStream(log, true, "UTF-8")) {
+                    status = compiler.run(null, out, out, args);
+                }
+                results.println(job[0] + "\t" + (status == 0 ? 0 : 1) + "\t" + base64.encodeToString(log.toByteArray()));
+            }
+        }
+    }
+}
@@ -0,0 +1,135 @@
+import java.io.BufferedOutputStream;
+import java.io.BufferedReader;
+import java.io.ByteArrayInputStream;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.util.Arrays;
+
+/**
+ * Warm Java runner started once by core.warm and kept alive, as
+ * `WarmRunner FD`. Each request line on stdin is a tab-separated job:
+ *
+ *   token, cwd, classpath, main class, stdin file, stdout file, stderr file, args...
+ *
+ * The main class is loaded in a fresh URLClassLoader, so static state never
+ * leaks between students, with System.in/out/err pointed at the job's
+ * files. Its main method runs in a thread group of its own and, as in a
+ * JVM of its own, the job ends when every non-daemon thread it started has
+ * ended. The reply, "token status" with status 0 or 1 for an uncaught
+ * exception, goes to the pipe inherited as file descriptor FD, never to
+ * stdout, so nothing a program prints can pass for a reply. " restart" is
+ * appended when daemon threads of the job are still running: they could
+ * write into the next job's files, so the grader replaces this JVM. A
+ * student calling System.exit ends the JVM; the grader notices the closed
+ * pipe and reruns that job in a cold process.
+ */
+public class WarmRunner {
+    public static void main(String[] argv) throws Exception {
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        PrintStream protocol = new PrintStream(new FileOutputStream("/dev/fd/" + argv[0]), true, "UTF-8");
+        PrintStream originalOut = System.out;
+        PrintStream originalErr = System.err;
+        InputStream originalIn = System.in;
+
+        String line;
+        while ((line = requests.readLine()) != null) {
+            String[] job = line.split("\t", -1);
+            ThreadGroup group = new ThreadGroup("job");
+            int status = run(job, group);
+            System.setOut(originalOut);
+            System.setErr(originalErr);
+            System.setIn(originalIn);
+            protocol.println(job[0] + " " + status + (group.activeCount() > 0 ? " restart" : ""));
+        }
+    }
+
+    private static int run(String[] job, ThreadGroup group) {
+        Path cwd = Paths.get(job[1]);
+        String[] classpath = job[2].split(java.io.File.pathSeparator);
+        String[] args = Arrays.copyOfRange(job, 7, job.length);
+
+        PrintStream err = null;
+        PrintStream out = null;
+        try {
+            err = new PrintStream(new FileOutputStream(job[6]), true, "UTF-8");
+            out = new PrintStream(new BufferedOutputStream(new FileOutputStream(job[5])), false, "UTF-8");
+            InputStream in = job[4].isEmpty() ? new ByteArrayInputStream(new byte[0]) : new FileInputStream(job[4]);
+
+            URL[] urls = new URL[classpath.length];
+            for (int i = 0; i < classpath.length; i++) {
+                urls[i] = cwd.resolve(classpath[i]).toUri().toURL();
+            }
+            System.setIn(in);
+            System.setOut(out);
+            System.setErr(err);
+            try (URLClassLoader loader = new URLClassLoader(urls, ClassLoader.getPlatformClassLoader())) {
+                Throwable[] failure = new Throwable[1];
+                // Static initializers run in the job's thread group too, so threads they start count as the job's.
+                Thread main = new Thread(group, () -> {
+                    try {
+                        Class<?> mainClass = Class.forName(job[3], true, loader);
+                        Method mainMethod = mainClass.getMethod("main", String[].class);
+                        mainMethod.invoke(null, (Object) args);
+                    } catch (Throwable e) {
+                        failure[0] = e;
+                    }
+                }, "main");
+                main.setContextClassLoader(loader);
+                main.start();
+                main.join();
+                joinNonDaemonThreads(group);
+                if (failure[0] != null) {
+                    throw failure[0];
+                }
+                return 0;
+            } finally {
+                in.close();
+            }
+        } catch (InvocationTargetException e) {
+            if (err != null) {
+                err.print("Exception in thread \"main\" ");
+                e.getCause().printStackTrace(err);
+            }
+            return 1;
+        } catch (Throwable e) {
+            if (err != null) {
+                e.printStackTrace(err);
+            }
+            return 1;
+        } finally {
+            if (out != null) {
+                out.close();
+            }
+            if (err != null) {
+                err.close();
+            }
+        }
+    }
+
+    private static void joinNonDaemonThreads(ThreadGroup group) throws InterruptedException {
+        while (true) {
+            Thread[] threads = new Thread[group.activeCount() + 1];
+            Thread pending = null;
+            for (int i = 0, n = group.enumerate(threads); i < n; i++) {
+                if (!threads[i].isDaemon()) {
+                    pending = threads[i];
+                    break;
+                }
+            }
+            if (pending == null) {
+                return;
+            }
+            pending.join();
+        }
+    }
+}
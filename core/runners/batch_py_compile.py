@@ -0,0 +1,36 @@
+"""
+Byte-compiles many submissions in one interpreter for core.batch. Usage:
+
+    python batch_py_compile.py jobs.json results.jsonl
+
+jobs.json is a list of [student_id, [file, ...]]. For each student one JSON
+line [student_id, success, log] is appended to results.jsonl as soon as it is
+done, so a batch that is killed part-way still reports the students it got
+through.
+"""
+import json
+import py_compile
+import sys
+
+
+def main(jobs_path, results_path):
+    with open(jobs_path, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    with open(results_path, "a", encoding="utf-8") as results:
+        for student_id, files in jobs:
+            success, log = True, ""
+            for path in files:
+                try:
+                    py_compile.compile(path, doraise=True)
+                except py_compile.PyCompileError as e:
+                    success, log = False, e.msg
+                    break
+                except OSError as e:
+                    success, log = False, f"Can't read {path}: {e}"
+                    break
+            results.write(json.dumps([student_id, success, log]) + "\n")
+            results.flush()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,85 @@
+"""
+Warm Python runner. Started once by core.warm and kept alive; every request
+line on stdin is a JSON job, run in a forked child so each student gets a
+fresh copy of an already initialised interpreter.
+
+Protocol (one JSON object per line on stdout):
+    -> {"script", "args", "cwd", "stdin", "stdout", "stderr", "rlimits"}
+    <- {"pid": <child pid>}
+    <- {"status": <exit code, or -signal if killed>}
+"""
+import json
+import os
+import runpy
+import sys
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def run_child(job):
+    os.setsid()
+    os.environ.update(job.get("env") or {})
+    os.chdir(job["cwd"])
+    for fd, path, flags in ((0, job.get("stdin") or os.devnull, os.O_RDONLY),
+                            (1, job["stdout"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+                            (2, job["stderr"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC)):
+        target = os.open(path, flags, 0o644)
+        os.dup2(target, fd)
+        os.close(target)
+    # The parent's stdio objects may hold buffered protocol data; start from clean ones.
+    sys.stdin = sys.__stdin__ = open(0, "r", closefd=False)
+    sys.stdout = sys.__stdout__ = open(1, "w", closefd=False)
+    sys.stderr = sys.__stderr__ = open(2, "w", closefd=False, buffering=1)
+    if resource is not None:
+        for which, value in job.get("rlimits", []):
+            resource.setrlimit(which, tuple(value))
+
+    script = job["script"]
+    sys.argv = [script] + job.get("args", [])
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    code = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        code = code or 1
+    os._exit(code)
+
+
+def main():
+    protocol = sys.stdout
+    for line in sys.stdin:
+        job = json.loads(line)
+        protocol.flush()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_child(job)
+            finally:
+                os._exit(1)
+        protocol.write(json.dumps({"pid": pid}) + "\n")
+        protocol.flush()
+        _, status = os.waitpid(pid, 0)
+        protocol.write(json.dumps({"status": os.waitstatus_to_exitcode(status)}) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Starts one program inside the namespace sandbox (see core.sandbox). The
+grader execs this script instead of setting the sandbox up in a
+preexec_fn, so mounts and ctypes calls run in a fresh, single-threaded
+interpreter. It imports as little as possible, because every sandboxed
+launch pays for its start-up.
+
+    python -I -S sandbox_exec.py SPEC [-w DIR]... [-r RESOURCE:SOFT:HARD]... -- COMMAND [ARG]...
+
+SPEC is the file a core.sandbox.SandboxTemplate writes, one "key value"
+line per setting. The script unshares the namespaces and forks an init
+process, pid 1 of the new PID namespace. The init builds the read-only
+root with the writable folders (-w), mounts a fresh /proc and forks the
+program as its child, which applies the rlimits (-r) and the seccomp
+filter and execs COMMAND. The program is not pid 1 itself because pid 1
+ignores signals it has no handler for, even its own SIGKILL or abort().
+The program's wait status travels back to this script over a pipe, and
+the script exits the same way, so the grader sees the program's exit code
+or signal. A failed setup exits with 126, a missing program with 127, and
+the reason goes to stderr.
+"""
+import ctypes
+import os
+import resource
+import sys
+
+# The signal module imports enum, which costs more than the rest of the start-up together.
+import _signal as signal
+
+SETUP_FAILED_EXIT = 126
+NOT_FOUND_EXIT = 127
+
+MS_RDONLY = 0x1
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+MS_NOEXEC = 0x8
+MS_REMOUNT = 0x20
+MS_NOATIME = 0x400
+MS_NODIRATIME = 0x800
+MS_BIND = 0x1000
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+MNT_DETACH = 0x2
+LOCKED_FLAGS = ((os.ST_NOSUID, MS_NOSUID), (os.ST_NODEV, MS_NODEV), (os.ST_NOEXEC, MS_NOEXEC),
+                (os.ST_NOATIME, MS_NOATIME), (os.ST_NODIRATIME, MS_NODIRATIME))
+
+PR_SET_PDEATHSIG = 1
+PR_SET_NO_NEW_PRIVS = 38
+PR_SET_SECCOMP = 22
+SECCOMP_MODE_FILTER = 2
+
+
+class _Sockfprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.c_void_p)]
+
+
+def _unescape(path):
+    return path.replace("\\012", "\n").replace("\\134", "\\")
+
+
+def _locked_flags(path):
+    f_flag = os.statvfs(path).f_flag
+    return sum(ms_flag for st_flag, ms_flag in LOCKED_FLAGS if f_flag & st_flag)
+
+
+class Sandbox:
+    def __init__(self, spec_path):
+        self.mounts = []
+        spec = {}
+        with open(spec_path, "r") as f:
+            for line in f.read().splitlines():
+                key, _, value = line.partition(" ")
+                if key == "mount":
+                    locked, _, mount_point = value.partition(" ")
+                    self.mounts.append((_unescape(mount_point), int(locked)))
+                else:
+                    spec[key] = value
+        self.flags = int(spec["flags"])
+        self.uid = int(spec["uid"])
+        self.gid = int(spec["gid"])
+        self.id = int(spec["id"])
+        self.root = _unescape(spec["root"])
+        self.home = _unescape(spec["home"])
+        self.home_target = spec["home_target"]
+        self.tmpfs_options = spec["tmpfs"].encode()
+        self.pivot_root_number = int(spec["pivot_root"])
+        program = bytes.fromhex(spec["seccomp"])
+        self.filter = ctypes.create_string_buffer(program, len(program)) if program else None
+        self.fprog = _Sockfprog(len(program) // 8, ctypes.addressof(self.filter)) if program else None
+
+        self.libc = ctypes.CDLL("libc.so.6", use_errno=True)
+        self.libc.mount.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong,
+                                    ctypes.c_void_p]
+        self.libc.umount2.argtypes = [ctypes.c_char_p, ctypes.c_int]
+        self.libc.unshare.argtypes = [ctypes.c_int]
+        self.libc.prctl.argtypes = [ctypes.c_int, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong]
+        self.libc.syscall.argtypes = [ctypes.c_long, ctypes.c_char_p, ctypes.c_char_p]
+
+    def _check(self, result, what):
+        if result != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"{what}: {os.strerror(error)}")
+
+    def _mount(self, source, target, fstype, flags, data=None):
+        self._check(self.libc.mount(source and source.encode(), target.encode(), fstype and fstype.encode(),
+                                    flags, data), f"mount {target}")
+
+    def _write(self, path, text):
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            os.write(fd, text.encode())
+        finally:
+            os.close(fd)
+
+    def run(self, writable, rlimits, argv):
+        """Runs `argv` in the sandbox and returns its exit code, or -signal if it was killed."""
+        cwd = os.getcwd()
+        self._check(self.libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL, 0, 0, 0), "prctl")
+        self._check(self.libc.unshare(self.flags), "unshare")
+        self._write("/proc/self/setgroups", "deny")
+        self._write("/proc/self/uid_map", f"{self.id} {self.uid} 1")
+        self._write("/proc/self/gid_map", f"{self.id} {self.gid} 1")
+
+        status_read, status_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(status_read)
+            self._init(cwd, writable, rlimits, argv, status_write)
+        os.close(status_write)
+        os.waitpid(pid, 0)
+        status = os.read(status_read, 32)
+        # An init that reported nothing has already explained why on stderr.
+        return int(status) if status else SETUP_FAILED_EXIT
+
+    def _init(self, cwd, writable, rlimits, argv, status_write):
+        """pid 1 of the sandbox: builds its root, runs the program and reports how it ended. Never returns."""
+        try:
+            self._check(self.libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL, 0, 0, 0), "prctl")
+            self._enter(cwd, writable)
+        except BaseException as e:
+            _fail(SETUP_FAILED_EXIT, f"Sandbox setup failed: {e}")
+        pid = os.fork()
+        if pid == 0:
+            os.close(status_write)
+            self._exec(rlimits, argv)
+        # As init, also reap whatever the program leaves behind; the rest dies with this process.
+        while True:
+            child, status = os.waitpid(-1, 0)
+            if child == pid:
+                break
+        os.write(status_write, str(os.waitstatus_to_exitcode(status)).encode())
+        os._exit(0)
+
+    def _enter(self, cwd, writable):
+        root = self.root
+        self._mount(None, "/", None, MS_REC | MS_PRIVATE)
+        self._mount("/", root, None, MS_BIND | MS_REC)
+        for mount_point, locked in self.mounts:
+            target = root + mount_point if mount_point != "/" else root
+            try:
+                self._mount(None, target, None, MS_BIND | MS_REMOUNT | MS_RDONLY | locked)
+            except OSError:
+                # Mounts hidden below another mount cannot be reached; the ones on top are locked.
+                if os.path.ismount(target):
+                    raise
+        for path in ("/tmp", "/dev/shm"):
+            if os.path.isdir(root + path):
+                self._mount("tmpfs", root + path, "tmpfs", MS_NOSUID | MS_NODEV, self.tmpfs_options)
+        target = root + self.home_target
+        os.makedirs(target, exist_ok=True)
+        self._mount(self.home, target, None, MS_BIND)
+        if not writable:
+            self._mount(None, target, None, MS_BIND | MS_REMOUNT | MS_RDONLY | _locked_flags(self.home))
+        if cwd != "/" and not any(cwd == path or cwd.startswith(path.rstrip("/") + "/") for path in writable):
+            # The working directory stays visible (e.g. a folder under /tmp), but read-only. It is mounted
+            # before the writable folders, so those inside it are not hidden by it.
+            target = root + cwd
+            os.makedirs(target, exist_ok=True)
+            self._mount(cwd, target, None, MS_BIND | MS_REC)
+            self._mount(None, target, None, MS_BIND | MS_REMOUNT | MS_RDONLY | _locked_flags(cwd))
+        for path in writable:
+            target = root + path
+            os.makedirs(target, exist_ok=True)
+            self._mount(path, target, None, MS_BIND | MS_REC)
+        # The host's /proc would show (and let the program find) every process outside the sandbox.
+        self._mount("proc", root + "/proc", "proc", MS_NOSUID | MS_NODEV | MS_NOEXEC)
+
+        os.chdir(root)
+        self._check(self.libc.syscall(self.pivot_root_number, b".", b"."), "pivot_root")
+        self._check(self.libc.umount2(b".", MNT_DETACH), "umount old root")
+        os.chdir(cwd)
+
+    def _exec(self, rlimits, argv):
+        try:
+            self._check(self.libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL, 0, 0, 0), "prctl")
+            for which, value in rlimits:
+                resource.setrlimit(which, value)
+            if self.fprog is not None:
+                self._check(self.libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "prctl")
+                self._check(self.libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, ctypes.addressof(self.fprog),
+                                            0, 0), "seccomp")
+        except BaseException as e:
+            _fail(SETUP_FAILED_EXIT, f"Sandbox setup failed: {e}")
+        try:
+            os.execvp(argv[0], argv)
+        except OSError as e:
+            _fail(NOT_FOUND_EXIT if isinstance(e, FileNotFoundError) else SETUP_FAILED_EXIT,
+                  f"{argv[0]}: {e.strerror or e}")
+
+
+def _fail(status, message):
+    try:
+        os.write(2, f"{message}\n".encode())
+    finally:
+        os._exit(status)
+
+
+def main(argv):
+    writable, rlimits = [], []
+    i = 2
+    while i < len(argv) and argv[i] != "--":
+        if argv[i] == "-w":
+            writable.append(argv[i + 1])
+        elif argv[i] == "-r":
+            which, soft, hard = map(int, argv[i + 1].split(":"))
+            rlimits.append((which, (soft, hard)))
+        else:
+            _fail(SETUP_FAILED_EXIT, f"Sandbox setup failed: unknown option {argv[i]}")
+        i += 2
+    command = argv[i + 1:]
+    try:
+        status = Sandbox(argv[1]).run(writable, rlimits, command)
+    except BaseException as e:
+        _fail(SETUP_FAILED_EXIT, f"Sandbox setup failed: {e}")
+    if status < 0:
+        # End the way the program did, without leaving a core file behind.
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if -status not in (signal.SIGKILL, signal.SIGSTOP):
+            signal.signal(-status, signal.SIG_DFL)
+        os.kill(os.getpid(), -status)
+    os._exit(status)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,398 @@
+"""
+Execution backends that decide how isolated a compile or run is.
+
+"local" starts programs like any other process of the grader: as the
+grader's user, with the whole file system and the network in reach. Its
+rlimits are set by util-linux's prlimit, which then execs the program;
+only where prlimit is missing are they set in a preexec_fn.
+
+"namespace" (Linux only) puts every program in fresh user, mount, PID,
+network, IPC and UTS namespaces before it execs:
+- the host's mounts are bind-mounted read-only,
+- /tmp and /dev/shm are new, empty tmpfs mounts,
+- only the folders being graded are writable (for compilations; runs see
+  the student's folder read-only and write their output through the
+  file they were handed as stdout),
+- HOME points at a folder kept for the whole session, so compilers can
+  reuse their caches (the Go build cache, ...); it is writable during
+  compilations only, so a run cannot plant anything in it,
+- the network namespace is empty, so nothing can connect anywhere,
+- a seccomp filter refuses the syscalls a submission has no use for
+  (mount, ptrace, namespace and kernel-module calls, ...),
+- the program is a child of its own init process in a new PID namespace
+  with a fresh /proc, so it can neither see nor signal the grader or any
+  other process on the host,
+- it runs as user 1000 of its user namespace. That user is the grader's
+  own user mapped in, not a separate account: what keeps the program away
+  from the grader's files is the read-only file system above.
+
+The setup happens in core/runners/sandbox_exec.py, a small script the
+launch execs, so no mount or ctypes call ever runs in a child forked from
+the multi-threaded grader. Everything that does not depend on the
+submission (the list of mounts to lock, the seccomp program, the staging
+folder) is prepared once per settings in a SandboxTemplate and written to
+a spec file the script reads. No external tool such as bwrap is needed.
+"""
+import atexit
+import json
+import os
+import platform
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits; only the wall-clock limit applies there.
+    resource = None
+
+BACKENDS = ("local", "namespace")
+SANDBOX_EXEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runners", "sandbox_exec.py")
+DEFAULT_TMPFS_MB = 64
+# The user and group a sandboxed program runs as inside its namespace.
+SANDBOX_ID = 1000
+# Where the template's home folder appears inside the sandbox.
+SANDBOX_HOME = "/tmp/.iae_home"
+# Exit status of a program whose sandbox could not be set up; the reason goes to its stderr.
+SETUP_FAILED_EXIT = 126
+PROBE_TIMEOUT_SECONDS = 10
+PRLIMIT = shutil.which("prlimit")
+PRLIMIT_OPTIONS = {} if resource is None else {
+    resource.RLIMIT_CPU: "--cpu", resource.RLIMIT_AS: "--as", resource.RLIMIT_FSIZE: "--fsize",
+    resource.RLIMIT_NPROC: "--nproc",
+}
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWCGROUP = 0x02000000
+CLONE_NEWUTS = 0x04000000
+CLONE_NEWIPC = 0x08000000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWPID = 0x20000000
+CLONE_NEWNET = 0x40000000
+CLONE_NEWTIME = 0x00000080
+NAMESPACE_FLAGS = (CLONE_NEWNS | CLONE_NEWCGROUP | CLONE_NEWUTS | CLONE_NEWIPC | CLONE_NEWUSER | CLONE_NEWPID
+                   | CLONE_NEWNET | CLONE_NEWTIME)
+
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+MS_NOEXEC = 0x8
+MS_NOATIME = 0x400
+MS_NODIRATIME = 0x800
+# statvfs() flags of a mount that a user namespace may not clear, as mount() flags.
+LOCKED_FLAGS = ((os.ST_NOSUID, MS_NOSUID), (os.ST_NODEV, MS_NODEV), (os.ST_NOEXEC, MS_NOEXEC),
+                (os.ST_NOATIME, MS_NOATIME), (os.ST_NODIRATIME, MS_NODIRATIME)) if hasattr(os, "ST_NOSUID") else ()
+
+SECCOMP_RET_KILL_PROCESS = 0x80000000
+SECCOMP_RET_ERRNO = 0x00050000
+SECCOMP_RET_ALLOW = 0x7fff0000
+EPERM = 1
+ENOSYS = 38
+
+BPF_LD_W_ABS = 0x20
+BPF_JEQ_K = 0x15
+BPF_JGE_K = 0x35
+BPF_JSET_K = 0x45
+BPF_RET_K = 0x06
+SECCOMP_DATA_NR = 0
+SECCOMP_DATA_ARCH = 4
+SECCOMP_DATA_ARG0 = 16
+
+# Per architecture: audit arch, the syscalls refused with EPERM, clone, clone3, pivot_root.
+SYSCALLS = {
+    "x86_64": {
+        "arch": 0xc000003e,
+        "denied": {
+            "syslog": 103, "ptrace": 101, "vhangup": 153, "pivot_root": 155, "chroot": 161, "acct": 163,
+            "settimeofday": 164, "mount": 165, "umount2": 166, "swapon": 167, "swapoff": 168, "reboot": 169,
+            "iopl": 172, "ioperm": 173, "init_module": 175, "delete_module": 176, "quotactl": 179,
+            "lookup_dcookie": 212, "clock_settime": 227, "kexec_load": 246, "add_key": 248, "request_key": 249,
+            "keyctl": 250, "unshare": 272, "perf_event_open": 298, "name_to_handle_at": 303,
+            "open_by_handle_at": 304, "setns": 308, "process_vm_readv": 310, "process_vm_writev": 311,
+            "finit_module": 313, "kexec_file_load": 320, "bpf": 321, "userfaultfd": 323,
+        },
+        "clone": 56,
+        "clone3": 435,
+        "pivot_root": 155,
+        # Syscall numbers from here on belong to the x32 ABI, which could sidestep the filter.
+        "x32_base": 0x40000000,
+    },
+    "aarch64": {
+        "arch": 0xc00000b7,
+        "denied": {
+            "lookup_dcookie": 18, "umount2": 39, "mount": 40, "pivot_root": 41, "chroot": 51, "vhangup": 58,
+            "quotactl": 60, "acct": 89, "unshare": 97, "kexec_load": 104, "init_module": 105,
+            "delete_module": 106, "clock_settime": 112, "syslog": 116, "ptrace": 117, "reboot": 142,
+            "settimeofday": 170, "add_key": 217, "request_key": 218, "keyctl": 219, "swapon": 224,
+            "swapoff": 225, "perf_event_open": 241, "name_to_handle_at": 264, "open_by_handle_at": 265,
+            "setns": 268, "process_vm_readv": 270, "process_vm_writev": 271, "finit_module": 273, "bpf": 280,
+            "userfaultfd": 282, "kexec_file_load": 294,
+        },
+        "clone": 220,
+        "clone3": 435,
+        "pivot_root": 41,
+        "x32_base": None,
+    },
+}
+SYSCALLS["amd64"] = SYSCALLS["x86_64"]
+SYSCALLS["arm64"] = SYSCALLS["aarch64"]
+
+
+class SandboxError(Exception):
+    """The configured sandbox cannot be used on this machine; grading must not go ahead without it."""
+
+
+def seccomp_program(machine=None):
+    """
+    The seccomp BPF filter for `machine` (default: this one) as packed
+    sock_filter structs. Unknown architectures are killed outright, the
+    syscalls in SYSCALLS[...]["denied"] fail with EPERM, clone() may not
+    create namespaces and clone3() reports ENOSYS so libc falls back to
+    clone(). Everything else is allowed.
+    """
+    table = SYSCALLS.get(machine or platform.machine())
+    if table is None:
+        raise SandboxError(f"No seccomp filter for the {machine or platform.machine()} architecture.")
+
+    # (code, jump if true, jump if false, k); jumps are label names resolved below.
+    code = [(BPF_LD_W_ABS, None, None, SECCOMP_DATA_ARCH),
+            (BPF_JEQ_K, None, "kill", table["arch"]),
+            (BPF_LD_W_ABS, None, None, SECCOMP_DATA_NR)]
+    if table["x32_base"] is not None:
+        code.append((BPF_JGE_K, "deny", None, table["x32_base"]))
+    for number in sorted(table["denied"].values()):
+        code.append((BPF_JEQ_K, "deny", None, number))
+    code += [(BPF_JEQ_K, "enosys", None, table["clone3"]),
+             (BPF_JEQ_K, None, "allow", table["clone"]),
+             (BPF_LD_W_ABS, None, None, SECCOMP_DATA_ARG0),
+             (BPF_JSET_K, "deny", "allow", NAMESPACE_FLAGS)]
+    labels = {"allow": len(code), "deny": len(code) + 1, "enosys": len(code) + 2, "kill": len(code) + 3}
+    code += [(BPF_RET_K, None, None, SECCOMP_RET_ALLOW),
+             (BPF_RET_K, None, None, SECCOMP_RET_ERRNO | EPERM),
+             (BPF_RET_K, None, None, SECCOMP_RET_ERRNO | ENOSYS),
+             (BPF_RET_K, None, None, SECCOMP_RET_KILL_PROCESS)]
+
+    packed = b""
+    for index, (op, true_label, false_label, k) in enumerate(code):
+        jt = labels[true_label] - index - 1 if true_label else 0
+        jf = labels[false_label] - index - 1 if false_label else 0
+        packed += struct.pack("=HBBI", op, jt, jf, k)
+    return packed
+
+
+def _unescape_mountinfo(field):
+    # Spaces, tabs, newlines and backslashes in mount points appear as octal escapes.
+    return field.replace("\\040", " ").replace("\\011", "\t").replace("\\012", "\n").replace("\\134", "\\")
+
+
+def host_mounts():
+    """(mount point, locked mount flags) of every mount this process sees, parents before children."""
+    mounts = []
+    with open("/proc/self/mountinfo", "r") as f:
+        for line in f:
+            mount_point = _unescape_mountinfo(line.split()[4])
+            try:
+                mounts.append((mount_point, _locked_flags(mount_point)))
+            except OSError:
+                continue
+    mounts.sort(key=lambda mount: mount[0].count("/") if mount[0] != "/" else 0)
+    return mounts
+
+
+def _locked_flags(path):
+    f_flag = os.statvfs(path).f_flag
+    return sum(ms_flag for st_flag, ms_flag in LOCKED_FLAGS if f_flag & st_flag)
+
+
+class LocalBackend:
+    """Runs programs without isolation, as the grader always has."""
+
+    name = "local"
+
+    def wrap(self, command, writable=(), rlimits=()):
+        """
+        (command, preexec_fn) for launching `command` with the (resource,
+        (soft, hard)) pairs in `rlimits`. The command is prefixed with
+        prlimit, so the grader forks nothing that runs Python before the
+        exec; a string command keeps its shell as `/bin/sh -c`.
+        """
+        if not rlimits:
+            return command, None
+        if PRLIMIT and all(which in PRLIMIT_OPTIONS for which, _ in rlimits):
+            options = [f"{PRLIMIT_OPTIONS[which]}={soft}:{hard}" for which, (soft, hard) in rlimits]
+            argv = ["/bin/sh", "-c", command] if isinstance(command, str) else list(command)
+            return [PRLIMIT] + options + ["--"] + argv, None
+
+        # The preexec_fn runs between fork and exec of a multi-threaded process: it only calls setrlimit
+        # with values computed here, and neither imports nor builds anything.
+        setrlimit = resource.setrlimit
+        pairs = tuple(rlimits)
+
+        def apply_limits():
+            for which, value in pairs:
+                setrlimit(which, value)
+        return command, apply_limits
+
+    def environment(self, env=None):
+        return env
+
+    def close(self):
+        pass
+
+
+def _escape(path):
+    return path.replace("\\", "\\134").replace("\n", "\\012")
+
+
+class SandboxTemplate:
+    """
+    The per-settings part of a namespace sandbox, built once: the mounts to
+    lock read-only, the compiled seccomp filter, the empty staging folder
+    the new root is assembled on and the session's home folder. They are
+    written to the spec file core/runners/sandbox_exec.py reads on every
+    launch.
+    """
+
+    def __init__(self, network=False, seccomp=True, tmpfs_mb=DEFAULT_TMPFS_MB):
+        if not sys.platform.startswith("linux"):
+            raise SandboxError("The namespace sandbox needs Linux.")
+        machine = platform.machine()
+        table = SYSCALLS.get(machine)
+        if table is None:
+            raise SandboxError(f"The namespace sandbox does not support the {machine} architecture.")
+        self.network = network
+        self.flags = CLONE_NEWUSER | CLONE_NEWNS | CLONE_NEWPID | CLONE_NEWIPC | CLONE_NEWUTS
+        if not network:
+            self.flags |= CLONE_NEWNET
+
+        self.root = tempfile.mkdtemp(prefix="iae_sandbox_")
+        self.home = tempfile.mkdtemp(prefix="iae_sandbox_home_")
+        lines = [f"flags {self.flags}", f"uid {os.getuid()}", f"gid {os.getgid()}", f"id {SANDBOX_ID}",
+                 f"root {_escape(self.root)}", f"home {_escape(self.home)}", f"home_target {SANDBOX_HOME}",
+                 f"tmpfs size={int(tmpfs_mb)}m,mode=1777", f"pivot_root {table['pivot_root']}",
+                 f"seccomp {seccomp_program(machine).hex() if seccomp else ''}"]
+        lines += [f"mount {locked} {_escape(mount_point)}" for mount_point, locked in host_mounts()]
+        fd, self.spec_path = tempfile.mkstemp(prefix="iae_sandbox_", suffix=".spec")
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        shutil.rmtree(self.home, ignore_errors=True)
+        try:
+            os.remove(self.spec_path)
+        except OSError:
+            pass
+
+
+class NamespaceBackend:
+    """
+    Runs every program inside Linux namespaces with a seccomp filter, see
+    the module docstring. Raises SandboxError when this machine cannot
+    provide the sandbox.
+    """
+
+    name = "namespace"
+
+    def __init__(self, template):
+        self.template = template
+
+    def wrap(self, command, writable=(), rlimits=()):
+        """
+        (command, preexec_fn) for launching `command` in the sandbox: the
+        argv of sandbox_exec.py, which bind-mounts the absolute paths in
+        `writable` read-write and applies the (resource, (soft, hard))
+        pairs in `rlimits` to the program. A failed setup ends with
+        SETUP_FAILED_EXIT and the reason on stderr, so nothing ever runs
+        unsandboxed.
+        """
+        argv = [sys.executable, "-I", "-S", SANDBOX_EXEC, self.template.spec_path]
+        for path in writable:
+            if path:
+                argv += ["-w", os.path.abspath(path)]
+        for which, (soft, hard) in rlimits:
+            argv += ["-r", f"{which}:{soft}:{hard}"]
+        argv.append("--")
+        argv += ["/bin/sh", "-c", command] if isinstance(command, str) else list(command)
+        return argv, None
+
+    def environment(self, env=None):
+        """The variables to add for a launch with `env`: HOME points at the sandbox's home folder."""
+        return dict(env or {}, HOME=SANDBOX_HOME, XDG_CACHE_HOME=SANDBOX_HOME + "/.cache")
+
+    def close(self):
+        # The template stays cached for the next grading pass.
+        pass
+
+    def probe(self):
+        """Starts a trivial program in the sandbox; raises SandboxError if that does not work."""
+        with tempfile.TemporaryFile() as err:
+            try:
+                proc = subprocess.Popen(self.wrap(["/bin/sh", "-c", ":"])[0], stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.DEVNULL, stderr=err, cwd="/", start_new_session=True)
+                returncode = proc.wait(timeout=PROBE_TIMEOUT_SECONDS)
+            except (OSError, subprocess.SubprocessError) as e:
+                raise SandboxError(f"The namespace sandbox is not available: {e}")
+            if returncode != 0:
+                err.seek(0)
+                reason = err.read().decode("utf-8", errors="replace").strip() or f"exit status {returncode}"
+                raise SandboxError(f"The namespace sandbox is not available: {reason}")
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def sandbox_settings(value):
+    """
+    Normalises the "sandbox" setting of a config or project: a backend
+    name, or a dict {"backend": "namespace", "network": false,
+    "seccomp": true, "tmpfs_mb": 64}. Returns a complete settings dict.
+    """
+    if not value:
+        value = "local"
+    settings = {"backend": value} if isinstance(value, str) else dict(value)
+    settings.setdefault("backend", "local")
+    if settings["backend"] not in BACKENDS:
+        raise SandboxError(f"Unknown sandbox backend: {settings['backend']} (expected one of {', '.join(BACKENDS)})")
+    if settings["backend"] == "namespace":
+        settings.setdefault("network", False)
+        settings.setdefault("seccomp", True)
+        settings.setdefault("tmpfs_mb", DEFAULT_TMPFS_MB)
+    return settings
+
+
+def open_backend(value):
+    """
+    The backend for a "sandbox" setting (see sandbox_settings). Namespace
+    templates are built and probed once per distinct settings and shared
+    by every later grading pass in this process.
+    """
+    settings = sandbox_settings(value)
+    if settings["backend"] == "local":
+        return LocalBackend()
+
+    key = json.dumps(settings, sort_keys=True)
+    with _templates_lock:
+        backend = _templates.get(key)
+        if backend is None:
+            try:
+                template = SandboxTemplate(settings["network"], settings["seccomp"], settings["tmpfs_mb"])
+            except OSError as e:
+                raise SandboxError(f"The namespace sandbox is not available: {e}")
+            backend = NamespaceBackend(template)
+            try:
+                backend.probe()
+            except SandboxError:
+                template.close()
+                raise
+            _templates[key] = backend
+    return backend
+
+
+@atexit.register
+def _close_templates():
+    for backend in _templates.values():
+        backend.template.close()
@@ -0,0 +1,127 @@
+"""
+Where program output goes while a grading pass runs.
+
+Every pass gets its own scratch folder with one file per student and test
+case, so grader files never end up in the student's folder and two passes
+over the same submissions cannot overwrite each other's output. The
+scratch folder is memory-backed (/dev/shm) when the output limit bounds
+how much a run can write, and in the system temp folder otherwise. A
+memory-backed area holds at most MEMORY_SCRATCH_TOTAL_MB: every output
+file counts as the full output limit until its student is finished, and
+files that do not fit go to a folder on disk instead.
+
+Once a student is graded, the outputs worth keeping are moved to the
+output folder and the rest is deleted:
+- "failures" (default): outputs of the cases that did not pass
+- "all": every output
+- "none": nothing
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+from core.cache import CACHE_HOME
+
+KEEP_POLICIES = ("failures", "all", "none")
+DEFAULT_OUTPUT_DIR = os.path.join(CACHE_HOME, "outputs")
+MEMORY_SCRATCH_DIR = "/dev/shm"
+# Output limits up to this size keep the scratch folder in memory.
+MEMORY_SCRATCH_MAX_MB = 64
+# What a memory-backed scratch area may hold in total; the rest goes to disk.
+MEMORY_SCRATCH_TOTAL_MB = 256
+
+
+def _safe_name(name):
+    return str(name).replace(os.sep, "_").replace("/", "_") or "_"
+
+
+def default_output_dir(project_data, config):
+    """A folder under DEFAULT_OUTPUT_DIR per student folder and config, so projects do not mix their outputs."""
+    key = f"{os.path.abspath(project_data.get('student_code_dir', ''))}\0{config.get('config_name', '')}"
+    return os.path.join(DEFAULT_OUTPUT_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest()[:12])
+
+
+def scratch_base(limits):
+    """The folder scratch areas are created in for runs with these `limits`."""
+    output_limit = limits.get("output_limit_mb")
+    if output_limit and float(output_limit) <= MEMORY_SCRATCH_MAX_MB and os.access(MEMORY_SCRATCH_DIR, os.W_OK):
+        return MEMORY_SCRATCH_DIR
+    return tempfile.gettempdir()
+
+
+class ScratchArea:
+    """
+    The scratch folder of one grading pass. output_file() hands out the
+    path a test case writes to; finish() applies the `keep` policy to a
+    graded student, moving kept outputs to `output_dir`/<student>/ and
+    recording the new path in each CaseResult's output_file. close()
+    deletes whatever is left. Students only touch their own files, so
+    the area can be shared between threads.
+
+    When `base` is MEMORY_SCRATCH_DIR, each output file reserves
+    `output_limit_mb` of the MEMORY_SCRATCH_TOTAL_MB budget until its
+    student is finished; once the budget is used up, output files are
+    created in a second scratch folder in the system temp folder.
+    """
+
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR, keep="failures", base=None, output_limit_mb=None):
+        if keep not in KEEP_POLICIES:
+            raise ValueError(f"Unknown keep_outputs policy: {keep} (expected one of {', '.join(KEEP_POLICIES)})")
+        self.output_dir = output_dir
+        self.keep = keep
+        self.root = tempfile.mkdtemp(prefix="iae_run_", dir=base)
+        self.roots = [self.root]
+        self._lock = threading.Lock()
+        self._reserved = {}
+        self._file_bytes = None
+        self._free_bytes = 0
+        if base == MEMORY_SCRATCH_DIR:
+            self._file_bytes = int(float(output_limit_mb or MEMORY_SCRATCH_MAX_MB) * 1024 * 1024)
+            self._free_bytes = MEMORY_SCRATCH_TOTAL_MB * 1024 * 1024
+
+    def _root_for(self, student_id):
+        """The scratch folder the next output file of `student_id` goes to."""
+        if self._file_bytes is None:
+            return self.root
+        with self._lock:
+            if self._file_bytes <= self._free_bytes:
+                self._free_bytes -= self._file_bytes
+                self._reserved[student_id] = self._reserved.get(student_id, 0) + self._file_bytes
+                return self.root
+            if len(self.roots) == 1:
+                self.roots.append(tempfile.mkdtemp(prefix="iae_run_"))
+            return self.roots[1]
+
+    def output_file(self, student_id, case_name):
+        folder = os.path.join(self._root_for(student_id), _safe_name(student_id))
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{_safe_name(case_name)}.out")
+
+    def finish(self, student_id, cases):
+        """Keeps or drops the outputs of a graded student's `cases` (CaseResult records)."""
+        folders = [os.path.join(root, _safe_name(student_id)) for root in self.roots]
+        kept = os.path.join(self.output_dir, _safe_name(student_id))
+        # Outputs of an earlier pass would no longer match the new results.
+        shutil.rmtree(kept, ignore_errors=True)
+        for case in cases:
+            case.output_file = None
+            name = f"{_safe_name(case.name)}.out"
+            source = next((os.path.join(folder, name) for folder in folders
+                           if os.path.exists(os.path.join(folder, name))), None)
+            if source is None:
+                continue
+            if self.keep == "all" or (self.keep == "failures" and not case.passed):
+                os.makedirs(kept, exist_ok=True)
+                target = os.path.join(kept, name)
+                shutil.move(source, target)
+                case.output_file = os.path.abspath(target)
+        for folder in folders:
+            shutil.rmtree(folder, ignore_errors=True)
+        with self._lock:
+            self._free_bytes += self._reserved.pop(student_id, 0)
+
+    def close(self):
+        for root in self.roots:
+            shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,329 @@
+"""
+Project files: the JSON format the app has always written, or an SQLite
+database for large classes.
+
+open_store() picks the backend from the file extension (.db, .sqlite and
+.sqlite3 are SQLite, anything else JSON). Both load() the same
+project_data dict and save() it back. Both also save_results() at the end
+of a grading pass and save_result() for each student as it finishes.
+For JSON save_result() does nothing and every save rewrites the file. An
+SQLite project is written in WAL mode: saving one student's result is a
+single-row upsert, and the end of a pass only rewrites rows whose
+fingerprint changed.
+
+save_results() can also record the pass in the project's grading history
+(see core.history), which history() returns oldest first. Runs are never
+changed once stored; save() keeps the stored history unless project_data
+carries its own "history".
+
+    python -m core.store project.json project.db     # import
+    python -m core.store project.db project.json     # export
+"""
+import errno
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from core.history import HISTORY_LIMIT, run_from_json, run_to_json
+from core.results import SubmissionResult, dump_results, load_results
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+SCHEMA_VERSION = 1
+# Keys the app adds to project_data while a project is open; they are never saved.
+RUNTIME_KEYS = ("project_file_path", "student_code_dir")
+# Keys stored in their own tables rather than in the project settings.
+TABLE_KEYS = ("results", "fingerprints", "file_index", "history")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    schema_version INTEGER NOT NULL,
+    settings TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    student_id TEXT PRIMARY KEY,
+    file_index TEXT
+);
+CREATE TABLE IF NOT EXISTS test_cases (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    input_file TEXT,
+    expected_output_file TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    student_id TEXT PRIMARY KEY,
+    fingerprint TEXT,
+    compile_status TEXT NOT NULL,
+    run_status TEXT NOT NULL,
+    result TEXT NOT NULL,
+    compile_time REAL,
+    run_time REAL,
+    compare_time REAL,
+    exit_code INTEGER,
+    signal INTEGER,
+    output_bytes INTEGER,
+    cases TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TEXT NOT NULL,
+    students INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+RUN_COLUMNS = ["id", "created", "students", "passed", "seconds", "data"]
+RESULT_COLUMNS = [column for column in SubmissionResult.COLUMNS if column not in ("student_id", "cases")]
+
+
+def is_sqlite_path(path):
+    return path.lower().endswith(SQLITE_EXTENSIONS)
+
+
+def open_store(path, create=True):
+    """
+    The store for the project file at `path`, chosen by its extension.
+    With create=False a missing SQLite file raises FileNotFoundError
+    instead of being created empty.
+    """
+    return SQLiteProjectStore(path, create) if is_sqlite_path(path) else JSONProjectStore(path)
+
+
+def _settings(project_data):
+    return {key: value for key, value in project_data.items() if key not in RUNTIME_KEYS + TABLE_KEYS}
+
+
+class JSONProjectStore:
+    """A project kept as one JSON file, rewritten on every save."""
+
+    incremental = False
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def save(self, project_data):
+        data = {key: value for key, value in project_data.items() if key not in RUNTIME_KEYS}
+        if "history" not in data:
+            try:
+                data["history"] = self.load()["history"]
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=4)
+
+    def save_results(self, results, fingerprints=None, file_index=None, run=None, keep=HISTORY_LIMIT):
+        """
+        Stores a grading pass and, when given, its `run` (core.history)
+        while keeping only the newest `keep` runs. Without fingerprints
+        the stored ones are dropped, so the results are not mistaken for
+        up to date.
+        """
+        project_data = self.load()
+        project_data["results"] = dump_results(results)
+        if fingerprints is not None:
+            project_data["fingerprints"] = fingerprints
+        else:
+            project_data.pop("fingerprints", None)
+        if file_index is not None:
+            project_data["file_index"] = file_index
+        if run is not None:
+            history = project_data.get("history") or []
+            run = dict(run, id=max((entry["id"] for entry in history), default=0) + 1)
+            project_data["history"] = (history + [run_to_json(run)])[-keep:]
+        self.save(project_data)
+
+    def history(self):
+        try:
+            return [run_from_json(entry) for entry in self.load().get("history") or []]
+        except OSError:
+            return []
+
+    def save_result(self, result, fingerprint=None):
+        pass
+
+    def save_test_cases(self, test_cases):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteProjectStore:
+    """
+    A project in an SQLite database (WAL mode) with one row per student in
+    `results` and `submissions`, the test cases of the last pass in
+    `test_cases` and the remaining settings as JSON in `projects`. One
+    connection is shared by the grading threads behind a lock.
+    """
+
+    incremental = True
+
+    def __init__(self, path, create=True):
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        row = self.db.execute("SELECT schema_version FROM projects WHERE id = 1").fetchone()
+        if row and row[0] > SCHEMA_VERSION:
+            self.db.close()
+            raise ValueError(f"{path} was written by a newer version (schema {row[0]})")
+
+    def load(self):
+        with self._lock:
+            row = self.db.execute("SELECT settings FROM projects WHERE id = 1").fetchone()
+            if row is None:
+                raise ValueError(f"{self.path} holds no project")
+            project_data = json.loads(row[0])
+            results = []
+            fingerprints = {}
+            for row in self.db.execute(f"SELECT student_id, fingerprint, {', '.join(RESULT_COLUMNS)}, cases "
+                                       f"FROM results ORDER BY student_id"):
+                student_id, fingerprint, *values, cases = row
+                results.append(SubmissionResult.from_list([student_id, *values, json.loads(cases)],
+                                                          ["student_id", *RESULT_COLUMNS, "cases"]))
+                if fingerprint:
+                    fingerprints[student_id] = fingerprint
+            file_index = {student_id: json.loads(index) for student_id, index in
+                          self.db.execute("SELECT student_id, file_index FROM submissions WHERE file_index IS NOT NULL")}
+
+        if results:
+            project_data["results"] = dump_results(results)
+        if fingerprints:
+            project_data["fingerprints"] = fingerprints
+        if file_index:
+            project_data["file_index"] = file_index
+        return project_data
+
+    def save(self, project_data):
+        """Replaces the whole project, e.g. when it is imported from JSON."""
+        results = load_results(project_data.get("results"))
+        with self._lock, self.db:
+            self.db.execute("BEGIN")
+            self._write_settings(project_data)
+            self.db.execute("DELETE FROM results")
+            self.db.execute("DELETE FROM submissions")
+            self._write_results(results, project_data.get("fingerprints") or {})
+            self._write_index(project_data.get("file_index") or {})
+            if "history" in project_data:
+                self.db.execute("DELETE FROM runs")
+                for entry in project_data["history"]:
+                    self._write_run(run_from_json(entry))
+
+    def save_results(self, results, fingerprints=None, file_index=None, run=None, keep=HISTORY_LIMIT):
+        """
+        Stores a grading pass: upserts its results, drops students that are
+        gone and, when given, replaces the file index and adds `run` to the
+        history, keeping the newest `keep` runs.
+        """
+        with self._lock, self.db:
+            self.db.execute("BEGIN")
+            ids = [result.student_id for result in results]
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS current (student_id TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM current")
+            self.db.executemany("INSERT OR IGNORE INTO current VALUES (?)", [(student_id,) for student_id in ids])
+            self.db.execute("DELETE FROM results WHERE student_id NOT IN (SELECT student_id FROM current)")
+            stored = dict(self.db.execute("SELECT student_id, fingerprint FROM results"))
+            for result in results:
+                fingerprint = (fingerprints or {}).get(result.student_id)
+                # A result stored with the same fingerprint (by save_result, or a reused one) is already there.
+                if fingerprint is None or stored.get(result.student_id) != fingerprint:
+                    self._upsert(result, fingerprint)
+            if file_index is not None:
+                self.db.execute("DELETE FROM submissions")
+                self._write_index(file_index)
+            if run is not None:
+                self._write_run(run)
+                self.db.execute("DELETE FROM runs WHERE id NOT IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)",
+                                (keep,))
+
+    def history(self):
+        with self._lock:
+            return [dict(zip(RUN_COLUMNS, row))
+                    for row in self.db.execute(f"SELECT {', '.join(RUN_COLUMNS)} FROM runs ORDER BY id")]
+
+    def save_test_cases(self, test_cases):
+        """Records the (name, input_file, expected_output_file) cases a grading pass runs."""
+        with self._lock, self.db:
+            self.db.execute("BEGIN")
+            self.db.execute("DELETE FROM test_cases")
+            self.db.executemany("INSERT INTO test_cases VALUES (?, ?, ?, ?)",
+                                [(name, position, input_file, expected)
+                                 for position, (name, input_file, expected) in enumerate(test_cases)])
+
+    def save_result(self, result, fingerprint=None):
+        """Stores one student's result as soon as it is graded: a single-row upsert."""
+        with self._lock, self.db:
+            self._upsert(result, fingerprint)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def _write_settings(self, project_data):
+        self.db.execute("INSERT INTO projects (id, schema_version, settings) VALUES (1, ?, ?) "
+                        "ON CONFLICT (id) DO UPDATE SET schema_version = excluded.schema_version, "
+                        "settings = excluded.settings",
+                        (SCHEMA_VERSION, json.dumps(_settings(project_data))))
+
+    def _write_results(self, results, fingerprints):
+        for result in results:
+            self._upsert(result, fingerprints.get(result.student_id))
+
+    def _upsert(self, result, fingerprint):
+        values = [getattr(result, column) for column in RESULT_COLUMNS]
+        cases = json.dumps([case.to_list() for case in result.cases])
+        placeholders = ", ".join("?" * (len(RESULT_COLUMNS) + 3))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in ["fingerprint"] + RESULT_COLUMNS + ["cases"])
+        self.db.execute(f"INSERT INTO results (student_id, fingerprint, {', '.join(RESULT_COLUMNS)}, cases) "
+                        f"VALUES ({placeholders}) ON CONFLICT (student_id) DO UPDATE SET {updates}",
+                        [result.student_id, fingerprint, *values, cases])
+
+    def _write_run(self, run):
+        # A run imported from JSON keeps its id; a new one gets the next.
+        self.db.execute(f"INSERT INTO runs ({', '.join(RUN_COLUMNS)}) VALUES ({', '.join('?' * len(RUN_COLUMNS))})",
+                        [run.get(column) for column in RUN_COLUMNS])
+
+    def _write_index(self, file_index):
+        self.db.executemany("INSERT INTO submissions (student_id, file_index) VALUES (?, ?) "
+                            "ON CONFLICT (student_id) DO UPDATE SET file_index = excluded.file_index",
+                            [(student_id, json.dumps(index)) for student_id, index in file_index.items()])
+
+
+def convert_project(source, target):
+    """Copies the project at `source` to `target`, converting between JSON and SQLite by extension."""
+    reader = open_store(source, create=False)
+    try:
+        project_data = reader.load()
+        project_data["history"] = [run_to_json(run) for run in reader.history()]
+    finally:
+        reader.close()
+    if os.path.exists(target) and is_sqlite_path(target):
+        os.remove(target)
+    writer = open_store(target)
+    try:
+        writer.save(project_data)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python -m core.store SOURCE TARGET", file=sys.stderr)
+        sys.exit(2)
+    try:
+        convert_project(sys.argv[1], sys.argv[2])
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"[!] Cannot convert {sys.argv[1]}: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(f"[✓] {sys.argv[1]} -> {sys.argv[2]}")
@@ -0,0 +1,407 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import secrets
+import select
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import zipfile
+
+from core.cache import CACHE_HOME
+
+RUNNERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runners")
+PYTHON_RUNNER = os.path.join(RUNNERS_DIR, "python_runner.py")
+JAVA_RUNNER = os.path.join(RUNNERS_DIR, "WarmRunner.java")
+DEFAULT_RUNNER_DIR = os.path.join(CACHE_HOME, "runners")
+
+# Seconds a runner gets to report back after its job was killed before it is replaced.
+KILL_GRACE_SECONDS = 5
+POLL_SECONDS = 0.1
+SHELL_OPERATORS = re.compile(r"[|&;<>$`\n]")
+# Java cannot enforce these per job inside a shared JVM, so such runs stay cold.
+JVM_UNSUPPORTED_LIMITS = ("cpu_time_limit", "memory_limit_mb", "output_limit_mb", "process_limit")
+# Class-file references to APIs that open files by name or read the working directory. A shared JVM's
+# working directory (user.dir) is the grader's, not the student's, so such programs stay cold.
+JAVA_CWD_REFERENCES = (b"java/io/File", b"java/io/RandomAccessFile", b"java/io/PrintWriter", b"java/nio/file/",
+                       b"user.dir")
+
+
+class WarmRunnerError(Exception):
+    """A runner died or misbehaved; the job it had is rerun in a cold process."""
+
+
+class _JobTimeout(Exception):
+    pass
+
+
+class _JobCancelled(Exception):
+    pass
+
+
+def split_command(command):
+    """argv of a command (an argv list already, or a line without shell syntax), or None if it needs a shell."""
+    if isinstance(command, list):
+        return command
+    if SHELL_OPERATORS.search(command):
+        return None
+    try:
+        return shlex.split(command)
+    except ValueError:
+        return None
+
+
+def parse_python_command(command):
+    """(interpreter, script, args) for a plain `python script.py args...` command, else None."""
+    argv = split_command(command)
+    if not argv or not re.fullmatch(r"python[\d.]*", os.path.basename(argv[0])):
+        return None
+    if len(argv) < 2 or argv[1].startswith("-") or not argv[1].endswith(".py"):
+        return None
+    return argv[0], argv[1], argv[2:]
+
+
+def parse_java_command(command):
+    """(java, classpath, main_class, args) for a `java [-cp path] Main args...` command, else None."""
+    argv = split_command(command)
+    if not argv or os.path.basename(argv[0]) != "java":
+        return None
+    classpath = "."
+    i = 1
+    while i < len(argv) and argv[i].startswith("-"):
+        if argv[i] in ("-cp", "-classpath", "--class-path") and i + 1 < len(argv):
+            classpath = argv[i + 1]
+            i += 2
+        else:
+            # JVM flags, -jar and friends only apply to a JVM of the program's own.
+            return None
+    if i >= len(argv) or argv[i].endswith(".java"):
+        return None
+    return argv[0], classpath, argv[i], argv[i + 1:]
+
+
+def build_java_helper(source, javac="javac", runner_dir=DEFAULT_RUNNER_DIR):
+    """
+    Compiles one of the helper classes in core/runners once per source
+    version and returns the folder holding its class files, or None if it
+    does not compile (no JDK, say).
+    """
+    with open(source, "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(source))[0]
+    classes = os.path.abspath(os.path.join(runner_dir, f"{name}-{version}"))
+    if os.path.isfile(os.path.join(classes, f"{name}.class")):
+        return classes
+    try:
+        os.makedirs(classes, exist_ok=True)
+        result = subprocess.run([javac, "-d", classes, source], capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"[!] {name} unavailable: {e}")
+        return None
+    if result.returncode != 0:
+        print(f"[!] {name} failed to compile:\n{result.stderr}")
+        return None
+    return classes
+
+
+def uses_working_directory(cwd, classpath):
+    """True if a class on `classpath` (resolved against `cwd`) references JAVA_CWD_REFERENCES."""
+    def references(data):
+        return any(name in data for name in JAVA_CWD_REFERENCES)
+
+    for entry in classpath.split(os.pathsep):
+        path = os.path.join(cwd, entry or ".")
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for fname in files:
+                    if fname.endswith(".class"):
+                        with open(os.path.join(root, fname), "rb") as f:
+                            if references(f.read()):
+                                return True
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as jar:
+                if any(references(jar.read(name)) for name in jar.namelist() if name.endswith(".class")):
+                    return True
+    return False
+
+
+def sibling_tool(tool, name):
+    """Path of `name` next to `tool` (e.g. javac next to java), or plain `name` when tool is on PATH."""
+    return os.path.join(os.path.dirname(tool), name) if os.path.dirname(tool) else name
+
+
+class _Runner:
+    """
+    One long-lived runner process speaking a line protocol: requests on its
+    stdin, replies on its stdout, or with `private_channel` on a pipe of
+    their own whose file descriptor number is appended to argv (stdout is
+    then discarded, for runners whose jobs share the runner's stdout).
+    """
+
+    def __init__(self, argv, private_channel=False):
+        if not private_channel:
+            self.proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL, start_new_session=True, bufsize=0)
+            self.replies = self.proc.stdout
+        else:
+            read_fd, write_fd = os.pipe()
+            try:
+                self.proc = subprocess.Popen(argv + [str(write_fd)], stdin=subprocess.PIPE,
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                             start_new_session=True, bufsize=0, pass_fds=(write_fd,))
+            except BaseException:
+                os.close(read_fd)
+                raise
+            finally:
+                os.close(write_fd)
+            self.replies = os.fdopen(read_fd, "rb", buffering=0)
+        self._buffer = b""
+
+    def send(self, line):
+        try:
+            self.proc.stdin.write(line.encode("utf-8") + b"\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise WarmRunnerError(f"Runner is gone: {e}")
+
+    def read_line(self, deadline=None, cancel_event=None):
+        """Next protocol line; raises _JobTimeout / _JobCancelled, or WarmRunnerError on EOF."""
+        fd = self.replies.fileno()
+        while b"\n" not in self._buffer:
+            if cancel_event is not None and cancel_event.is_set():
+                raise _JobCancelled()
+            step = POLL_SECONDS if cancel_event is not None else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise _JobTimeout()
+                step = remaining if step is None else min(step, remaining)
+            ready, _, _ = select.select([fd], [], [], step)
+            if not ready:
+                continue
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                raise WarmRunnerError("Runner exited")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode("utf-8")
+
+    def kill(self):
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.proc.wait()
+        for stream in (self.proc.stdin, self.replies):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class _RunnerPool:
+    """Up to `size` runners started from `argv`, created lazily and handed out one job at a time."""
+
+    def __init__(self, argv, size, private_channel=False):
+        self.argv = argv
+        self.size = size
+        self.private_channel = private_channel
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._count = 0
+        self._closed = False
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            spawn = self._count < self.size
+            if spawn:
+                self._count += 1
+        if not spawn:
+            return self._idle.get()
+        try:
+            return _Runner(self.argv, self.private_channel)
+        except OSError:
+            with self._lock:
+                self._count -= 1
+            raise
+
+    def release(self, runner, healthy=True):
+        if healthy and not self._closed:
+            self._idle.put(runner)
+            return
+        runner.kill()
+        with self._lock:
+            self._count -= 1
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+class WarmRunners:
+    """
+    Keeps Python interpreters and JVMs warm across a grading pass.
+
+    A Python runner forks a fresh child per job from an interpreter that has
+    already started up, so module state never leaks between students and the
+    usual rlimits still apply to the child. A Java runner loads each job's
+    main class in its own class loader inside one long-lived JVM, which
+    skips JVM startup and JIT warm-up. Runners are pooled per interpreter,
+    at most `size` each, so every grading thread can hold one.
+
+    run() returns None whenever a job cannot run warm (shell syntax, JVM
+    flags, limits a shared JVM cannot enforce, a Java program that opens
+    files relative to its working directory, a runner that died or called
+    System.exit); the caller then runs it in a cold process as usual.
+    """
+
+    def __init__(self, size, runner_dir=DEFAULT_RUNNER_DIR):
+        self.size = max(1, int(size))
+        self.runner_dir = runner_dir
+        self._pools = {}
+        self._lock = threading.Lock()
+        # (cwd, classpath) -> uses_working_directory(); class files do not change during a pass.
+        self._cwd_dependent = {}
+
+    def _pool(self, key, make_argv, private_channel=False):
+        with self._lock:
+            if key not in self._pools:
+                argv = make_argv()
+                self._pools[key] = _RunnerPool(argv, self.size, private_channel) if argv else None
+            return self._pools[key]
+
+    def run(self, command, cwd, stdin_path, stdout_path, stderr_path, rlimits=(), limits=None, timeout=None,
+            cancel_event=None, env=None):
+        """
+        Runs `command` on a warm runner, with stdout and stderr written to the
+        given files and the variables in `env` added to the environment.
+        Returns (returncode, timed_out, cancelled), or None if the job should
+        run cold instead.
+        """
+        limits = limits or {}
+        python = parse_python_command(command)
+        if python:
+            return self._run_python(python, cwd, stdin_path, stdout_path, stderr_path, rlimits, timeout,
+                                    cancel_event, env)
+        java = parse_java_command(command)
+        # A JVM's environment cannot be changed once it runs.
+        if java and not env and not any(limits.get(key) for key in JVM_UNSUPPORTED_LIMITS):
+            return self._run_java(java, cwd, stdin_path, stdout_path, stderr_path, timeout, cancel_event)
+        return None
+
+    def _run_python(self, parsed, cwd, stdin_path, stdout_path, stderr_path, rlimits, timeout, cancel_event,
+                    env=None):
+        interpreter, script, args = parsed
+        pool = self._pool(("python", interpreter), lambda: [interpreter, PYTHON_RUNNER])
+        job = {
+            "script": os.path.join(cwd, script),
+            "args": args,
+            "cwd": cwd,
+            "stdin": stdin_path,
+            "stdout": os.path.abspath(stdout_path),
+            "stderr": stderr_path,
+            "rlimits": [[which, list(value)] for which, value in rlimits],
+            "env": env or {}
+        }
+        try:
+            runner = pool.acquire()
+        except OSError as e:
+            print(f"[!] Warm Python runner unavailable: {e}")
+            return None
+
+        deadline = time.monotonic() + timeout if timeout else None
+        pid = None
+        timed_out = cancelled = False
+        try:
+            runner.send(json.dumps(job))
+            pid = json.loads(runner.read_line(time.monotonic() + KILL_GRACE_SECONDS))["pid"]
+            try:
+                reply = runner.read_line(deadline, cancel_event)
+            except (_JobTimeout, _JobCancelled) as e:
+                timed_out = isinstance(e, _JobTimeout)
+                cancelled = not timed_out
+                os.killpg(pid, signal.SIGKILL)
+                reply = runner.read_line(time.monotonic() + KILL_GRACE_SECONDS)
+            returncode = json.loads(reply)["status"]
+        except (WarmRunnerError, _JobTimeout, _JobCancelled, ValueError, KeyError, OSError):
+            pool.release(runner, healthy=False)
+            return None
+        finally:
+            if pid is not None:
+                # The child's grandchildren share its process group.
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+        pool.release(runner)
+        return returncode, timed_out, cancelled
+
+    def _run_java(self, parsed, cwd, stdin_path, stdout_path, stderr_path, timeout, cancel_event):
+        java, classpath, main_class, args = parsed
+        # The token marks this job's reply; anything else on the channel is ignored.
+        token = secrets.token_hex(8)
+        fields = [token, cwd, classpath, main_class, stdin_path or "", os.path.abspath(stdout_path),
+                  stderr_path] + args
+        if any("\t" in field or "\n" in field for field in fields):
+            return None
+        key = (cwd, classpath)
+        if key not in self._cwd_dependent:
+            try:
+                self._cwd_dependent[key] = uses_working_directory(cwd, classpath)
+            except (OSError, zipfile.BadZipFile):
+                self._cwd_dependent[key] = True
+        if self._cwd_dependent[key]:
+            return None
+
+        def make_argv():
+            classes = build_java_helper(JAVA_RUNNER, sibling_tool(java, "javac"), self.runner_dir)
+            return [java, "-cp", classes, "WarmRunner"] if classes else None
+
+        # Student code runs inside the JVM and can reach its stdout, so replies take a pipe of their own.
+        pool = self._pool(("java", java), make_argv, private_channel=True)
+        if pool is None:
+            return None
+        try:
+            runner = pool.acquire()
+        except OSError as e:
+            print(f"[!] Warm Java runner unavailable: {e}")
+            return None
+
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            runner.send("\t".join(fields))
+            while True:
+                reply = runner.read_line(deadline, cancel_event).split()
+                if reply and reply[0] == token:
+                    break
+            returncode = int(reply[1])
+        except (_JobTimeout, _JobCancelled) as e:
+            # Student code cannot be stopped inside a shared JVM; the whole runner goes.
+            pool.release(runner, healthy=False)
+            timed_out = isinstance(e, _JobTimeout)
+            return None, timed_out, not timed_out
+        except (WarmRunnerError, ValueError, IndexError):
+            pool.release(runner, healthy=False)
+            return None
+        # Threads the program left running could write into the next job's files; a fresh JVM takes over.
+        pool.release(runner, healthy="restart" not in reply[2:])
+        return returncode, False, False
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            if pool:
+                pool.close()
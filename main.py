@@ -1,13 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import tkinter.filedialog as fd
-from core.configuration import save_configuration, load_configuration, POPULAR_LANGUAGES, list_config_files
+from core.configuration import (CONFIG_SCHEMA_VERSION, INPUT_TYPES, ConfigRegistry, POPULAR_LANGUAGES, format_environment,
+                                parse_environment, resolve_config_path, validate_configuration)
+from core.compare import COMPARATORS
+from core.extraction import extract_all, list_zip_files
+from core.results import FILTER_ALL, FILTER_FAILED, ResultTable, dump_results, load_results
+from core.store import open_store
+from core.history import ADDED, FASTER, REMOVED, SLOWER, STATUS_CHANGED, diff_runs, run_label
 import os
 import json
 from shutil import which
-import zipfile
+import queue
+import threading
+import time
+from contextlib import closing, nullcontext
 import sv_ttk
 FONT = ("Segoe UI", 11)
+PROJECT_FILETYPES = [("Project Files", "*.json *.db"), ("JSON Files", "*.json"), ("SQLite Projects", "*.db *.sqlite *.sqlite3")]
 BG_COLOR = "#f4f4f4"
 BTN_COLOR = "#dcdcdc"
 ACCENT_COLOR = "#4CAF50"
@@ -57,6 +67,9 @@ class IAEApp(tk.Tk):
         self.container.grid(row=0, column=1, sticky="nsew")
         self.container.pack_propagate(False)
 
+        # One cached view of the configs folder, shared by all tabs.
+        self.configs = ConfigRegistry("configs")
+
         self.frames = {}
         for F in (ProjectFrame, ConfigFrame, TestFrame):
             name = F.__name__.replace("Frame", "")
@@ -137,6 +150,7 @@ TIPS:
 class ProjectFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg=BG_COLOR)
+        self.controller = controller
 
         tk.Label(self, text="Project Page", font=("Caveat", 22), bg=BG_COLOR).pack(pady=20)
         self.entries = {}
@@ -146,7 +160,9 @@ class ProjectFrame(tk.Frame):
             ("Folder Path", "zip_folder"),
             ("Input Method", "input_type"),
             ("Input File (Standard Input, Optional)", "input_file"),
-            ("Expected Output File", "expected_output")
+            ("Expected Output File", "expected_output"),
+            ("Test Cases Folder (Optional)", "test_dir"),
+            ("Parallel Workers (Optional)", "workers")
         ]
 
         for text, key in labels:
@@ -169,30 +185,31 @@ class ProjectFrame(tk.Frame):
             tk.Label(row, text=text, font=FONT, bg=BG_COLOR, width=30, anchor="e").pack(side="left")
 
             if key == "config_file":
-                combo = ttk.Combobox(row, width=20, state="readonly")
-                combo['values'] = list_config_files("configs")
+                combo = ttk.Combobox(row, width=20, state="readonly",
+                                     postcommand=lambda: combo.configure(values=controller.configs.names()))
+                combo['values'] = controller.configs.names()
                 combo.pack(side="left", padx=10)
                 self.entries[key] = combo
-                combo.bind("<Button-1>", lambda e: combo.configure(values=list_config_files("configs")))
 
                 def on_config_selected(event):
                     selected_file = combo.get()
-                    config_path = os.path.join("configs", selected_file) if not selected_file.startswith("configs") else selected_file
-                    config = load_configuration(config_path)
-                    if config:
-                        input_type_value = config.get("input_type", "Standard Input")
-                        if input_type_value not in ["Standard Input", "Command-line Arguments"]:
-                            messagebox.showwarning("Invalid Input Type", f"Config file has unknown input_type: '{input_type_value}'. Defaulting to 'Standard Input'.")
-                            input_type_value = "Standard Input"
-                        self.input_type_combo.set(input_type_value)
-                        if input_type_value == "Command-line Arguments":
-                            self.cli_args_entry.pack(pady=5)
-                        else:
-                            self.cli_args_entry.pack_forget()
+                    config = controller.configs.get(selected_file)
+                    if not config:
+                        messagebox.showwarning("Invalid Configuration", "\n".join(controller.configs.problems(selected_file)))
+                        return
+                    input_type_value = config.get("input_type", "Standard Input")
+                    if input_type_value not in ["Standard Input", "Command-line Arguments"]:
+                        messagebox.showwarning("Invalid Input Type", f"Config file has unknown input_type: '{input_type_value}'. Defaulting to 'Standard Input'.")
+                        input_type_value = "Standard Input"
+                    self.input_type_combo.set(input_type_value)
+                    if input_type_value == "Command-line Arguments":
+                        self.cli_args_entry.pack(pady=5)
+                    else:
+                        self.cli_args_entry.pack_forget()
                 combo.bind("<<ComboboxSelected>>", on_config_selected)
 
-            elif key in ["zip_folder", "input_file", "expected_output"]:
-                if key == "zip_folder":
+            elif key in ["zip_folder", "input_file", "expected_output", "test_dir"]:
+                if key in ["zip_folder", "test_dir"]:
                     btn = ttk.Button(row, text="Select Folder", command=lambda k=key: self.select_file(k), width=50)
                     btn.pack(side="left", padx=10)
                 else:
@@ -252,33 +269,41 @@ class ProjectFrame(tk.Frame):
             "input_type": self.entries["input_type"].get(),
             "input_file": "" if self.entries["input_file"].cget("text") == "Select File" else self.entries["input_file"].cget("text"),
             "expected_output_file": self.entries["expected_output"].cget("text"),
+            "test_dir": "" if self.entries["test_dir"].cget("text") == "Select Folder" else self.entries["test_dir"].cget("text"),
             "cli_arguments": self.cli_args_entry.get() if self.entries["input_type"].get() == "Command-line Arguments" else ""
         }
+
+        workers = self.entries["workers"].get().strip()
+        if workers:
+            if not workers.isdigit() or int(workers) < 1:
+                messagebox.showerror("Invalid Workers", "Parallel workers must be a positive whole number.")
+                return
+            project_data["workers"] = int(workers)
     
         test_frame = self.master.master.frames.get("Test")
         if test_frame and hasattr(test_frame, "results"):
-            project_data["results"] = test_frame.results
+            project_data["results"] = dump_results(test_frame.results)
     
         file_path = fd.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON Files", "*.json")],
+            filetypes=PROJECT_FILETYPES,
             title="Save Project As"
         )
     
         if file_path:
             try:
-                with open(file_path, "w") as f:
-                    json.dump(project_data, f, indent=4)
+                with closing(open_store(file_path)) as store:
+                    store.save(project_data)
                 messagebox.showinfo("Saved", f"Project saved to:\n{file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save project:\n{e}")
 
     def load_project(self):
-        file_path = fd.askopenfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")], title="Open Project File")
+        file_path = fd.askopenfilename(defaultextension=".json", filetypes=PROJECT_FILETYPES, title="Open Project File")
         if file_path:
             try:
-                with open(file_path, "r") as f:
-                    project_data = json.load(f)
+                with closing(open_store(file_path, create=False)) as store:
+                    project_data = store.load()
     
                 self.entries["project_name"].delete(0, tk.END)
                 self.entries["project_name"].insert(0, project_data.get("project_name", ""))
@@ -306,6 +331,9 @@ class ProjectFrame(tk.Frame):
                     self.cli_args_entry.pack_forget()
                 self.entries["input_file"].config(text=project_data.get("input_file", "Select File"))
                 self.entries["expected_output"].config(text=project_data.get("expected_output_file", "Select File"))
+                self.entries["test_dir"].config(text=project_data.get("test_dir") or "Select Folder")
+                self.entries["workers"].delete(0, tk.END)
+                self.entries["workers"].insert(0, str(project_data.get("workers", "")))
     
                 # === CLI Arguments alanını doldur ve göster/gizle ===
                 self.cli_args_entry.delete(0, tk.END)
@@ -320,6 +348,12 @@ class ProjectFrame(tk.Frame):
                 messagebox.showerror("Error", f"Failed to load project:\n{e}")
 
     def select_file(self, key):
+        if key == "test_dir":
+            folder = fd.askdirectory(title="Select Folder Containing NN.in / NN.out Test Cases")
+            if folder:
+                self.entries[key].config(text=folder)
+            return
+
         if key != "zip_folder":
             file_path = fd.askopenfilename(title=f"Select {key.replace('_', ' ').capitalize()} File")
             if file_path:
@@ -328,7 +362,7 @@ class ProjectFrame(tk.Frame):
 
         popup = tk.Toplevel(self)
         popup.title("Select ZIP Folder and Extraction Folder")
-        popup.geometry("400x200")
+        popup.geometry("400x260")
         popup.resizable(False, False)
         popup.attributes('-topmost', True)
 
@@ -353,39 +387,44 @@ class ProjectFrame(tk.Frame):
                 messagebox.showerror("Error", "Please select both folders.")
                 return
 
-            zip_files = [f for f in os.listdir(zip_dir) if f.lower().endswith(".zip")]
-            if not zip_files:
+            if not list_zip_files(zip_dir):
                 messagebox.showwarning("No ZIP Files", "No ZIP files found in the selected folder.")
                 return
 
-            for zip_name in zip_files:
-                zip_path = os.path.join(zip_dir, zip_name)
-                extract_to = os.path.join(extract_root, os.path.splitext(zip_name)[0])
-                os.makedirs(extract_to, exist_ok=True)
-                try:
-                   with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                        top_level_names = set(p.split('/')[0] for p in zip_ref.namelist() if '/' in p)
-
-                        if len(top_level_names) == 1:
-                            temp_extract = os.path.join(extract_to, '__temp__')
-                            zip_ref.extractall(temp_extract)
-                    
-                            inner_folder = os.path.join(temp_extract, list(top_level_names)[0])
-                            for item in os.listdir(inner_folder):
-                                src_path = os.path.join(inner_folder, item)
-                                dst_path = os.path.join(extract_to, item)
-                                os.rename(src_path, dst_path)
-                            os.rmdir(inner_folder)
-                            os.rmdir(temp_extract)
-                        else:
-                            # Normal çıkar
-                            zip_ref.extractall(extract_to)
+            extract_btn.config(state="disabled")
+            progress_queue = queue.Queue()
 
-                except Exception as e:
-                    messagebox.showerror("Extraction Failed", f"Failed to extract {zip_name}:\n{e}")
+            def on_progress(zip_name, done, total):
+                progress_queue.put(("progress", zip_name, done, total))
 
-            self.entries[key].config(text=extract_root)
-            popup.destroy()
+            def work():
+                try:
+                    progress_queue.put(("done", extract_all(zip_dir, extract_root, on_progress=on_progress)))
+                except Exception as e:
+                    progress_queue.put(("done", [("", str(e))]))
+
+            def poll():
+                while True:
+                    try:
+                        message = progress_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if message[0] == "progress":
+                        _, zip_name, done, total = message
+                        progress_bar.configure(value=done, maximum=total)
+                        progress_text.set(f"{done}/{total}  {zip_name}")
+                    else:
+                        failures = [f"{name}: {error}" for name, error in message[1] if error]
+                        if failures:
+                            messagebox.showerror("Extraction Failed", "Some archives were not extracted:\n\n" + "\n".join(failures[:20]))
+                        self.entries[key].config(text=extract_root)
+                        popup.destroy()
+                        return
+                popup.after(100, poll)
+
+            # Archives are extracted on a worker pool so the window stays responsive.
+            threading.Thread(target=work, daemon=True).start()
+            popup.after(100, poll)
 
         # UI düzeni
         popup.columnconfigure(0, weight=1)
@@ -399,8 +438,13 @@ class ProjectFrame(tk.Frame):
         tk.Button(popup, text="Browse Output Folder", command=browse_extract_folder) \
             .grid(row=1, column=1, padx=10, ipadx=20, sticky="ew")
 
-        ttk.Button(popup, text="Extract and Confirm",
-                   command=extract_and_close).grid(row=2, column=0, columnspan=2, pady=30, ipadx=40, padx=20, sticky="ew")
+        extract_btn = ttk.Button(popup, text="Extract and Confirm", command=extract_and_close)
+        extract_btn.grid(row=2, column=0, columnspan=2, pady=(30, 10), ipadx=40, padx=20, sticky="ew")
+
+        progress_text = tk.StringVar(value="")
+        progress_bar = ttk.Progressbar(popup, mode="determinate")
+        progress_bar.grid(row=3, column=0, columnspan=2, padx=20, sticky="ew")
+        tk.Label(popup, textvariable=progress_text, anchor="w").grid(row=4, column=0, columnspan=2, padx=20, sticky="ew")
 
 
 class ConfigFrame(tk.Frame):
@@ -459,7 +503,7 @@ class ConfigFrame(tk.Frame):
                 json.load(f)
 
             original_name = os.path.basename(file_path)
-            dest_dir = "configs"
+            dest_dir = self.controller.configs.config_dir
             os.makedirs(dest_dir, exist_ok=True)
             dest_path = os.path.join(dest_dir, original_name)
 
@@ -474,6 +518,7 @@ class ConfigFrame(tk.Frame):
             with open(file_path, 'rb') as src, open(dest_path, 'wb') as dst:
                 dst.write(src.read())
 
+            self.controller.configs.invalidate(dest_path)
             self.populate_language_list()
             messagebox.showinfo("Imported", f"Configuration imported as:\n{original_name}")
 
@@ -489,7 +534,7 @@ class ConfigFrame(tk.Frame):
             return
 
         config_name = self.language_listbox.get(selection[0])
-        src_path = os.path.join("configs", f"{config_name}.json")
+        src_path = self.controller.configs.path(config_name)
 
         dest_path = fd.asksaveasfilename(defaultextension=".json", title="Export Configuration As")
         if not dest_path:
@@ -504,30 +549,31 @@ class ConfigFrame(tk.Frame):
 
     def populate_language_list(self):
         self.language_listbox.delete(0, tk.END)
-        if not os.path.exists("configs"):
-            os.makedirs("configs")
-        for filename in os.listdir("configs"):
-            if filename.endswith(".json"):
-                name = os.path.splitext(filename)[0]
-                self.language_listbox.insert(tk.END, name)
+        for filename in self.controller.configs.names():
+            self.language_listbox.insert(tk.END, os.path.splitext(filename)[0])
 
     def on_language_select(self, event):
         selection = self.language_listbox.curselection()
         if not selection:
             return
         config_name = self.language_listbox.get(selection[0])
-        path = os.path.join("configs", f"{config_name}.json")
-        config = load_configuration(path)
-        self.show_config_details(config)
+        self.show_config_details(self.controller.configs.get(config_name, validated=False),
+                                 self.controller.configs.problems(config_name))
 
-    def show_config_details(self, config):
+    def show_config_details(self, config, problems=()):
         for widget in self.detail_frame.winfo_children():
             widget.destroy()
+        for problem in problems:
+            ttk.Label(self.detail_frame, text=f"⚠ {problem}", font=FONT, foreground="#c62828", background=BG_COLOR).pack(pady=2)
         if not config:
             return
         ttk.Label(self.detail_frame, text=f"Language: {config.get('language', '')}", font=FONT, background=BG_COLOR).pack(pady=5)
         ttk.Label(self.detail_frame, text=f"Compile: {config.get('compile_command', '')}", font=FONT, background=BG_COLOR).pack(pady=5)
         ttk.Label(self.detail_frame, text=f"Run: {config.get('run_command', '')}", font=FONT, background=BG_COLOR).pack(pady=5)
+        extras = [f"{key}: {json.dumps(config[key])}" for key in ("input_type", "limits", "max_parallel", "env", "comparator", "entry_point")
+                  if config.get(key)]
+        if extras:
+            ttk.Label(self.detail_frame, text="\n".join(extras), font=("Segoe UI", 9), background=BG_COLOR).pack(pady=5)
 
     def show_add_config_page(self):
         AddConfigWindow(self)
@@ -538,8 +584,7 @@ class ConfigFrame(tk.Frame):
             messagebox.showwarning("No Selection", "Please select a configuration to edit.")
             return
         config_name = self.language_listbox.get(selection[0])
-        path = os.path.join("configs", f"{config_name}.json")
-        config = load_configuration(path)
+        config = self.controller.configs.get(config_name, validated=False)
         if config:
             AddConfigWindow(self, existing_config=config, original_name=config_name)
 
@@ -549,10 +594,9 @@ class ConfigFrame(tk.Frame):
             messagebox.showwarning("No Selection", "Please select a language to delete.")
             return
         config_name = self.language_listbox.get(selection[0])
-        path = os.path.join("configs", f"{config_name}.json")
         if messagebox.askyesno("Delete", f"Are you sure you want to delete the configuration for {config_name}?"):
             try:
-                os.remove(path)
+                self.controller.configs.delete(config_name)
                 self.populate_language_list()
                 for widget in self.detail_frame.winfo_children():
                     widget.destroy()
@@ -566,12 +610,15 @@ class AddConfigWindow(tk.Toplevel):
         super().__init__(master)
 
         self.title("Edit Configuration" if existing_config else "Add New Configuration")
-        self.geometry("500x450")
+        self.geometry("560x760")
         self.master = master
         self.configure(bg=BG_COLOR)
         self.original_name = original_name
+        # Settings the form does not show are written back unchanged.
+        self.existing_config = existing_config or {}
 
         self.entries = {}
+        self.settings = {}
 
         row_name = tk.Frame(self, bg=BG_COLOR)
         row_name.pack(pady=10, padx=20, anchor="w")
@@ -607,8 +654,77 @@ class AddConfigWindow(tk.Toplevel):
                 value = existing_config.get(key, "")
                 self.entries[key].insert(0, value)
 
+        limits = self.existing_config.get("limits") or {}
+        comparator = self.existing_config.get("comparator") or "exact"
+        entry_point = self.existing_config.get("entry_point") or ""
+        self.add_setting("input_type", "Input Type:", self.existing_config.get("input_type", "Standard Input"),
+                         choices=INPUT_TYPES)
+        self.add_setting("time_limit", "Time Limit (s):", limits.get("time_limit", ""))
+        self.add_setting("memory_limit_mb", "Memory Limit (MB):", limits.get("memory_limit_mb", ""))
+        self.add_setting("max_parallel", "Max Parallel:", self.existing_config.get("max_parallel", ""))
+        self.add_setting("comparator", "Comparator:", comparator if isinstance(comparator, str) else comparator.get("mode", "exact"),
+                         choices=list(COMPARATORS))
+        self.add_setting("env", "Environment:", format_environment(self.existing_config.get("env")))
+        self.add_setting("entry_point", "Entry Point:", entry_point if isinstance(entry_point, str) else json.dumps(entry_point))
+        tk.Label(self, text="Environment: KEY=VALUE pairs separated by spaces. Entry Point: a file name, a glob or JSON rules.",
+                 font=("Segoe UI", 9, "italic"), bg=BG_COLOR, fg="gray", wraplength=500).pack(padx=20, anchor="w")
+
         ttk.Button(self, text="Save Configuration", command=self.save_new_config).pack(pady=20)
 
+    def add_setting(self, key, label, value, choices=None):
+        row = tk.Frame(self, bg=BG_COLOR)
+        row.pack(pady=6, padx=20, anchor="w")
+        tk.Label(row, text=label, font=FONT, bg=BG_COLOR, width=18, anchor="e").pack(side="left")
+        if choices:
+            widget = ttk.Combobox(row, values=list(choices), state="readonly", width=37)
+            widget.set(value)
+        else:
+            widget = ttk.Entry(row, width=40)
+            widget.insert(0, str(value))
+        widget.pack(side="left")
+        self.settings[key] = widget
+
+    def read_settings(self, data):
+        """Applies the optional settings of the form to `data`; raises ValueError for unreadable values."""
+        values = {key: widget.get().strip() for key, widget in self.settings.items()}
+        data["input_type"] = values["input_type"] or "Standard Input"
+
+        limits = dict(data.get("limits") or {})
+        for key in ("time_limit", "memory_limit_mb"):
+            limits.pop(key, None)
+            if values[key]:
+                try:
+                    limits[key] = float(values[key]) if key == "time_limit" else int(values[key])
+                except ValueError:
+                    raise ValueError(f"{key.replace('_', ' ')} must be a number")
+        data["limits"] = limits
+
+        data["max_parallel"] = None
+        if values["max_parallel"]:
+            if not values["max_parallel"].isdigit():
+                raise ValueError("max parallel must be a whole number")
+            data["max_parallel"] = int(values["max_parallel"])
+
+        current = data.get("comparator") or "exact"
+        if values["comparator"] != (current if isinstance(current, str) else current.get("mode", "exact")):
+            # A comparator with options stays as it is unless another mode is picked.
+            data["comparator"] = values["comparator"]
+
+        data["env"] = parse_environment(values["env"])
+        entry_point = values["entry_point"]
+        if entry_point[:1] in ("[", "{"):
+            try:
+                entry_point = json.loads(entry_point)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"entry point is not valid JSON: {e}")
+        data["entry_point"] = entry_point
+
+        for key in ("limits", "max_parallel", "env", "entry_point"):
+            if not data[key]:
+                del data[key]
+        if data.get("comparator") == "exact":
+            del data["comparator"]
+
 
     def autofill_fields(self, event):
         lang = self.language_combo.get()
@@ -618,6 +734,8 @@ class AddConfigWindow(tk.Toplevel):
                 if key in self.entries:
                     self.entries[key].delete(0, tk.END)
                     self.entries[key].insert(0, val)
+            self.settings["max_parallel"].delete(0, tk.END)
+            self.settings["max_parallel"].insert(0, config.get("max_parallel", ""))
 
     def save_new_config(self):
         config_name = self.config_name_entry.get().strip()
@@ -640,23 +758,35 @@ class AddConfigWindow(tk.Toplevel):
                     self.show_tool_error(first_word)
                     return
 
-        data = {
+        data = {"schema_version": CONFIG_SCHEMA_VERSION}
+        data.update(self.existing_config)
+        data.update({
+            "schema_version": CONFIG_SCHEMA_VERSION,
             "config_name": config_name,
             "language": language,
             "compile_command": compile_cmd,
             "run_command": run_cmd
-        }
+        })
+        try:
+            self.read_settings(data)
+        except ValueError as e:
+            messagebox.showerror("Invalid Setting", str(e).capitalize())
+            return
 
+        configs = self.master.controller.configs
         safe_name = config_name.lower().replace(" ", "_")
-        file_path = os.path.join("configs", f"{safe_name}.json")
+        problems = validate_configuration(data)
+        if problems:
+            messagebox.showerror("Invalid Configuration", "\n".join(problems))
+            return
 
         if self.original_name and self.original_name.lower() != safe_name:
             try:
-                os.remove(os.path.join("configs", f"{self.original_name.lower()}.json"))
+                configs.delete(self.original_name.lower())
             except FileNotFoundError:
                 pass
 
-        save_configuration(data, file_path)
+        file_path = configs.save(data, safe_name)
         self.master.populate_language_list()
         messagebox.showinfo("Saved", f"Configuration saved as {file_path}")
         self.destroy()
@@ -675,39 +805,228 @@ class AddConfigWindow(tk.Toplevel):
         )
         messagebox.showerror("Missing Tool", help_message)
 
+class VirtualTreeview(tk.Frame):
+    """
+    A Treeview over a ResultTable that only holds the rows on screen. It
+    keeps one item per visible line and, when the table or the scroll
+    position changes, rewrites just the items whose values differ, so
+    thousands of results scroll and refresh as fast as twenty.
+    """
+
+    def __init__(self, parent, table, columns, rowheight=30, **kwargs):
+        super().__init__(parent, bg=BG_COLOR)
+        self.table = table
+        self.columns = columns
+        self.rowheight = rowheight
+        self.offset = 0
+        self.slots = []
+        self.shown = []
+        self.sort_column = None
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="browse", **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        for col in columns:
+            self.tree.heading(col, text=col.replace("_", " ").title(), command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=200, anchor="center")
+
+        self.tree.bind("<Configure>", lambda event: self.refresh())
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-1))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(1))
+
+    def visible_rows(self):
+        # The heading takes about one row.
+        return max(1, self.tree.winfo_height() // self.rowheight - 1)
+
+    def refresh(self):
+        """Brings the visible items in line with the table, touching only the ones that changed."""
+        total = len(self.table)
+        count = self.visible_rows()
+        self.offset = max(0, min(self.offset, total - count))
+        wanted = min(count, total - self.offset)
+
+        while len(self.slots) < wanted:
+            self.slots.append(self.tree.insert("", "end", values=()))
+            self.shown.append(None)
+        while len(self.slots) > wanted:
+            self.tree.delete(self.slots.pop())
+            self.shown.pop()
+
+        for i, item in enumerate(self.slots):
+            values = self.table.row(self.offset + i)
+            if self.shown[i] != values:
+                self.tree.item(item, values=values)
+                self.shown[i] = values
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + count) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, lines):
+        self.offset += lines
+        self.refresh()
+
+    def yview(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.table))
+        elif unit == "pages":
+            self.offset += int(amount) * self.visible_rows()
+        else:
+            self.offset += int(amount)
+        self.refresh()
+
+    def sort_by(self, column):
+        descending = self.table.sort_column == column and not self.table.descending
+        self.table.set_sort(column, descending)
+        for col in self.columns:
+            arrow = (" ▼" if descending else " ▲") if col == column else ""
+            self.tree.heading(col, text=col.replace("_", " ").title() + arrow)
+        self.refresh()
+
+    def row_index(self, y):
+        """Index in the table's view of the row at window y, or None."""
+        item = self.tree.identify_row(y)
+        if item not in self.slots:
+            return None
+        return self.offset + self.slots.index(item)
+
+
+class HistoryWindow(tk.Toplevel):
+    """Compares two runs from a project's grading history (see core.history)."""
+
+    def __init__(self, master, runs):
+        super().__init__(master)
+        self.title("Grading History")
+        self.geometry("900x600")
+        self.configure(bg=BG_COLOR)
+        self.runs = runs
+        self.labels = [run_label(run) for run in runs]
+        self.changes = []
+
+        pick_row = tk.Frame(self, bg=BG_COLOR)
+        pick_row.pack(fill="x", padx=20, pady=10)
+        self.old_combo = ttk.Combobox(pick_row, values=self.labels, state="readonly", width=36)
+        self.new_combo = ttk.Combobox(pick_row, values=self.labels, state="readonly", width=36)
+        tk.Label(pick_row, text="Compare:", font=FONT, bg=BG_COLOR).pack(side="left")
+        self.old_combo.pack(side="left", padx=5)
+        tk.Label(pick_row, text="with:", font=FONT, bg=BG_COLOR).pack(side="left")
+        self.new_combo.pack(side="left", padx=5)
+        self.old_combo.current(max(0, len(runs) - 2))
+        self.new_combo.current(len(runs) - 1)
+
+        filter_row = tk.Frame(self, bg=BG_COLOR)
+        filter_row.pack(fill="x", padx=20)
+        tk.Label(filter_row, text="Change:", font=FONT, bg=BG_COLOR).pack(side="left")
+        self.kind_filter = ttk.Combobox(filter_row, values=[FILTER_ALL, STATUS_CHANGED, SLOWER, FASTER, ADDED, REMOVED],
+                                        state="readonly", width=12)
+        self.kind_filter.set(FILTER_ALL)
+        self.kind_filter.pack(side="left", padx=5)
+        self.count_label = tk.Label(filter_row, text="", font=FONT, bg=BG_COLOR)
+        self.count_label.pack(side="right")
+
+        columns = ("student_id", "change", "before", "after", "time_before", "time_after")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        for col in columns:
+            self.tree.heading(col, text=col.replace("_", " ").title())
+            self.tree.column(col, width=140, anchor="center")
+        self.tree.pack(padx=20, pady=10, fill="both", expand=True)
+
+        for combo in (self.old_combo, self.new_combo):
+            combo.bind("<<ComboboxSelected>>", lambda event: self.compare())
+        self.kind_filter.bind("<<ComboboxSelected>>", lambda event: self.show_changes())
+        self.compare()
+
+    def compare(self):
+        self.changes = diff_runs(self.runs[self.old_combo.current()], self.runs[self.new_combo.current()])
+        self.show_changes()
+
+    def show_changes(self):
+        kind = self.kind_filter.get()
+        shown = [change for change in self.changes if kind == FILTER_ALL or change.kind == kind]
+        self.tree.delete(*self.tree.get_children())
+        for change in shown:
+            self.tree.insert("", "end", values=change.row())
+        self.count_label.config(text=f"{len(shown)} changed students")
+
+
 class TestFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg=BG_COLOR)
         self.controller = controller
         self.project_data = {}
         self.results = []
+        self.table = ResultTable()
+        self.worker = None
+        self.cancel_event = None
+        self.result_queue = queue.Queue()
 
         tk.Label(self, text="Test", font=("Caveat", 22), bg=BG_COLOR).pack(pady=20)
 
         btn_frame = tk.Frame(self, bg=BG_COLOR)
         btn_frame.pack(pady=10)
-        ttk.Button(btn_frame, text="Select Project", command=self.load_project_file).pack(side="left", padx=5)
-        ttk.Button(btn_frame, text="Run All Tests", command=self.run_all_tests).pack(side="left", padx=5)
-
-        columns = ("student_id", "compile_status", "run_status", "result")
-        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=20)
+        self.select_btn = ttk.Button(btn_frame, text="Select Project", command=self.load_project_file)
+        self.select_btn.pack(side="left", padx=5)
+        self.run_btn = ttk.Button(btn_frame, text="Run All Tests", command=self.run_all_tests)
+        self.run_btn.pack(side="left", padx=5)
+        self.cancel_btn = ttk.Button(btn_frame, text="Cancel", command=self.cancel_tests, state="disabled")
+        self.cancel_btn.pack(side="left", padx=5)
+        self.history_btn = ttk.Button(btn_frame, text="History", command=self.show_history)
+        self.history_btn.pack(side="left", padx=5)
+
+        progress_row = tk.Frame(self, bg=BG_COLOR)
+        progress_row.pack(fill="x", padx=20)
+        self.progress = ttk.Progressbar(progress_row, mode="determinate")
+        self.progress.pack(side="left", fill="x", expand=True)
+        self.progress_label = tk.Label(progress_row, text="", font=FONT, bg=BG_COLOR, width=28, anchor="w")
+        self.progress_label.pack(side="left", padx=10)
+
+        filter_row = tk.Frame(self, bg=BG_COLOR)
+        filter_row.pack(fill="x", padx=20, pady=(10, 0))
+        tk.Label(filter_row, text="Status:", font=FONT, bg=BG_COLOR).pack(side="left")
+        self.status_filter = ttk.Combobox(filter_row, values=[FILTER_ALL, FILTER_FAILED], state="readonly", width=22)
+        self.status_filter.set(FILTER_ALL)
+        self.status_filter.pack(side="left", padx=5)
+        self.status_filter.bind("<<ComboboxSelected>>", lambda event: self.apply_filter())
+        tk.Label(filter_row, text="Student ID:", font=FONT, bg=BG_COLOR).pack(side="left", padx=(15, 0))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.apply_filter())
+        ttk.Entry(filter_row, textvariable=self.search_var, width=20).pack(side="left", padx=5)
+        self.count_label = tk.Label(filter_row, text="", font=FONT, bg=BG_COLOR)
+        self.count_label.pack(side="right")
 
         style = ttk.Style()
         style.configure("Treeview.Heading", font=(FONT[0], 11, "bold"))
         style.configure("Treeview", font=FONT, rowheight=30)
 
-        for col in columns:
-            self.tree.heading(col, text=col.replace("_", " ").title())
-            self.tree.column(col, width=200, anchor="center")
+        columns = ("student_id", "compile_status", "run_status", "result")
+        self.view = VirtualTreeview(self, self.table, columns, rowheight=30, height=20)
+        self.view.pack(padx=20, pady=10, fill="both", expand=True)
+        self.view.tree.bind("<Double-1>", self.show_case_details)
 
-        self.tree.pack(padx=20, pady=10, fill="both", expand=True)
+    def apply_filter(self):
+        self.table.set_filter(self.status_filter.get(), self.search_var.get())
+        self.refresh_view()
+
+    def refresh_view(self):
+        """Redraws the visible rows and the status choices after the results changed."""
+        self.status_filter.configure(values=[FILTER_ALL, FILTER_FAILED] + self.table.statuses())
+        self.view.refresh()
+        self.count_label.config(text=f"{len(self.table)} of {len(self.table.records)} students")
+
+    def show_results(self, results):
+        self.results = results
+        self.table.set_results(results)
+        self.refresh_view()
 
     def load_project_file(self):
-        file_path = fd.askopenfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")], title="Select Project File")
+        file_path = fd.askopenfilename(defaultextension=".json", filetypes=PROJECT_FILETYPES, title="Select Project File")
         if file_path:
             try:
-                with open(file_path, "r") as f:
-                    self.project_data = json.load(f)
+                with closing(open_store(file_path, create=False)) as store:
+                    self.project_data = store.load()
 
                 student_dir = self.project_data.get("zip_folder")
                 if not student_dir or not os.path.isdir(student_dir):
@@ -718,46 +1037,146 @@ class TestFrame(tk.Frame):
                 self.project_data["project_file_path"] = file_path
 
             
-                self.results = self.project_data.get("results", [])
-                for item in self.tree.get_children():
-                    self.tree.delete(item)
-
-                for student_id, compile_status, run_status, result in self.results:
-                    self.tree.insert("", "end", values=(student_id, compile_status, run_status, result))    
+                self.show_results(load_results(self.project_data.get("results")))
 
                 messagebox.showinfo("Loaded", f"Project loaded:\n{file_path}\n\nStudent codes from:\n{student_dir}")
 
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load project:{e}")
 
+    def show_history(self):
+        project_path = self.project_data.get("project_file_path")
+        if not project_path:
+            messagebox.showwarning("No Project", "Please load a project file first.")
+            return
+        try:
+            with closing(open_store(project_path, create=False)) as store:
+                runs = store.history()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read the grading history:\n{e}")
+            return
+        if not runs:
+            messagebox.showinfo("Grading History", "No runs saved yet. Each \"Run All Tests\" adds one.")
+            return
+        HistoryWindow(self, runs)
+
+    def show_case_details(self, event):
+        index = self.view.row_index(event.y)
+        if index is None:
+            return
+        result = self.table.record(index)
+        if not result.cases:
+            return
+        lines = [f"{case.name}: {case.status} ({case.run_time:.2f}s)"
+                 + (f"\n    output: {case.output_file}" if case.output_file else "") for case in result.cases]
+        lines.append("")
+        lines.append(f"Compile {result.compile_time:.2f}s, run {result.run_time:.2f}s, "
+                     f"compare {result.compare_time:.2f}s")
+        messagebox.showinfo(f"Test Cases - {result.student_id}", "\n".join(lines))
+
     def run_all_tests(self):
+        if self.worker and self.worker.is_alive():
+            return
         if not self.project_data.get("config_file") or not self.project_data.get("student_code_dir"):
             messagebox.showwarning("Missing Data", "Please load a project file and student codes first.")
             return
     
-        from core.executor import run_all_submissions, load_configuration
-    
-        config_path = self.project_data["config_file"]
-        if not os.path.isfile(config_path):
-            config_path = os.path.join("configs", config_path)
-            if not os.path.isfile(config_path):
-                messagebox.showerror("Configuration Error", f"Configuration file not found:\n{config_path}")
-                return
-            self.project_data["config_file"] = config_path
+        from core.executor import run_all_submissions
     
-        config = load_configuration(config_path)
+        config_path = resolve_config_path(self.project_data["config_file"])
+        if not config_path:
+            messagebox.showerror("Configuration Error", f"Configuration file not found:\n{self.project_data['config_file']}")
+            return
+        self.project_data["config_file"] = config_path
     
-        results = run_all_submissions(config, self.project_data)
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        config = self.controller.configs.get(config_path)
+        if not config:
+            messagebox.showerror("Configuration Error", "\n".join(self.controller.configs.problems(config_path)))
+            return
+
+        self.show_results([])
+        self.progress.configure(value=0, maximum=1)
+        self.progress_label.config(text="Starting...")
+        self.run_btn.config(state="disabled")
+        self.select_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
+
+        self.cancel_event = threading.Event()
+        self.result_queue = queue.Queue()
+        self.started_at = time.monotonic()
+
+        def on_result(result, done, total):
+            self.result_queue.put(("result", result, done, total))
+
+        project_path = self.project_data.get("project_file_path")
+
+        def work(result_queue=self.result_queue, cancel_event=self.cancel_event):
+            try:
+                # SQLite projects store each student as it finishes, so a crash mid-run loses nothing.
+                with closing(open_store(project_path)) if project_path else nullcontext() as store:
+                    results = run_all_submissions(config, self.project_data, on_result=on_result,
+                                                  cancel_event=cancel_event, store=store)
+                result_queue.put(("done", results))
+            except Exception as e:
+                result_queue.put(("error", e))
+
+        # Grading runs off the Tk thread; the results come back through the queue.
+        self.worker = threading.Thread(target=work, daemon=True)
+        self.worker.start()
+        self.after(100, self.poll_results)
+
+    def cancel_tests(self):
+        if self.cancel_event:
+            self.cancel_event.set()
+            self.cancel_btn.config(state="disabled")
+            self.progress_label.config(text="Cancelling...")
+
+    def poll_results(self):
+        changed = False
+        while True:
+            try:
+                message = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if message[0] == "result":
+                _, result, done, total = message
+                changed = self.table.update(result) or changed
+                self.progress.configure(value=done, maximum=total)
+                elapsed = time.monotonic() - self.started_at
+                eta = int(elapsed / done * (total - done))
+                self.progress_label.config(text=f"{done}/{total}  ETA {eta // 60}m {eta % 60:02d}s")
+            elif message[0] == "done":
+                self.finish_run(message[1])
+                return
+            else:
+                self.finish_run(None)
+                messagebox.showerror("Error", f"Grading failed:\n{message[1]}")
+                return
+
+        # One redraw per poll, however many results arrived since the last one.
+        if changed:
+            self.refresh_view()
+        self.after(100, self.poll_results)
+
+    def finish_run(self, results):
+        self.run_btn.config(state="normal")
+        self.select_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        if results is None:
+            self.progress_label.config(text="Failed")
+            return
+
+        self.show_results(results)
+        self.project_data["results"] = dump_results(results)
+        cancelled = self.cancel_event is not None and self.cancel_event.is_set()
+        self.progress_label.config(text="Cancelled" if cancelled else f"Done in {int(time.monotonic() - self.started_at)}s")
 
-        for student_id, compile_status, run_status, result in results:
-            self.tree.insert("", "end", values=(student_id, compile_status, run_status, result))
-        self.results = results
-            
         if "project_file_path" in self.project_data:
             from core.executor import save_results_to_project
-            save_results_to_project(self.project_data["project_file_path"], results)
+            if not save_results_to_project(self.project_data["project_file_path"], results,
+                                           self.project_data.get("fingerprints"), self.project_data.get("file_index")):
+                messagebox.showerror("Save Failed", "The results could not be saved to the project file; see the log.")
         else:
             print("[!] Project path not stored. Cannot update results in project file.")
 
@@ -0,0 +1,39 @@
+import shutil
+import sys
+
+import pytest
+
+from core.batch import parse_batch_command
+from core.executor import batch_compile
+
+
+def test_javac_gets_the_student_folder_as_class_and_source_path(tmp_path):
+    cwd = str(tmp_path)
+    assert parse_batch_command("javac -d out Main.java", cwd) == (
+        "java", "javac", ["-cp", cwd, "-sourcepath", cwd, "-d", f"{cwd}/out", f"{cwd}/Main.java"])
+    assert parse_batch_command("javac -sourcepath src Main.java", cwd) == (
+        "java", "javac", ["-cp", cwd, "-sourcepath", f"{cwd}/src", f"{cwd}/Main.java"])
+    assert parse_batch_command("javac -cp lib Main.java", cwd) == (
+        "java", "javac", ["-cp", f"{cwd}/lib", f"{cwd}/Main.java"])
+
+
+def test_batched_students_get_a_share_of_the_batch_time(tmp_path):
+    jobs = []
+    for student_id in ("s1", "s2"):
+        (tmp_path / student_id).mkdir()
+        (tmp_path / student_id / "main.py").write_text("print('hi')\n")
+        jobs.append((student_id, str(tmp_path / student_id), f"{sys.executable} -m py_compile main.py"))
+    times = {}
+    compiled = batch_compile(jobs, times=times)
+    assert compiled == {"s1": (True, ""), "s2": (True, "")}
+    assert set(times) == {"s1", "s2"}
+    assert times["s1"] == times["s2"] > 0
+
+
+@pytest.mark.skipif(shutil.which("javac") is None, reason="javac is not installed")
+def test_batched_javac_finds_the_other_files_of_a_submission(tmp_path):
+    (tmp_path / "Main.java").write_text("public class Main { public static void main(String[] a) { Helper.run(); } }\n")
+    (tmp_path / "Helper.java").write_text("class Helper { static void run() { System.out.println(1); } }\n")
+    compiled = batch_compile([("s1", str(tmp_path), "javac Main.java")])
+    assert compiled["s1"][0], compiled["s1"][1]
+    assert (tmp_path / "Helper.class").exists()
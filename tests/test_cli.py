@@ -0,0 +1,37 @@
+import json
+import os
+
+import pytest
+
+import cli
+import core.executor
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configs", "python.json")
+
+
+@pytest.fixture
+def project(tmp_path):
+    student = tmp_path / "students" / "s1"
+    student.mkdir(parents=True)
+    (student / "main.py").write_text("print('hi')\n")
+    (tmp_path / "expected.txt").write_text("hi\n")
+    path = tmp_path / "project.json"
+    path.write_text(json.dumps({"config_file": CONFIG, "zip_folder": str(tmp_path / "students"),
+                                "input_type": "None", "expected_output_file": str(tmp_path / "expected.txt")}))
+    return path
+
+
+def test_save_stores_results(project, capsys):
+    assert cli.main([str(project), "--save"]) == cli.EXIT_OK
+    assert [result["result"] for result in json.loads(capsys.readouterr().out)] == ["Passed"]
+    assert "results" in json.loads(project.read_text())
+
+
+def test_failed_save_is_an_infrastructure_error(project, capsys, monkeypatch):
+    def broken_store(path):
+        raise OSError("disk full")
+    monkeypatch.setattr(core.executor, "open_store", broken_store)
+    assert cli.main([str(project), "--save"]) == cli.EXIT_INFRASTRUCTURE_ERROR
+    out, err = capsys.readouterr()
+    assert [result["student_id"] for result in json.loads(out)] == ["s1"]
+    assert "Failed to save results: disk full" in err
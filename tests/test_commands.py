@@ -0,0 +1,56 @@
+import subprocess
+
+import pytest
+
+from core.commands import CommandTemplate, needs_shell
+
+NAMES = ["/tmp/a b/main.py", "/tmp/it's/x\"y$HOME`z`\\.py", "/tmp/plain/main.py"]
+
+
+@pytest.mark.parametrize("main_file", NAMES)
+@pytest.mark.parametrize("template", [
+    'printf "%s|" {main_file} && true',
+    'printf "%s|" "{main_file}" && true',
+    "printf '%s|' '{main_file}' && true",
+    'printf "%s|" "--file={main_file}" && true',
+])
+def test_shell_placeholders_stay_one_word(template, main_file):
+    command = CommandTemplate(template).expand(main_file)
+    output = subprocess.run(command, shell=True, capture_output=True, text=True).stdout
+    expected = main_file if "--file" not in template else "--file=" + main_file
+    assert output == expected + "|"
+
+
+def test_shell_main_dir_in_quotes():
+    command = CommandTemplate('printf "%s|" "{main_dir}/out" && true').expand("/tmp/a b/main.py")
+    assert subprocess.run(command, shell=True, capture_output=True, text=True).stdout == "/tmp/a b/out|"
+
+
+def test_argv_template_keeps_file_names_whole():
+    template = CommandTemplate("javac -d {main_dir} {main_file}")
+    assert not template.shell
+    assert template.expand("/tmp/a b/Main.java") == ["javac", "-d", "/tmp/a b", "/tmp/a b/Main.java"]
+
+
+def test_argv_template_extra_args_are_split():
+    assert CommandTemplate("python3 {main_file}").expand("m.py", extra_args="1 'two words'") == \
+        ["python3", "m.py", "1", "two words"]
+
+
+def test_glob_tokens_match_in_cwd(tmp_path):
+    for name in ("b.c", "a.c", "x.h"):
+        (tmp_path / name).write_text("")
+    assert CommandTemplate("gcc *.c -o {main_dir}/a.out").expand(str(tmp_path / "a.c"), cwd=str(tmp_path)) == \
+        ["gcc", "a.c", "b.c", "-o", f"{tmp_path}/a.out"]
+    assert CommandTemplate("gcc *.cpp").expand("m.cpp", cwd=str(tmp_path)) == ["gcc", "*.cpp"]
+
+
+@pytest.mark.parametrize("command, shell", [
+    ("python3 {main_file}", False),
+    ("python3 '{main_file}' > out.txt", True),
+    ("make && ./a.out", True),
+    ("echo $HOME", True),
+    ("java -cp . Main", False),
+])
+def test_needs_shell(command, shell):
+    assert needs_shell(command) is shell
@@ -0,0 +1,45 @@
+import pytest
+
+from core.compare import compare_files, resolve_comparator
+
+
+@pytest.fixture
+def files(tmp_path):
+    def write(actual, expected):
+        (tmp_path / "actual").write_bytes(actual)
+        (tmp_path / "expected").write_bytes(expected)
+        return str(tmp_path / "actual"), str(tmp_path / "expected")
+    return write
+
+
+@pytest.mark.parametrize("mode, actual, expected, matched", [
+    ("exact", b"1 2\n3\n\n", b"1 2\n3", True),
+    ("exact", b"1  2\n3", b"1 2\n3", False),
+    ("lines", b"  a\n\n\nb  \n", b"a\nb\n", True),
+    ("lines", b"a\nc\n", b"a\nb\n", False),
+    ("whitespace", b"a \t b\nc", b"a b\nc\n", True),
+    ("whitespace", b"a b c", b"a b\nc", False),
+    ("tokens", b"a b\nc", b"a\nb c", True),
+    ("numeric", b"0.3000000001 2", b"0.3 2.0", True),
+    ("numeric", b"0.31 2", b"0.3 2", False),
+    ("unordered_lines", b"b\na\n", b"a\nb", True),
+    ("unordered_lines", b"a\na\n", b"a\nb", False),
+    ("regex", b"took 12ms\nok", b"took \\d+ms\nok", True),
+    ("regex", b"took ms", b"took \\d+ms", False),
+])
+def test_comparators(files, mode, actual, expected, matched):
+    assert compare_files(*files(actual, expected), mode=mode)[0] is matched
+
+
+def test_mismatch_detail_names_the_line(files):
+    matched, detail = compare_files(*files(b"a\nb\nx\n", b"a\nb\nc\n"), mode="lines")
+    assert not matched
+    assert "line 3" in detail
+
+
+def test_resolve_comparator():
+    assert resolve_comparator(None) == ("exact", {})
+    assert resolve_comparator("tokens") == ("tokens", {})
+    assert resolve_comparator({"mode": "numeric", "abs_tol": 0.1}) == ("numeric", {"abs_tol": 0.1})
+    with pytest.raises(ValueError):
+        resolve_comparator("fuzzy")
@@ -0,0 +1,87 @@
+import json
+import threading
+
+import pytest
+
+from core import configuration
+from core.configuration import (CONFIG_SCHEMA_VERSION, ConfigRegistry, format_environment, migrate_configuration,
+                                parse_environment, validate_configuration)
+
+VALID = {"schema_version": CONFIG_SCHEMA_VERSION, "config_name": "python", "language": "Python",
+         "compile_command": "", "run_command": "python3 {main_file}", "input_type": "Standard Input"}
+
+
+def test_migrate_v1_puts_version_first():
+    config = {"config_name": "old", "language": "C", "compile_command": "gcc {main_file}", "run_command": "./a.out"}
+    assert migrate_configuration(config)
+    assert list(config)[0] == "schema_version"
+    assert config["schema_version"] == CONFIG_SCHEMA_VERSION
+    assert config["input_type"] == "Standard Input"
+    assert not migrate_configuration(config)
+
+
+def test_migrate_keeps_input_type():
+    config = {"config_name": "old", "input_type": "Command-line Arguments"}
+    migrate_configuration(config)
+    assert config["input_type"] == "Command-line Arguments"
+
+
+def test_valid_configuration():
+    assert validate_configuration(dict(VALID)) == []
+
+
+@pytest.mark.parametrize("change, problem", [
+    ({"run_command": ""}, "'run_command' is missing"),
+    ({"limits": {"time_limit": -1}}, "limit 'time_limit' must be a non-negative number"),
+    ({"limits": {"wall": 1}}, "unknown limit 'wall'"),
+    ({"max_parallel": 0}, "'max_parallel' must be at least 1"),
+    ({"env": {"A": True}}, "environment variable 'A' must be text or a number"),
+    ({"comparator": "fuzzy"}, "Unknown comparison mode: fuzzy"),
+    ({"schema_version": CONFIG_SCHEMA_VERSION + 1}, "written for config schema"),
+])
+def test_invalid_configuration(change, problem):
+    problems = validate_configuration(dict(VALID, **change))
+    assert any(problem in text for text in problems), problems
+
+
+def test_environment_text_round_trip():
+    env = parse_environment("A=1 B='two words' C=")
+    assert env == {"A": "1", "B": "two words", "C": ""}
+    assert parse_environment(format_environment(env)) == env
+    with pytest.raises(ValueError):
+        parse_environment("NOEQUALS")
+
+
+def test_registry_migrates_once_and_serves_from_cache(tmp_path, monkeypatch):
+    path = tmp_path / "old.json"
+    path.write_text(json.dumps({"config_name": "old", "language": "Python", "compile_command": "",
+                                "run_command": "python3 {main_file}"}))
+    loads = []
+    load = configuration.load_configuration
+    monkeypatch.setattr(configuration, "load_configuration", lambda p: loads.append(p) or load(p))
+    registry = ConfigRegistry(str(tmp_path))
+
+    threads = [threading.Thread(target=registry.get, args=("old",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    config = registry.get("old")
+
+    assert len(loads) == 1
+    assert config["schema_version"] == CONFIG_SCHEMA_VERSION
+    assert json.loads(path.read_text())["schema_version"] == CONFIG_SCHEMA_VERSION
+    config["language"] = "changed"
+    assert registry.get("old")["language"] == "Python"
+    assert registry.names() == ["old.json"]
+
+
+def test_registry_reports_problems(tmp_path):
+    (tmp_path / "broken.json").write_text("{")
+    (tmp_path / "bad.json").write_text(json.dumps(dict(VALID, run_command="")))
+    registry = ConfigRegistry(str(tmp_path))
+    assert registry.get("broken") is None
+    assert registry.problems("broken") == ["broken.json is not valid JSON"]
+    assert registry.get("bad") is None
+    assert registry.get("bad", validated=False)["config_name"] == "python"
+    assert registry.problems("missing") == ["missing not found"]
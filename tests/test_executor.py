@@ -0,0 +1,97 @@
+import signal
+import sys
+
+import pytest
+
+from core.executor import (MEMORY_LIMIT_EXCEEDED, TIME_LIMIT_EXCEEDED, _limit_status, _split_returncode,
+                           load_test_cases, run_executable)
+
+
+def test_wall_clock_limit(tmp_path):
+    ok, log = run_executable([sys.executable, "-c", "import time; time.sleep(10)"], input_type=None,
+                             output_file=str(tmp_path / "out"), cwd=str(tmp_path), limits={"time_limit": 0.5})
+    assert (ok, log) == (False, TIME_LIMIT_EXCEEDED)
+
+
+def test_argv_program_killed_by_sigkill_under_memory_limit_is_a_runtime_error(tmp_path):
+    details = {}
+    ok, log = run_executable([sys.executable, "-c", "import os; os.kill(os.getpid(), 9)"], input_type=None,
+                             output_file=str(tmp_path / "out"), cwd=str(tmp_path),
+                             limits={"memory_limit_mb": 512}, details=details)
+    assert not ok
+    assert log != MEMORY_LIMIT_EXCEEDED
+    assert (details["exit_code"], details["signal"]) == (None, signal.SIGKILL)
+
+
+def test_crash_under_memory_limit_is_a_runtime_error(tmp_path):
+    details = {}
+    ok, log = run_executable([sys.executable, "-c", "import ctypes; ctypes.string_at(0)"], input_type=None,
+                             output_file=str(tmp_path / "out"), cwd=str(tmp_path),
+                             limits={"memory_limit_mb": 512}, details=details)
+    assert not ok
+    assert log != MEMORY_LIMIT_EXCEEDED
+    assert details["signal"] == signal.SIGSEGV
+
+
+def test_memory_limit_needs_evidence():
+    limits = {"memory_limit_mb": 100}
+    assert _limit_status(-signal.SIGKILL, "", False, limits, max_rss_kb=1024) is None
+    assert _limit_status(-signal.SIGKILL, "", False, limits, max_rss_kb=95 * 1024) == MEMORY_LIMIT_EXCEEDED
+    assert _limit_status(-signal.SIGABRT, "std::bad_alloc", False, limits) == MEMORY_LIMIT_EXCEEDED
+    assert _limit_status(1, "MemoryError", False, limits) == MEMORY_LIMIT_EXCEEDED
+    assert _limit_status(1, "MemoryError", False, {}) is None
+
+
+def test_negative_returncode_is_a_signal():
+    assert _split_returncode(-signal.SIGKILL) == (None, signal.SIGKILL)
+    assert _split_returncode(-signal.SIGKILL, shell=True) == (None, signal.SIGKILL)
+
+
+def test_exit_code_above_128_is_only_a_signal_for_shell_commands():
+    assert _split_returncode(137) == (137, None)
+    assert _split_returncode(137, shell=True) == (None, 9)
+    assert _split_returncode(200, shell=True) == (200, None)
+    assert _split_returncode(0) == (0, None)
+    assert _split_returncode(None) == (None, None)
+
+
+def test_argv_program_exiting_137_is_not_a_memory_limit(tmp_path):
+    details = {}
+    ok, log = run_executable([sys.executable, "-c", "import sys; sys.exit(137)"], input_type=None,
+                             output_file=str(tmp_path / "out"), cwd=str(tmp_path),
+                             limits={"memory_limit_mb": 512}, details=details)
+    assert not ok
+    assert log != MEMORY_LIMIT_EXCEEDED
+    assert (details["exit_code"], details["signal"]) == (137, None)
+
+
+def test_shell_reports_killed_child_as_signal(tmp_path):
+    details = {}
+    ok, log = run_executable("sh -c 'kill -9 $$'; exit $?", input_type=None, output_file=str(tmp_path / "out"),
+                             cwd=str(tmp_path), limits={"memory_limit_mb": 512}, details=details)
+    assert not ok
+    assert log != MEMORY_LIMIT_EXCEEDED
+    assert details["signal"] == signal.SIGKILL
+
+
+def test_environment_reaches_the_program(tmp_path):
+    out = tmp_path / "out"
+    ok, _ = run_executable([sys.executable, "-c", "import os; print(os.environ['IAE_TEST'])"], input_type=None,
+                           output_file=str(out), cwd=str(tmp_path), env={"IAE_TEST": "a b"})
+    assert ok
+    assert out.read_text() == "a b\n"
+
+
+def test_test_suite_pairs_outputs_with_inputs(tmp_path):
+    for name in ("10.out", "2.out", "2.in", "notes.txt"):
+        (tmp_path / name).write_text("")
+    assert load_test_cases({"test_dir": str(tmp_path)}) == [
+        ("2", str(tmp_path / "2.in"), str(tmp_path / "2.out")),
+        ("10", None, str(tmp_path / "10.out")),
+    ]
+
+
+def test_test_suite_without_cases_is_an_error(tmp_path):
+    (tmp_path / "1.in").write_text("")
+    with pytest.raises(ValueError, match="no test cases found in"):
+        load_test_cases({"test_dir": str(tmp_path)})
@@ -0,0 +1,60 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from core.extraction import MANIFEST_NAME, _owned_folder, extract_all, load_manifest
+
+
+def make_zip(path, files):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+
+
+@pytest.mark.parametrize("zip_name", ["../x.zip", "/etc.zip", "a/b.zip", "..", "", None])
+def test_owned_folder_rejects_names_outside_the_root(tmp_path, zip_name):
+    assert _owned_folder(str(tmp_path), zip_name) is None
+
+
+def test_owned_folder_rejects_symlinks_out_of_the_root(tmp_path):
+    (tmp_path / "root").mkdir()
+    (tmp_path / "outside").mkdir()
+    os.symlink(tmp_path / "outside" / "inner", tmp_path / "root" / "link")
+    (tmp_path / "outside" / "inner").mkdir()
+    assert _owned_folder(str(tmp_path / "root"), "link.zip") is None
+    assert _owned_folder(str(tmp_path / "root"), "s1.zip") == str(tmp_path / "root" / "s1")
+
+
+def test_incremental_extraction(tmp_path):
+    zips, root = tmp_path / "zips", tmp_path / "students"
+    zips.mkdir()
+    root.mkdir()
+    make_zip(zips / "s1.zip", {"main.py": "print(1)"})
+    make_zip(zips / "s2.zip", {"main.py": "print(2)"})
+
+    assert extract_all(str(zips), str(root), workers=2) == [("s1.zip", None), ("s2.zip", None)]
+    assert (root / "s1" / "main.py").read_text() == "print(1)"
+    assert set(load_manifest(str(root))) == {"s1.zip", "s2.zip"}
+
+    (root / "s1" / "stale.txt").write_text("")
+    make_zip(zips / "s2.zip", {"other.py": "print(3)"})
+    os.remove(zips / "s1.zip")
+    extract_all(str(zips), str(root))
+    assert not (root / "s1").exists()
+    assert sorted(os.listdir(root / "s2")) == ["other.py"]
+    assert set(load_manifest(str(root))) == {"s2.zip"}
+
+
+def test_tampered_manifest_cannot_delete_outside_the_root(tmp_path):
+    zips, root, victim = tmp_path / "zips", tmp_path / "students", tmp_path / "victim"
+    for folder in (zips, root, victim):
+        folder.mkdir()
+    (victim / "keep.txt").write_text("")
+    entry = {"size": 1, "mtime_ns": 1, "crc32": "00000000", "folder": "../victim"}
+    (root / MANIFEST_NAME).write_text(json.dumps({"version": 1, "archives": {"../victim.zip": entry,
+                                                                            "s9.zip": entry}}))
+    extract_all(str(zips), str(root))
+    assert (victim / "keep.txt").exists()
+    assert load_manifest(str(root)) == {}
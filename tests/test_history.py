@@ -0,0 +1,42 @@
+from core.history import (ADDED, FASTER, REMOVED, SLOWER, STATUS_CHANGED, decode_snapshot, diff_runs, make_run,
+                          run_from_json, run_to_json)
+from core.results import SubmissionResult
+
+
+def result(student_id, outcome="Passed", run_time=1.0, compile_status="Compiled"):
+    return SubmissionResult(student_id, compile_status, "Executed", outcome, run_time=run_time, exit_code=0)
+
+
+def test_snapshot_round_trip():
+    results = [result("s1"), result("s2", "Failed", 0.5), SubmissionResult("s3", "Compilation Failed")]
+    run = make_run(results, created="2024-05-02T14:03:11")
+    assert (run["students"], run["passed"]) == (3, 1)
+    assert decode_snapshot(run["data"]) == {
+        "s1": ("Compiled", "Executed", "Passed", 0, 1000, 0, None, 0),
+        "s2": ("Compiled", "Executed", "Failed", 0, 500, 0, None, 0),
+        "s3": ("Compilation Failed", "-", "-", 0, 0, None, None, 0),
+    }
+    assert run_from_json(run_to_json(run)) == run
+
+
+def test_diff_runs():
+    old = make_run([result("same"), result("fixed", "Failed"), result("gone"), result("slow", run_time=1.0),
+                    result("fast", run_time=2.0), result("noise", run_time=1.0)])
+    new = make_run([result("same"), result("fixed"), result("new"), result("slow", run_time=2.0),
+                    result("fast", run_time=1.0), result("noise", run_time=1.04)])
+    changes = {change.student_id: change for change in diff_runs(old, new)}
+    assert sorted(changes) == ["fast", "fixed", "gone", "new", "slow"]
+    assert (changes["fixed"].kind, changes["fixed"].before, changes["fixed"].after) == \
+        (STATUS_CHANGED, "Failed", "Passed")
+    assert changes["gone"].kind == REMOVED and changes["gone"].after is None
+    assert changes["new"].kind == ADDED and changes["new"].before is None
+    assert changes["slow"].kind == SLOWER
+    assert changes["fast"].kind == FASTER
+    assert changes["slow"].row() == ("slow", SLOWER, "Passed", "Passed", "1.00s", "2.00s")
+
+
+def test_compile_failure_is_the_status():
+    old = make_run([result("s1")])
+    new = make_run([SubmissionResult("s1", "Compilation Failed")])
+    [change] = diff_runs(old, new)
+    assert (change.before, change.after) == ("Passed", "Compilation Failed")
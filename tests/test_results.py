@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from core.results import CaseResult, SubmissionResult, dump_results, load_results
+
+
+def sample_results():
+    return [
+        SubmissionResult("s1", "Compiled", "Executed", "Passed",
+                         [CaseResult("01", "Passed", 0, None, 0.0123456789, 0.001, 12, None)],
+                         compile_time=1.5, run_time=0.25, exit_code=0, output_bytes=12),
+        SubmissionResult("s2", "Compiled", "Time Limit Exceeded", "Failed",
+                         [CaseResult("01", "Failed", None, 9, 2.0, 0.0, 0, "/tmp/out/s2/01.out")],
+                         signal=9),
+        SubmissionResult("s3", "Compilation Failed"),
+    ]
+
+
+def test_round_trip_through_json():
+    data = json.loads(json.dumps(dump_results(sample_results())))
+    loaded = load_results(data)
+    assert [result.to_dict() for result in loaded] == [result.to_dict() for result in sample_results()]
+    assert loaded[0].cases[0].run_time == 0.012346
+    assert loaded[1].cases[0].output_file == "/tmp/out/s2/01.out"
+
+
+def test_reordered_or_unknown_columns_are_read_by_name():
+    data = dump_results(sample_results()[:1])
+    data["columns"] = list(reversed(data["columns"])) + ["added_later"]
+    data["rows"] = [list(reversed(row)) + ["x"] for row in data["rows"]]
+    assert load_results(data)[0].to_dict() == sample_results()[0].to_dict()
+
+
+def test_legacy_rows():
+    loaded = load_results([["s1", "Compiled", "Executed", "Passed", [["01", "Passed"], ["02", "Failed"]]],
+                           ["s2", "Compilation Failed", "-", "-"]])
+    assert [result.row() for result in loaded] == [("s1", "Compiled", "Executed", "Passed"),
+                                                    ("s2", "Compilation Failed", "-", "-")]
+    assert [(case.name, case.passed) for case in loaded[0].cases] == [("01", True), ("02", False)]
+    assert loaded[1].cases == []
+
+
+def test_empty_and_unknown_versions():
+    assert load_results(None) == []
+    with pytest.raises(ValueError):
+        load_results({"version": 99, "rows": []})
@@ -0,0 +1,66 @@
+import os
+import signal
+import sys
+
+import pytest
+
+import core.sandbox
+from core.executor import MEMORY_LIMIT_EXCEEDED, _rlimits, _run_process, run_executable
+from core.sandbox import LocalBackend, SandboxError, open_backend
+
+
+@pytest.fixture(scope="module")
+def sandbox():
+    try:
+        return open_backend("namespace")
+    except SandboxError as e:
+        pytest.skip(f"namespace sandbox unavailable: {e}")
+
+
+def _run(sandbox, code, cwd, writable=()):
+    return _run_process([sys.executable, "-c", code], cwd=str(cwd), timeout=10, sandbox=sandbox,
+                        writable=writable)
+
+
+def test_program_cannot_see_or_signal_the_grader(sandbox, tmp_path):
+    code = ("import os\n"
+            "print(sorted(int(p) for p in os.listdir('/proc') if p.isdigit()))\n"
+            f"try:\n    os.kill({os.getpid()}, 9)\nexcept OSError as e:\n    print(type(e).__name__)\n"
+            "print(os.getpid(), os.getppid())\n")
+    returncode, stdout, _, _ = _run(sandbox, code, tmp_path)
+    assert returncode == 0
+    assert stdout.splitlines() == ["[1, 2]", "ProcessLookupError", "2 1"]
+
+
+def test_signals_and_exit_codes_pass_through(sandbox, tmp_path):
+    assert _run(sandbox, "import os; os.kill(os.getpid(), 9)", tmp_path)[0] == -signal.SIGKILL
+    assert _run(sandbox, "import os; os.abort()", tmp_path)[0] == -signal.SIGABRT
+    assert _run(sandbox, "raise SystemExit(3)", tmp_path)[0] == 3
+
+
+def test_only_writable_folders_can_be_written(sandbox, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    code = ("import sys\n"
+            "for path in sys.argv[1:]:\n"
+            "    try:\n        open(path, 'w').close()\n        print('ok')\n"
+            "    except OSError:\n        print('denied')\n")
+    returncode, stdout, _, _ = _run_process([sys.executable, "-c", code, str(out / "a"), str(tmp_path / "b")],
+                                            cwd=str(tmp_path), timeout=10, sandbox=sandbox, writable=[str(out)])
+    assert (returncode, stdout.split()) == (0, ["ok", "denied"])
+    assert (out / "a").exists() and not (tmp_path / "b").exists()
+
+
+@pytest.mark.skipif(core.sandbox.PRLIMIT is None, reason="prlimit is not installed")
+def test_local_rlimits_are_set_by_prlimit():
+    command, preexec_fn = LocalBackend().wrap("exit 4", rlimits=_rlimits({"memory_limit_mb": 256}))
+    assert preexec_fn is None
+    assert command == [core.sandbox.PRLIMIT, f"--as={256 << 20}:{256 << 20}", "--", "/bin/sh", "-c", "exit 4"]
+
+
+@pytest.mark.parametrize("prlimit", [core.sandbox.PRLIMIT, None])
+def test_local_memory_limit_applies(prlimit, tmp_path, monkeypatch):
+    monkeypatch.setattr(core.sandbox, "PRLIMIT", prlimit)
+    ok, log = run_executable([sys.executable, "-c", "bytearray(1 << 30)"], input_type=None,
+                             output_file=str(tmp_path / "out"), cwd=str(tmp_path), limits={"memory_limit_mb": 256})
+    assert (ok, log) == (False, MEMORY_LIMIT_EXCEEDED)
@@ -0,0 +1,41 @@
+import os
+
+from core import scratch
+from core.results import CaseResult
+from core.scratch import MEMORY_SCRATCH_DIR, ScratchArea
+
+
+def test_keep_failures_moves_only_failed_outputs(tmp_path):
+    area = ScratchArea(output_dir=str(tmp_path / "kept"), base=str(tmp_path))
+    try:
+        for name in ("01", "02"):
+            with open(area.output_file("s1", name), "w") as f:
+                f.write(name)
+        cases = [CaseResult("01", "Passed"), CaseResult("02", "Failed")]
+        area.finish("s1", cases)
+    finally:
+        area.close()
+    assert cases[0].output_file is None
+    assert cases[1].output_file == str(tmp_path / "kept" / "s1" / "02.out")
+    assert os.listdir(tmp_path / "kept" / "s1") == ["02.out"]
+    assert not os.path.exists(area.root)
+
+
+def test_memory_scratch_falls_back_to_disk_past_its_budget(tmp_path, monkeypatch):
+    if not os.access(MEMORY_SCRATCH_DIR, os.W_OK):
+        return
+    monkeypatch.setattr(scratch, "MEMORY_SCRATCH_TOTAL_MB", 2)
+    area = ScratchArea(output_dir=str(tmp_path / "kept"), keep="all", base=MEMORY_SCRATCH_DIR, output_limit_mb=1)
+    try:
+        paths = [area.output_file("s1", str(case)) for case in range(3)]
+        assert [path.startswith(MEMORY_SCRATCH_DIR) for path in paths] == [True, True, False]
+        for path in paths:
+            open(path, "w").close()
+        cases = [CaseResult(str(case), "Passed") for case in range(3)]
+        area.finish("s1", cases)
+        assert all(case.output_file for case in cases)
+        # Finishing a student frees its share of the budget.
+        assert area.output_file("s2", "0").startswith(MEMORY_SCRATCH_DIR)
+    finally:
+        area.close()
+    assert not any(os.path.exists(root) for root in area.roots)
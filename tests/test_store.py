@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from core.history import make_run
+from core.results import CaseResult, SubmissionResult, load_results
+from core.store import JSONProjectStore, SQLiteProjectStore, convert_project, open_store
+
+
+def results(outcome="Passed"):
+    return [SubmissionResult(student_id, "Compiled", "Executed", outcome, [CaseResult("01", outcome, 0)],
+                             run_time=0.5, exit_code=0)
+            for student_id in ("s1", "s2")]
+
+
+@pytest.fixture(params=["project.json", "project.db"])
+def store(request, tmp_path):
+    path = str(tmp_path / request.param)
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump({"config_file": "python.json"}, f)
+    store = open_store(path)
+    if path.endswith(".db"):
+        store.save({"config_file": "python.json"})
+    yield store
+    store.close()
+
+
+def test_open_store_by_extension(tmp_path):
+    assert isinstance(open_store(str(tmp_path / "p.json")), JSONProjectStore)
+    store = open_store(str(tmp_path / "p.sqlite"))
+    assert isinstance(store, SQLiteProjectStore)
+    store.close()
+    with pytest.raises(FileNotFoundError):
+        open_store(str(tmp_path / "missing.db"), create=False)
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_save_results_round_trip(store):
+    store.save_results(results(), {"s1": "f1", "s2": "f2"}, {"s1": {"main": "main.py"}}, make_run(results()))
+    project_data = store.load()
+    assert project_data["config_file"] == "python.json"
+    assert [result.to_dict() for result in load_results(project_data["results"])] == \
+        [result.to_dict() for result in results()]
+    assert project_data["fingerprints"] == {"s1": "f1", "s2": "f2"}
+    assert project_data["file_index"] == {"s1": {"main": "main.py"}}
+    [run] = store.history()
+    assert (run["id"], run["students"], run["passed"]) == (1, 2, 2)
+
+
+def test_history_keeps_newest_runs(store):
+    for _ in range(4):
+        store.save_results(results(), run=make_run(results()), keep=2)
+    assert [run["id"] for run in store.history()] == [3, 4]
+
+
+def test_results_without_fingerprints_drop_stored_ones(store):
+    store.save_results(results(), {"s1": "f1", "s2": "f2"})
+    store.save_results(results()[:1])
+    project_data = store.load()
+    assert "fingerprints" not in project_data
+    assert [result.student_id for result in load_results(project_data["results"])] == ["s1"]
+
+
+def test_sqlite_upserts_single_results(tmp_path):
+    store = open_store(str(tmp_path / "p.db"))
+    try:
+        store.save({"config_file": "python.json"})
+        store.save_results(results("Failed"), {"s1": "f1", "s2": "f2"})
+        store.save_result(SubmissionResult("s2", "Compiled", "Executed", "Passed"), "f2b")
+        store.save_result(SubmissionResult("s3", "Compilation Failed"), "f3")
+        project_data = store.load()
+    finally:
+        store.close()
+    assert [result.row() for result in load_results(project_data["results"])] == [
+        ("s1", "Compiled", "Executed", "Failed"),
+        ("s2", "Compiled", "Executed", "Passed"),
+        ("s3", "Compilation Failed", "-", "-"),
+    ]
+    assert project_data["fingerprints"] == {"s1": "f1", "s2": "f2b", "s3": "f3"}
+
+
+def test_sqlite_rejects_newer_schema(tmp_path):
+    path = str(tmp_path / "p.db")
+    store = open_store(path)
+    store.save({})
+    store.db.execute("UPDATE projects SET schema_version = 99")
+    store.close()
+    with pytest.raises(ValueError):
+        open_store(path)
+
+
+@pytest.mark.parametrize("source, target", [("p.json", "p.db"), ("p.db", "p.json")])
+def test_convert_project(tmp_path, source, target):
+    source, target = str(tmp_path / source), str(tmp_path / target)
+    if source.endswith(".json"):
+        with open(source, "w") as f:
+            json.dump({"config_file": "python.json", "student_code_dir": "/somewhere"}, f)
+    store = open_store(source)
+    if source.endswith(".db"):
+        store.save({"config_file": "python.json"})
+    store.save_results(results(), {"s1": "f1"}, run=make_run(results()))
+    expected, history = store.load(), store.history()
+    store.close()
+
+    convert_project(source, target)
+    store = open_store(target, create=False)
+    try:
+        converted = store.load()
+        assert converted["config_file"] == "python.json"
+        assert "student_code_dir" not in converted
+        assert converted["results"] == expected["results"]
+        assert converted["fingerprints"] == {"s1": "f1"}
+        assert store.history() == history
+    finally:
+        store.close()